@@ -0,0 +1,51 @@
+import json
+import os
+import pytest
+from src.utils import clear_llm_registry
+from main_run_batch import scenario_1, scenario_2, scenario_3, scenario_4, scenario_5
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_provider(tmp_path_factory):
+    "Run every benchmark against the fake provider, with logs and learnings in a temporary directory"
+    root = tmp_path_factory.mktemp("dungeon-guardian")
+    os.environ["PROVIDER"] = "fake"
+    os.environ["MODEL"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = "0"
+    os.environ["LOG_PATH"] = str(root / "logs")
+    os.environ["LEARNING_PATH"] = str(root / "learning")
+    clear_llm_registry()
+    yield root
+    clear_llm_registry()
+
+
+@pytest.fixture
+def llm_latency():
+    "Set the artificial latency of the fake provider in seconds for one benchmark"
+
+    def set_latency(seconds: float):
+        os.environ["FAKE_LLM_LATENCY"] = str(seconds)
+        clear_llm_registry()
+
+    yield set_latency
+    os.environ["FAKE_LLM_LATENCY"] = "0"
+    clear_llm_registry()
+
+
+@pytest.fixture
+def world_states():
+    return [scenario_1, scenario_2, scenario_3, scenario_4, scenario_5]
+
+
+@pytest.fixture
+def fake_script(tmp_path, monkeypatch):
+    "Script the responses of the fake provider for one benchmark, e.g. fake_script(PlannerResponse=[...])"
+
+    def set_script(**responses):
+        path = tmp_path / "fake_llm_script.json"
+        path.write_text(json.dumps(responses))
+        monkeypatch.setenv("FAKE_LLM_SCRIPT", str(path))
+        clear_llm_registry()
+
+    yield set_script
+    clear_llm_registry()
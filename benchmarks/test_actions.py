@@ -0,0 +1,76 @@
+import random
+import numpy as np
+from src.action import compiled_actions, batch_apply, to_structured
+from src.planner import plan, plan_for_goals, validate_plan, score_plan
+from src.type import Goal
+from src.utils import execute_action_sequence
+
+
+def random_sequences(count, length, seed=0):
+    rng = random.Random(seed)
+    names = list(compiled_actions)
+    return [[rng.choice(names) for _ in range(length)] for _ in range(count)]
+
+
+def test_action_executor_throughput(benchmark, world_states):
+    "1000 action sequences of four actions through the same code path as action_executor_node"
+    sequences = random_sequences(1000, 4)
+    rng = random.Random(0)
+
+    def execute():
+        for i, sequence in enumerate(sequences):
+            execute_action_sequence(world_states[i % len(world_states)], sequence, rng=rng)
+
+    benchmark(execute)
+
+
+def test_action_executor_throughput_without_messages(benchmark, world_states):
+    sequences = random_sequences(1000, 4)
+    rng = random.Random(0)
+
+    def execute():
+        for i, sequence in enumerate(sequences):
+            execute_action_sequence(world_states[i % len(world_states)], sequence, rng=rng, describe=False)
+
+    benchmark(execute)
+
+
+def test_batch_apply_throughput(benchmark, world_states):
+    "Every action applied to 100k world states with the vectorized kernels"
+    states = np.resize(to_structured(world_states), 100_000)
+
+    def apply_all():
+        for action_name in compiled_actions:
+            batch_apply(action_name, states)
+
+    benchmark(apply_all)
+
+
+def test_symbolic_plan(benchmark, world_states):
+    benchmark(plan, world_states[1], [Goal.ELIMINATE_THREAT, Goal.PROTECT_TREASURE])
+
+
+def test_symbolic_plan_for_goals_without_solution(benchmark, world_states):
+    "Worst case: every goal combination is searched until the depth limit"
+    benchmark(plan_for_goals, world_states[4], "survive", "prepare_for_battle")
+
+
+def test_validate_plan(benchmark, world_states):
+    sequences = random_sequences(1000, 4)
+
+    def validate():
+        for i, sequence in enumerate(sequences):
+            validate_plan(world_states[i % len(world_states)], sequence)
+
+    benchmark(validate)
+
+
+def test_score_plan_prefers_progress(benchmark, world_states):
+    "A plan that cannot fail because it does nothing must not beat one that heals"
+    world_state = {**world_states[0], "health": 30, "potionCount": 1, "isInSafeZone": True, "enemyNearby": False}
+
+    def score():
+        return [score_plan(world_state, sequence)["score"] for sequence in ([], ["heal_self"])]
+
+    noop, heal = benchmark(score)
+    assert heal > noop
@@ -0,0 +1,55 @@
+import pytest
+from src.analytics import episode_rows, episode_schema, success_rate_by_scenario, action_failure_frequency
+
+pa = pytest.importorskip("pyarrow")
+
+
+def records(world_states, episodes):
+    for episode in range(episodes):
+        yield {
+            "threadId": f"thread-{episode}",
+            "scenario": f"scenario_{episode % len(world_states)}",
+            "status": "success" if episode % 3 else "timed_out",
+            "iterationRecords": [
+                {
+                    "iteration": iteration,
+                    "worldState": world_states[episode % len(world_states)],
+                    "primaryGoal": "survive",
+                    "secondaryGoal": "protect_treasure",
+                    "actionSequence": ["retreat", "heal_self", "rest"],
+                    "executedActions": ["retreat"],
+                    "failedActions": ["heal_self"],
+                    "actionFailed": True,
+                    "failureOccurred": False,
+                    "failureReason": "",
+                    "planValid": True,
+                    "planRepairs": 0,
+                    "executionSeconds": 0.0001,
+                    "iterationSeconds": 0.01
+                }
+                for iteration in range(1, 11)
+            ]
+        }
+
+
+def test_episode_rows(benchmark, world_states):
+    "Flattening 1,000 logged episodes of ten iterations into rows"
+    rows = benchmark(lambda: list(episode_rows(records(world_states, 1000))))
+    assert len(rows) == 10000
+
+
+@pytest.fixture
+def table(world_states):
+    rows = list(episode_rows(records(world_states, 1000)))
+    return pa.concat_tables([pa.Table.from_pylist(rows, schema=episode_schema())] * 100)
+
+
+def test_success_rate_by_scenario(benchmark, table):
+    "Success rate per scenario over one million iteration rows"
+    result = benchmark(success_rate_by_scenario, table)
+    assert sum(result["episodes"].to_pylist()) == 1000
+
+
+def test_action_failure_frequency(benchmark, table):
+    result = benchmark(action_failure_frequency, table)
+    assert result["failures"].to_pylist()[0] == 1000000
@@ -0,0 +1,32 @@
+import asyncio
+import pytest
+from src.runner import Scenario, run_scenarios, arun_scenarios
+
+
+LLM_LATENCY = 0.005
+
+
+def scenarios(world_states, count):
+    return [
+        Scenario(name=f"scenario_{i}", world_state=world_states[i % len(world_states)], configurable={"total_iterations": 3})
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 4, 16])
+def test_batch_scaling_threads(benchmark, world_states, llm_latency, workers):
+    "16 episodes with a simulated LLM latency, on thread pools of increasing size"
+    llm_latency(LLM_LATENCY)
+    results = benchmark.pedantic(
+        run_scenarios, args=(scenarios(world_states, 16),), kwargs={"max_workers": workers}, rounds=3
+    )
+    assert all(result.error is None for result in results)
+
+
+@pytest.mark.parametrize("concurrency", [1, 16])
+def test_batch_scaling_async(benchmark, world_states, llm_latency, concurrency):
+    llm_latency(LLM_LATENCY)
+    results = benchmark.pedantic(
+        lambda: asyncio.run(arun_scenarios(scenarios(world_states, 16), max_concurrency=concurrency)), rounds=3
+    )
+    assert all(result.error is None for result in results)
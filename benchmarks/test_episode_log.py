@@ -0,0 +1,33 @@
+import pytest
+from src.episode_log import EpisodeLogWriter, write_episode_file
+
+
+def episode(world_states):
+    messages = []
+    for i in range(10):
+        messages += [
+            {"worldState": world_states[i % len(world_states)]},
+            {"planner": {"actionSequence": ["retreat", "heal_self", "rest"], "plannerJustification": "y" * 200}},
+        ]
+    return {"messages": messages, "status": "timed_out", "endReason": "The game has run out of iterations."}
+
+
+def test_episode_log_file(benchmark, tmp_path, world_states):
+    "One pretty-printed JSON file per episode"
+    payload = episode(world_states)
+    benchmark(write_episode_file, str(tmp_path), "benchmark", payload)
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip"])
+def test_episode_log_jsonl(benchmark, tmp_path, world_states, compression):
+    "Queueing 100 episodes for the background JSONL writer, then draining the queue"
+    payload = episode(world_states)
+    writer = EpisodeLogWriter(str(tmp_path), compression=compression, fsync="never")
+
+    def log():
+        for _ in range(100):
+            writer.write({"threadId": "benchmark", **payload})
+        writer.flush()
+
+    benchmark(log)
+    writer.close()
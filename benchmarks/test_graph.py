@@ -0,0 +1,131 @@
+import uuid
+import pytest
+from src.agent.graph import get_graph
+from src.learnings import get_episode_queue
+from src.metrics import registry
+from src.runner import _episode_status
+from src.utils import clear_llm_registry
+
+
+def run_episode(world_state, total_iterations, **configurable):
+    config = {
+        "recursion_limit": 200,
+        "configurable": {"thread_id": str(uuid.uuid4()), "total_iterations": total_iterations, **configurable}
+    }
+    return get_graph(config).invoke({"currentWorldState": world_state}, config)
+
+
+@pytest.mark.parametrize("planner_mode", ["llm", "symbolic"])
+def test_graph_iterations(benchmark, world_states, planner_mode):
+    "Graph overhead of an episode that never succeeds, so every run plays exactly five iterations"
+    result = benchmark(run_episode, world_states[0], 5, planner_mode=planner_mode)
+    assert result["iterations"] == 5
+
+
+def test_graph_iterations_window_context(benchmark, world_states):
+    "Same episode with the windowed goal generator context"
+    result = benchmark(run_episode, world_states[0], 5, context_strategy="window")
+    assert result["iterations"] == 5
+
+
+def test_graph_successful_episode(benchmark, world_states):
+    result = benchmark(run_episode, world_states[1], 10)
+    assert result["successOccurred"]
+
+
+@pytest.mark.parametrize("plan_candidates", [1, 4])
+def test_graph_plan_candidates(benchmark, world_states, llm_latency, plan_candidates):
+    "Episode with a simulated LLM latency; the candidate plans are requested concurrently"
+    llm_latency(0.01)
+    result = benchmark.pedantic(run_episode, args=(world_states[0], 5), kwargs={"plan_candidates": plan_candidates}, rounds=3)
+    assert result["iterations"] == 5
+    assert len(result["planCandidates"]) == (plan_candidates if plan_candidates > 1 else 0)
+
+
+@pytest.mark.parametrize("fuse_goal_planner", [False, True])
+def test_graph_fused_goal_planner(benchmark, world_states, llm_latency, fuse_goal_planner):
+    "Episode with a simulated LLM latency, with one or two LLM round-trips per iteration"
+    llm_latency(0.01)
+    requests_before = {node: registry.counter("dungeon_llm_requests_total", node=node) for node in ("goal_planner", "goal_generator")}
+    result = benchmark.pedantic(run_episode, args=(world_states[0], 5), kwargs={"fuse_goal_planner": fuse_goal_planner}, rounds=3)
+    assert result["iterations"] == 5
+    requests = {node: registry.counter("dungeon_llm_requests_total", node=node) - before for node, before in requests_before.items()}
+    assert requests == ({"goal_planner": 15, "goal_generator": 0} if fuse_goal_planner else {"goal_planner": 0, "goal_generator": 15})
+
+
+def test_graph_prompt_prefix_cached(benchmark, world_states):
+    "Every LLM call after the first one per prompt reads the static system prefix from the cache"
+    cached_before = registry.counter("dungeon_llm_tokens_total", node="planner", type="cache_read")
+    result = benchmark(run_episode, world_states[0], 5)
+    assert result["iterations"] == 5
+    assert registry.counter("dungeon_llm_tokens_total", node="planner", type="cache_read") > cached_before
+
+
+@pytest.mark.parametrize("goal_mode", ["llm", "hybrid"])
+def test_graph_goal_mode(benchmark, world_states, llm_latency, goal_mode):
+    "Episode with a simulated LLM latency, with the goals from the LLM or from the rule-based policy"
+    llm_latency(0.01)
+    result = benchmark.pedantic(run_episode, args=(world_states[0], 5), kwargs={"goal_mode": goal_mode}, rounds=3)
+    assert result["iterations"] == 5
+
+
+@pytest.mark.parametrize("kind, loop_action, iterations", [
+    ("stagnation", "none", 10),
+    ("stagnation", "terminate", 2),
+    ("cycle", "none", 10),
+    ("cycle", "reset", 6),
+    ("cycle", "terminate", 5),
+])
+def test_graph_loop_detection(benchmark, world_states, llm_latency, fake_script, kind, loop_action, iterations):
+    """
+    Episode that makes no progress, played to the iteration limit or reset and stopped by the loop detector.
+
+    Stagnation is scenario_1, for which no plan is found; the cycle is retreat -> return_to_treasure -> retreat from scenario_2.
+    """
+    llm_latency(0.01)
+    if kind == "cycle":
+        fake_script(PlannerResponse=[
+            {"actionSequence": ["retreat"], "plannerJustification": "Back to the safe zone."},
+            {"actionSequence": ["return_to_treasure"], "plannerJustification": "Back to the treasure."},
+        ])
+    world_state = world_states[1] if kind == "cycle" else world_states[0]
+    detections_before = {
+        action: registry.counter("dungeon_loop_detections_total", kind=kind, action=action)
+        for action in ("none", "reset", "terminate")
+    }
+    rounds = 3
+    # every round starts with a new model, so the scripted plans start over with retreat
+    result = benchmark.pedantic(
+        run_episode, args=(world_state, 10), kwargs={"loop_action": loop_action}, setup=clear_llm_registry, rounds=rounds
+    )
+    detections = {
+        action: registry.counter("dungeon_loop_detections_total", kind=kind, action=action) - before
+        for action, before in detections_before.items()
+    }
+
+    assert result["iterations"] == iterations
+    assert _episode_status(result) == ("timed_out" if loop_action == "none" else "stalled")
+    if loop_action == "none":
+        assert detections["none"] >= rounds and detections["reset"] == detections["terminate"] == 0
+    else:
+        assert result["loopDetected"] == kind
+        assert detections == {"none": 0, "reset": rounds if loop_action == "reset" else 0, "terminate": rounds}
+
+
+@pytest.mark.parametrize("learning_mode", ["rewrite", "batch"])
+def test_graph_learning_mode(benchmark, world_states, llm_latency, tmp_path, monkeypatch, learning_mode):
+    """
+    Episode with a simulated LLM latency, with the learning call at its end or deferred to the batch learner.
+
+    Three episodes are fewer than a batch, so in batch mode they all stay in the episode queue.
+    """
+    llm_latency(0.01)
+    monkeypatch.setenv("LEARNING_PATH", str(tmp_path))
+    requests_before = registry.counter("dungeon_llm_requests_total", node="failure_analysis_node")
+    rounds = 3
+    result = benchmark.pedantic(run_episode, args=(world_states[1], 10), kwargs={"learning_mode": learning_mode}, rounds=rounds)
+    requests = registry.counter("dungeon_llm_requests_total", node="failure_analysis_node") - requests_before
+
+    assert result["successOccurred"]
+    assert requests == (0 if learning_mode == "batch" else rounds)
+    assert len(get_episode_queue(str(tmp_path))) == (rounds if learning_mode == "batch" else 0)
@@ -0,0 +1,71 @@
+import pytest
+from src.agent.context import build_episode_context
+from src.agent.learner import learn_from_episode_queue
+from src.agent.structs import HistoricalLearnings
+from src.configuration import Configuration
+from src.learnings import LearningsStore, LearningsJournal, get_episode_queue
+
+
+LEARNINGS = HistoricalLearnings(
+    actionFailureLearnings=[f"action failure learning {i}" for i in range(20)],
+    gameFailureLearnings=[f"game failure learning {i}" for i in range(20)],
+    generalLearnings=[f"general learning {i}" for i in range(20)],
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LearningsStore(str(tmp_path))
+    store.save(LEARNINGS)
+    return store
+
+
+def test_learnings_load_cached(benchmark, store):
+    "Reading the learnings when the file has not changed since the last read"
+    benchmark(store.load_dict)
+
+
+def test_learnings_load_changed(benchmark, store):
+    "Reading the learnings after another process replaced the file"
+
+    def load():
+        store._signature = None
+        return store.load_dict()
+
+    benchmark(load)
+
+
+def test_learnings_save(benchmark, store):
+    benchmark(store.save, LEARNINGS)
+
+
+def test_journal_append(benchmark, tmp_path):
+    journal = LearningsJournal(str(tmp_path))
+    benchmark(journal.append, {"threadId": "benchmark", "insights": LEARNINGS.model_dump()})
+
+
+def test_episode_context_window(benchmark, world_states):
+    "Goal generator context of a 30-iteration episode"
+    messages = []
+    for i in range(30):
+        messages += [
+            {"worldState": world_states[i % len(world_states)]},
+            {"goalGenerator": {"primaryGoal": "Survive", "secondaryGoal": "ProtectTreasure", "goalJustification": "x" * 200}},
+            {"planner": {"actionSequence": ["retreat", "heal_self", "rest"], "plannerJustification": "y" * 200}},
+            {"gameMessage": "No game failure occurred.\nExecuted actions: ['retreat', 'heal_self', 'rest']"},
+        ]
+    benchmark(build_episode_context, messages)
+
+
+def test_batch_learning(benchmark, tmp_path):
+    "One batch learner run over 100 queued episodes, 20 per LLM call"
+    configurable = Configuration(provider="fake", model="fake", learning_path=str(tmp_path), learning_batch_size=20, thread_id="benchmark")
+    queue = get_episode_queue(str(tmp_path))
+    entry = {"threadId": "benchmark", "status": "timed_out", "endReason": "", "iterations": ["#1 | outcome=x" * 10] * 5}
+
+    def setup():
+        for _ in range(100):
+            queue.append(entry)
+
+    benchmark.pedantic(learn_from_episode_queue, args=(configurable,), setup=setup, rounds=3)
+    assert len(queue) == 0
@@ -0,0 +1,29 @@
+import copy
+from src.action import to_structured, pack_structured, unpack_structured, from_structured
+from src.type import FrozenWorldState
+
+
+def test_world_state_copy(benchmark, world_states):
+    benchmark(lambda: [world_state.copy() for world_state in world_states * 200])
+
+
+def test_world_state_deepcopy(benchmark, world_states):
+    "What a naive copy of the graph state costs, for comparison with the shallow copy"
+    benchmark(lambda: [copy.deepcopy(world_state) for world_state in world_states * 200])
+
+
+def test_frozen_world_state_pack(benchmark, world_states):
+    benchmark(lambda: [FrozenWorldState.from_dict(world_state).pack() for world_state in world_states * 200])
+
+
+def test_structured_pack(benchmark, world_states):
+    states = to_structured(world_states * 200)
+    benchmark(pack_structured, states)
+
+
+def test_frozen_world_state_pack_round_trip(benchmark, world_states):
+    "A failed heal_self without potions leaves potionCount at -1, which has to survive packing"
+    frozen = [FrozenWorldState.from_dict({**world_state, "potionCount": -1}) for world_state in world_states]
+    unpacked = benchmark(lambda: [FrozenWorldState.unpack(state.pack()) for state in frozen])
+    assert unpacked == frozen
+    assert from_structured(unpack_structured(pack_structured(to_structured([state.to_dict() for state in frozen])))) == [state.to_dict() for state in frozen]
@@ -1,4 +1,4 @@
-from src.agent.graph import graph
+from src.agent.graph import get_graph
 from src.type import WorldState
 import uuid
 import json
@@ -20,13 +20,11 @@ world_state = WorldState(
 
 if __name__ == "__main__":
 
-    events = graph.stream(
-        {"currentWorldState": world_state},
-        {
-            "recursion_limit": 100, 
-            "configurable": {"thread_id": str(uuid.uuid4())}
-        }
-    )
+    config = {
+        "recursion_limit": 100, 
+        "configurable": {"thread_id": str(uuid.uuid4())}
+    }
+    events = get_graph(config).stream({"currentWorldState": world_state}, config)
 
     for event in events:
         if "goal_generator" in event:
@@ -1,7 +1,7 @@
-from src.agent.graph import graph
+from src.runner import Scenario, run_scenarios, format_summary
+from src.agent.learner import flush_batch_learners
+from src.metrics import format_metrics_summary
 from src.type import WorldState
-import uuid
-import json
 
 # Scenario 1: Low Health, No Healing Resources, Enemy Nearby
 scenario_1 = WorldState(
@@ -76,25 +76,17 @@ scenario_5 = WorldState(
 
 if __name__ == "__main__":
 
-    scenerios = [scenario_1, scenario_2, scenario_3, scenario_4, scenario_5]
+    scenerios = [
+        Scenario(name="scenario_1", world_state=scenario_1),
+        Scenario(name="scenario_2", world_state=scenario_2),
+        Scenario(name="scenario_3", world_state=scenario_3),
+        Scenario(name="scenario_4", world_state=scenario_4),
+        Scenario(name="scenario_5", world_state=scenario_5),
+    ]
 
-    for world_state in scenerios:
+    results = run_scenarios(scenerios, max_workers=len(scenerios))
+    flush_batch_learners()
 
-        print(f"Running scenerio: {world_state}")
-
-        results = graph.invoke(
-            {"currentWorldState": world_state},
-            {
-                "recursion_limit": 100, 
-                "configurable": {"thread_id": str(uuid.uuid4())}
-            }
-        )
-
-        print(
-            f"failureOccurred: {results["failureOccurred"]}\n\n"
-            f"failureReason: {results["failureReason"]}\n\n"
-            f"successOccurred: {results["successOccurred"]}\n\n"
-            f"endReason: {results["endReason"]}\n\n"
-            f"iterations: {results["iterations"]}\n\n"
-            "--------------------------------\n\n"
-        )
\ No newline at end of file
+    print(format_summary(results))
+    print()
+    print(format_metrics_summary())
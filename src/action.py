@@ -1,4 +1,6 @@
-from typing import List
+from typing import List, Optional
+import numpy as np
+from .type import WorldState, TreasureThreatLevel, EnemyLevel, _PACKED_LAYOUT, _PACKED_OFFSETS
 
 
 class Action:
@@ -190,4 +192,247 @@ action_failure_probability = {
             "potionCount": lambda x: x["potionCount"] - 1
         }
     }
-}
\ No newline at end of file
+}
+
+class CompiledAction:
+    "Pure transition function compiled from an Action"
+
+    def __init__(self, action: Action):
+        self.name = action.name
+        self._preconditions = tuple(action.preconditions)
+        self._effects = tuple(action.effects.items())
+
+    def is_applicable(self, world_state: WorldState) -> bool:
+        "Check whether all preconditions of the action hold in the world state"
+        for precondition in self._preconditions:
+            if not precondition(world_state):
+                return False
+        return True
+
+    def apply(self, world_state: WorldState) -> WorldState:
+        """
+        Apply the effects of the action and return the next world state.
+
+        Effects are evaluated in their declared order, each one seeing the values written
+        by the effects before it, which is exactly how the action executor has always
+        applied them. The input world state is never modified.
+        """
+        next_world_state = world_state.copy()
+        for key, effect in self._effects:
+            next_world_state[key] = effect(next_world_state)
+        return next_world_state
+
+    def __call__(self, world_state: WorldState) -> Optional[WorldState]:
+        "Return the next world state, or None if a precondition is not met"
+        if not self.is_applicable(world_state):
+            return None
+        return self.apply(world_state)
+
+    def __repr__(self):
+        return f"CompiledAction(name={self.name})"
+
+
+compiled_actions = {
+    action.name: CompiledAction(action) for action in action_pool
+}
+
+compiled_failure_effects = {
+    name: CompiledAction(Action(name=name, preconditions=[], effects=failure["effects"], description=failure["reason"]))
+    for name, failure in action_failure_probability.items()
+}
+
+
+# Batch form: world states as a NumPy structured array with one column per WorldState field.
+# Enum-like fields are stored as indices into the tuples below.
+
+TREASURE_THREAT_LEVELS = tuple(level.value for level in TreasureThreatLevel)
+ENEMY_LEVELS = tuple(level.value for level in EnemyLevel)
+
+WORLD_STATE_DTYPE = np.dtype([
+    ("health", np.int16),
+    ("stamina", np.int16),
+    ("potionCount", np.int8),
+    ("treasureThreatLevel", np.int8),
+    ("enemyNearby", np.bool_),
+    ("enemyLevel", np.int8),
+    ("isInSafeZone", np.bool_),
+    ("isBackup", np.bool_),
+    ("treasureHealth", np.int16),
+    ("comfyActions", np.int8),
+])
+
+_ENEMY_DAMAGE = np.array([0, 10, 20, 30, 40, 50, 0], dtype=np.int16)
+
+
+def to_structured(world_states: List[WorldState]) -> np.ndarray:
+    "Convert a list of world states into a structured array with WORLD_STATE_DTYPE"
+    states = np.empty(len(world_states), dtype=WORLD_STATE_DTYPE)
+    for i, world_state in enumerate(world_states):
+        states[i] = (
+            world_state["health"],
+            world_state["stamina"],
+            world_state["potionCount"],
+            TREASURE_THREAT_LEVELS.index(world_state["treasureThreatLevel"]),
+            world_state["enemyNearby"],
+            ENEMY_LEVELS.index(world_state["enemyLevel"]),
+            world_state["isInSafeZone"],
+            world_state["isBackup"],
+            world_state["treasureHealth"],
+            world_state["comfyActions"],
+        )
+    return states
+
+
+def from_structured(states: np.ndarray) -> List[WorldState]:
+    "Convert a structured array with WORLD_STATE_DTYPE back into a list of world states"
+    return [
+        WorldState(
+            health=int(row["health"]),
+            stamina=int(row["stamina"]),
+            potionCount=int(row["potionCount"]),
+            treasureThreatLevel=TREASURE_THREAT_LEVELS[row["treasureThreatLevel"]],
+            enemyNearby=bool(row["enemyNearby"]),
+            enemyLevel=ENEMY_LEVELS[row["enemyLevel"]],
+            isInSafeZone=bool(row["isInSafeZone"]),
+            isBackup=bool(row["isBackup"]),
+            treasureHealth=int(row["treasureHealth"]),
+            comfyActions=int(row["comfyActions"]),
+        )
+        for row in states
+    ]
+
+
+def pack_structured(states: np.ndarray) -> np.ndarray:
+    "Encode a structured array of world states as 40-bit integers, the same way FrozenWorldState.pack does"
+    packed = np.zeros(len(states), dtype=np.uint64)
+    shift = 0
+    for field, bits in _PACKED_LAYOUT:
+        codes = states[field].astype(np.int64)
+        codes = codes + _PACKED_OFFSETS.get(field, 0)
+        if len(codes) and (codes.min() < 0 or codes.max() >= 1 << bits):
+            raise ValueError(f"Cannot pack {field} values outside of {bits} bits")
+        packed |= codes.astype(np.uint64) << np.uint64(shift)
+        shift += bits
+    return packed
+
+
+def unpack_structured(packed: np.ndarray) -> np.ndarray:
+    "Decode integers encoded with pack_structured back into a structured array of world states"
+    packed = np.asarray(packed, dtype=np.uint64)
+    states = np.empty(len(packed), dtype=WORLD_STATE_DTYPE)
+    shift = 0
+    for field, bits in _PACKED_LAYOUT:
+        codes = ((packed >> np.uint64(shift)) & np.uint64((1 << bits) - 1)).astype(np.int64)
+        states[field] = codes - _PACKED_OFFSETS.get(field, 0)
+        shift += bits
+    return states
+
+
+def _batch_comfy_effects(states: np.ndarray, next_states: np.ndarray):
+    "Shared effects of the actions that count as 'comfy' in the safe zone"
+    comfy = states["comfyActions"] >= 2
+    level = states["enemyLevel"]
+    next_states["enemyLevel"] = np.where(comfy & (level >= 1) & (level <= 4), level + 1, level)
+    next_states["comfyActions"] = np.where(comfy, np.maximum(0, states["comfyActions"] - 1), states["comfyActions"] + 1)
+    under_attack = states["isInSafeZone"] & states["enemyNearby"]
+    next_states["treasureHealth"] = np.where(under_attack, np.maximum(0, states["treasureHealth"] - 10), states["treasureHealth"])
+
+
+def _batch_heal_self(states: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+    next_states["health"] = np.minimum(100, states["health"] + 25)
+    next_states["potionCount"] = states["potionCount"] - 1
+    _batch_comfy_effects(states, next_states)
+    return (states["potionCount"] > 0) & states["isInSafeZone"]
+
+
+def _batch_attack_enemy(states: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+    damage = _ENEMY_DAMAGE[states["enemyLevel"]]
+    next_states["health"] = states["health"] - np.where(states["isBackup"], damage // 2, damage)
+    next_states["enemyNearby"] = False
+    next_states["enemyLevel"] = ENEMY_LEVELS.index(None)
+    next_states["stamina"] = states["stamina"] - 15
+    return states["enemyNearby"].copy()
+
+
+def _batch_retreat(states: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+    next_states["isInSafeZone"] = True
+    next_states["stamina"] = states["stamina"] - 5
+    return ~states["isInSafeZone"]
+
+
+def _batch_defend_treasure(states: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+    level = states["treasureThreatLevel"]
+    next_states["treasureThreatLevel"] = np.where((level == 1) | (level == 2), level - 1, level)
+    next_states["stamina"] = states["stamina"] - 20
+    return level != 0
+
+
+def _batch_call_backup(states: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+    next_states["isBackup"] = True
+    next_states["stamina"] = states["stamina"] - 40
+    _batch_comfy_effects(states, next_states)
+    return states["isInSafeZone"] & ~states["isBackup"]
+
+
+def _batch_search_for_potion(states: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+    next_states["potionCount"] = states["potionCount"] + 1
+    next_states["stamina"] = states["stamina"] - 15
+    _batch_comfy_effects(states, next_states)
+    return states["isInSafeZone"] & (states["potionCount"] < 2)
+
+
+def _batch_rest(states: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+    next_states["stamina"] = np.minimum(100, states["stamina"] + 25)
+    next_states["health"] = np.minimum(100, states["health"] + 15)
+    _batch_comfy_effects(states, next_states)
+    return states["isInSafeZone"].copy()
+
+
+def _batch_return_to_treasure(states: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+    next_states["isInSafeZone"] = False
+    next_states["stamina"] = states["stamina"] - 10
+    return states["isInSafeZone"].copy()
+
+
+def _batch_heal_self_failure(states: np.ndarray, next_states: np.ndarray) -> np.ndarray:
+    next_states["potionCount"] = states["potionCount"] - 1
+    return np.ones(len(states), dtype=np.bool_)
+
+
+batch_actions = {
+    "heal_self": _batch_heal_self,
+    "attack_enemy": _batch_attack_enemy,
+    "retreat": _batch_retreat,
+    "defend_treasure": _batch_defend_treasure,
+    "call_backup": _batch_call_backup,
+    "search_for_potion": _batch_search_for_potion,
+    "rest": _batch_rest,
+    "return_to_treasure": _batch_return_to_treasure,
+}
+
+batch_failure_effects = {
+    "heal_self": _batch_heal_self_failure,
+}
+
+
+def batch_apply(action_name: str, states: np.ndarray, failed: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Apply one action to N world states at once.
+
+    Args:
+        action_name: The name of the action to apply.
+        states: Structured array of world states with WORLD_STATE_DTYPE. It is not modified.
+        failed: Apply the action's failure effects from action_failure_probability instead
+                of its regular effects.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (next_states, applicable)
+            - next_states: The world states after the action. Rows whose preconditions
+              are not met are returned unchanged.
+            - applicable: Boolean mask of the rows whose preconditions were met
+    """
+    kernel = batch_failure_effects[action_name] if failed else batch_actions[action_name]
+    next_states = states.copy()
+    applicable = kernel(states, next_states)
+    next_states[~applicable] = states[~applicable]
+    return next_states, applicable
@@ -0,0 +1,106 @@
+from typing import Any, Dict, List
+import json
+
+
+def split_iterations(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Group the episode messages by iteration.
+
+    Every iteration starts with the {"worldState": ...} message that the goal generator
+    adds; messages before the first one form their own group.
+    """
+
+    iterations = []
+    for message in messages:
+        if "worldState" in message or not iterations:
+            iterations.append([])
+        iterations[-1].append(message)
+    return iterations
+
+
+def summarize_iteration(number: int, iteration: List[Dict[str, Any]], max_outcome_chars: int = 160) -> str:
+    "Condense one iteration into a single line with its world state, goals, plan and outcome"
+
+    parts = [f"#{number}"]
+    outcomes = []
+
+    for message in iteration:
+        if "worldState" in message:
+            state = message["worldState"]
+            parts.append(
+                f"health={state.get('health')} stamina={state.get('stamina')} potions={state.get('potionCount')} "
+                f"threat={state.get('treasureThreatLevel')} enemy={state.get('enemyLevel') if state.get('enemyNearby') else 'none'} "
+                f"safeZone={state.get('isInSafeZone')} backup={state.get('isBackup')} treasureHealth={state.get('treasureHealth')}"
+            )
+        elif "goalGenerator" in message:
+            goals = message["goalGenerator"]
+            parts.append(f"goals={goals.get('primaryGoal')}/{goals.get('secondaryGoal')}")
+        elif "planner" in message:
+            parts.append("plan=" + " > ".join(message["planner"].get("actionSequence", [])))
+        elif "gameMessage" in message:
+            outcomes.append(" ".join(message["gameMessage"].split()))
+
+    outcome = " ".join(outcomes)
+    if len(outcome) > max_outcome_chars:
+        outcome = outcome[:max_outcome_chars - 3] + "..."
+    if outcome:
+        parts.append(f"outcome={outcome}")
+    return " | ".join(parts)
+
+
+def estimate_tokens(text: str) -> int:
+    "Rough token estimate of about four characters per token, good enough for budgeting"
+    return len(text) // 4 + 1
+
+
+def build_episode_context(
+        messages: List[Dict[str, Any]],
+        keep_iterations: int = 3,
+        token_budget: int = 4000
+) -> str:
+    """
+    Render the episode history for the goal generator within a bounded context window.
+
+    The last `keep_iterations` iterations are kept message by message; older iterations
+    are reduced to one digest line each. If the result exceeds `token_budget`, the oldest
+    digest lines are dropped first and then the oldest full iterations are turned into
+    digests, until it fits or only the latest iteration is left in full.
+
+    Args:
+        messages: The episode messages from the agent state.
+        keep_iterations: Number of most recent iterations kept in full.
+        token_budget: Approximate maximum number of tokens of the rendered context.
+
+    Returns:
+        JSON text with the digest of earlier iterations and the recent messages.
+    """
+
+    iterations = split_iterations(messages)
+    keep = max(1, min(keep_iterations, len(iterations)))
+    digests = [summarize_iteration(number, iteration) for number, iteration in enumerate(iterations[:-keep], start=1)]
+    dropped = 0
+
+    def render() -> str:
+        recent = [message for iteration in iterations[len(iterations) - keep:] for message in iteration]
+        context = {"recentMessages": recent}
+        if digests or dropped:
+            context = {
+                "earlierIterations": ([f"{dropped} earlier iterations omitted"] if dropped else []) + digests,
+                **context
+            }
+        return json.dumps(context)
+
+    text = render()
+    while estimate_tokens(text) > token_budget:
+        if digests:
+            digests.pop(0)
+            dropped += 1
+        elif keep > 1:
+            number = len(iterations) - keep + 1
+            digests.append(summarize_iteration(number, iterations[number - 1]))
+            keep -= 1
+        else:
+            break
+        text = render()
+
+    return text
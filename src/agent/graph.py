@@ -1,35 +1,147 @@
+from typing import Optional
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
 from .states import AgentState
 from .nodes import (
     goal_generator_node,
     planner_node,
+    goal_planner_node,
+    plan_validator_node,
     action_executor_node,
     check_success_conditions_node,
+    strategy_reset_node,
     logger_node,
-    failure_analysis_node
+    failure_analysis_node,
+    agoal_generator_node,
+    aplanner_node,
+    agoal_planner_node,
+    afailure_analysis_node,
+    alogger_node
 )
 from ..type import WorldState
-from .routers import success_router
+from ..metrics import instrument_node
+from ..checkpoint import create_checkpointer
+from ..configuration import Configuration
+from .routers import success_router, plan_validation_router
+import os
+import threading
 import uuid
 import json
 
 
-builder = StateGraph(AgentState)
+_DEFAULT_CHECKPOINTER = object()
 
-builder.add_node("goal_generator", goal_generator_node)
-builder.add_node("planner", planner_node)
-builder.add_node("action_executor", action_executor_node)
-builder.add_node("check_success_conditions", check_success_conditions_node)
-builder.add_node("failure_analysis_node", failure_analysis_node)
-builder.add_node("logger_node", logger_node)
 
-builder.add_edge(START, "goal_generator")
-builder.add_edge("goal_generator", "planner")
-builder.add_edge("planner", "action_executor")
-builder.add_edge("action_executor", "check_success_conditions")
-builder.add_conditional_edges("check_success_conditions", success_router)
-builder.add_edge("failure_analysis_node", "logger_node")
-builder.add_edge("logger_node", END)
+def build_graph(async_nodes: bool = False, checkpointer=_DEFAULT_CHECKPOINTER, fuse_goal_planner: bool = False):
+    """
+    Build and compile the agent graph.
 
-graph = builder.compile(checkpointer=MemorySaver())
\ No newline at end of file
+    Args:
+        async_nodes: Use the async node implementations, so that the LLM calls and file
+                     I/O do not block a thread. The compiled graph must then be driven
+                     with graph.ainvoke or graph.astream.
+        checkpointer: The checkpointer to compile the graph with, None for no
+                      checkpointing. By default it is created from the `checkpointer`
+                      settings of the configuration (environment variables).
+        fuse_goal_planner: Start every iteration with the goal_planner node, which
+                           generates the goals and the plan in one LLM call, instead of
+                           the goal_generator -> planner chain. The planner node is still
+                           used to repair invalid plans.
+
+    Every node is wrapped with instrument_node, which records its latency and the LLM,
+    cache and action execution metrics of each invocation.
+
+    Returns:
+        The compiled graph.
+    """
+
+    builder = StateGraph(AgentState)
+
+    def add_node(name, node):
+        builder.add_node(name, instrument_node(name, node))
+
+    if fuse_goal_planner:
+        add_node("goal_planner", agoal_planner_node if async_nodes else goal_planner_node)
+    else:
+        add_node("goal_generator", agoal_generator_node if async_nodes else goal_generator_node)
+    add_node("planner", aplanner_node if async_nodes else planner_node)
+    add_node("plan_validator", plan_validator_node)
+    add_node("action_executor", action_executor_node)
+    add_node("check_success_conditions", check_success_conditions_node)
+    add_node("strategy_reset", strategy_reset_node)
+    add_node("failure_analysis_node", afailure_analysis_node if async_nodes else failure_analysis_node)
+    add_node("logger_node", alogger_node if async_nodes else logger_node)
+
+    iteration_start = "goal_planner" if fuse_goal_planner else "goal_generator"
+    builder.add_edge(START, iteration_start)
+    if fuse_goal_planner:
+        builder.add_edge("goal_planner", "plan_validator")
+    else:
+        builder.add_edge("goal_generator", "planner")
+    builder.add_edge("planner", "plan_validator")
+    builder.add_conditional_edges("plan_validator", plan_validation_router)
+    builder.add_edge("action_executor", "check_success_conditions")
+    builder.add_conditional_edges(
+        "check_success_conditions",
+        success_router,
+        {"goal_generator": iteration_start, "strategy_reset": "strategy_reset", "failure_analysis_node": "failure_analysis_node"}
+    )
+    builder.add_edge("strategy_reset", iteration_start)
+    builder.add_edge("failure_analysis_node", "logger_node")
+    builder.add_edge("logger_node", END)
+
+    if checkpointer is _DEFAULT_CHECKPOINTER:
+        checkpointer = create_checkpointer(Configuration.from_runnable_config({}), async_graph=async_nodes)
+
+    return builder.compile(checkpointer=checkpointer)
+
+
+_graph_registry = {}
+_graph_registry_lock = threading.Lock()
+
+
+def get_graph(config: Optional[RunnableConfig] = None, async_nodes: bool = False):
+    """
+    Return the process-wide compiled graph for the checkpointer and fuse_goal_planner
+    settings of a configuration.
+
+    Graphs are built on first use and shared afterwards, so importing this module does not
+    compile anything and runs with the same checkpointer settings share one checkpointer.
+
+    Args:
+        config: Run configuration whose `configurable` values (and environment variables)
+                select the checkpointer and the graph layout. Defaults to the environment only.
+        async_nodes: Return the graph built from the async nodes, see build_graph.
+
+    Returns:
+        The compiled graph.
+    """
+
+    configurable = Configuration.from_runnable_config(config or {})
+    path = configurable.checkpointer_path or os.path.join(configurable.learning_path, "checkpoints.sqlite")
+    key = (
+        async_nodes,
+        configurable.fuse_goal_planner,
+        configurable.checkpointer,
+        os.path.abspath(path) if configurable.checkpointer == "sqlite" else "",
+        configurable.checkpointer_max_threads,
+        configurable.checkpointer_ttl,
+        configurable.checkpointer_evict_finished
+    )
+    with _graph_registry_lock:
+        if key not in _graph_registry:
+            _graph_registry[key] = build_graph(
+                async_nodes=async_nodes,
+                checkpointer=create_checkpointer(configurable, async_graph=async_nodes),
+                fuse_goal_planner=configurable.fuse_goal_planner
+            )
+        return _graph_registry[key]
+
+
+def __getattr__(name: str):
+    "Build `graph` and `async_graph` on first access, for code that imports them directly"
+    if name == "graph":
+        return get_graph()
+    if name == "async_graph":
+        return get_graph(async_nodes=True)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,330 @@
+from langchain_core.prompts import (
+    ChatPromptTemplate,
+    SystemMessagePromptTemplate,
+    HumanMessagePromptTemplate,
+)
+from typing import Optional
+import argparse
+import asyncio
+import logging
+import os
+import threading
+import time
+from ..configuration import Configuration
+from ..learnings import get_learnings_store, get_learnings_journal, get_episode_queue, file_lock
+from ..metrics import attribute_to, record_learning_batch
+from ..utils import get_agent
+from .prompts import (
+    EPISODE_INSIGHTS_SYSTEM_PROMPT_TEMPLATE,
+    LEARNINGS_CONSOLIDATION_SYSTEM_PROMPT_TEMPLATE,
+    BATCH_LEARNING_SYSTEM_PROMPT_TEMPLATE
+)
+from .structs import HistoricalLearnings
+
+
+logger = logging.getLogger(__name__)
+
+
+EPISODE_INSIGHTS_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessagePromptTemplate.from_template(EPISODE_INSIGHTS_SYSTEM_PROMPT_TEMPLATE),
+    HumanMessagePromptTemplate.from_template(
+        template="""
+        ## Episode: \n{newEpisode}\n
+        """
+    ),
+])
+
+LEARNINGS_CONSOLIDATION_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessagePromptTemplate.from_template(LEARNINGS_CONSOLIDATION_SYSTEM_PROMPT_TEMPLATE),
+    HumanMessagePromptTemplate.from_template(
+        template="""
+        ## Historical Learnings: \n{historicalLearnings}\n
+        ## New Insights: \n{newInsights}\n
+        """
+    ),
+])
+
+BATCH_LEARNING_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessagePromptTemplate.from_template(BATCH_LEARNING_SYSTEM_PROMPT_TEMPLATE),
+    HumanMessagePromptTemplate.from_template(
+        template="""
+        ## Historical Learnings: \n{historicalLearnings}\n
+        ## Episodes: \n{newEpisodes}\n
+        """
+    ),
+])
+
+
+def episode_insights_agent(configurable: Configuration):
+    "Return the agent that extracts insights from a single episode, without the historical learnings"
+    return get_agent(
+        provider=configurable.provider,
+        model=configurable.model,
+        temperature=configurable.temperature,
+        prompt=EPISODE_INSIGHTS_PROMPT,
+        output_structure=HistoricalLearnings,
+        prompt_caching=configurable.prompt_caching
+    )
+
+
+def _consolidation_agent(configurable: Configuration):
+    return get_agent(
+        provider=configurable.provider,
+        model=configurable.model,
+        temperature=configurable.temperature,
+        prompt=LEARNINGS_CONSOLIDATION_PROMPT,
+        output_structure=HistoricalLearnings,
+        prompt_caching=configurable.prompt_caching
+    )
+
+
+def _consolidation_lock_path(learning_path: str) -> str:
+    return os.path.join(learning_path, "consolidation")
+
+
+def consolidate_learnings(
+        configurable: Configuration,
+        max_entries: int = 0,
+        blocking: bool = True
+) -> Optional[HistoricalLearnings]:
+    """
+    Fold the learnings journal into the historical learnings with a single LLM call.
+
+    The journal entries read here are removed only after the merged learnings have been
+    saved; entries appended by other episodes in the meantime are kept for the next run.
+
+    Args:
+        configurable: Configuration with the learning path and the LLM settings.
+        max_entries: Maximum number of journal entries to consume, 0 for all of them.
+        blocking: Wait for a consolidation running in another thread or process. If
+                  False, return None immediately when one is running.
+
+    Returns:
+        The updated historical learnings, or None if another consolidation was running.
+    """
+
+    learning_path = configurable.learning_path
+    journal = get_learnings_journal(learning_path)
+    store = get_learnings_store(learning_path)
+
+    with file_lock(_consolidation_lock_path(learning_path), blocking=blocking) as acquired:
+        if not acquired:
+            return None
+
+        entries = journal.read()
+        if max_entries:
+            entries = entries[:max_entries]
+        if not entries:
+            return store.load()
+
+        result = _consolidation_agent(configurable).invoke({
+            "historicalLearnings": store.load_dict(),
+            "newInsights": [entry["insights"] for entry in entries]
+        })
+
+        store.save(result)
+        journal.remove_first(len(entries))
+        return result
+
+
+async def aconsolidate_learnings(
+        configurable: Configuration,
+        max_entries: int = 0,
+        blocking: bool = True
+) -> Optional[HistoricalLearnings]:
+    "Async variant of consolidate_learnings"
+
+    learning_path = configurable.learning_path
+    journal = get_learnings_journal(learning_path)
+    store = get_learnings_store(learning_path)
+
+    with file_lock(_consolidation_lock_path(learning_path), blocking=blocking) as acquired:
+        if not acquired:
+            return None
+
+        entries = await asyncio.to_thread(journal.read)
+        if max_entries:
+            entries = entries[:max_entries]
+        if not entries:
+            return await asyncio.to_thread(store.load)
+
+        result = await _consolidation_agent(configurable).ainvoke({
+            "historicalLearnings": await asyncio.to_thread(store.load_dict),
+            "newInsights": [entry["insights"] for entry in entries]
+        })
+
+        await asyncio.to_thread(store.save, result)
+        await asyncio.to_thread(journal.remove_first, len(entries))
+        return result
+
+
+def _batch_learning_agent(configurable: Configuration):
+    return get_agent(
+        provider=configurable.provider,
+        model=configurable.model,
+        temperature=configurable.temperature,
+        prompt=BATCH_LEARNING_PROMPT,
+        output_structure=HistoricalLearnings,
+        prompt_caching=configurable.prompt_caching
+    )
+
+
+def learn_from_episode_queue(
+        configurable: Configuration,
+        max_episodes: int = 0,
+        full_batches_only: bool = False,
+        blocking: bool = True
+) -> Optional[HistoricalLearnings]:
+    """
+    Merge the queued episodes into the historical learnings, `learning_batch_size` episodes per LLM call.
+
+    Each batch is removed from the queue only after the learnings it produced have been
+    saved, so episodes queued in the meantime and batches of a failed call are kept for
+    the next run. The consolidation lock of the journal mode is held throughout, as both
+    rewrite the same learnings file.
+
+    Args:
+        configurable: Configuration with the learning path, the batch size and the LLM settings.
+        max_episodes: Maximum number of queued episodes to consume, 0 for all of them.
+        full_batches_only: Leave a last batch smaller than `learning_batch_size` in the queue.
+        blocking: Wait for a consolidation running in another thread or process. If
+                  False, return None immediately when one is running.
+
+    Returns:
+        The updated historical learnings, or None if another consolidation was running.
+    """
+
+    learning_path = configurable.learning_path
+    queue = get_episode_queue(learning_path)
+    store = get_learnings_store(learning_path)
+
+    with file_lock(_consolidation_lock_path(learning_path), blocking=blocking) as acquired:
+        if not acquired:
+            return None
+
+        consumed = 0
+        while not max_episodes or consumed < max_episodes:
+            entries = queue.read()
+            batch_size = configurable.learning_batch_size or len(entries)
+            batch = entries[:min(batch_size, max_episodes - consumed) if max_episodes else batch_size]
+            if not batch or (full_batches_only and len(batch) < batch_size):
+                break
+
+            started = time.perf_counter()
+            try:
+                with attribute_to("batch_learner", configurable.metrics_path):
+                    result = _batch_learning_agent(configurable).invoke({
+                        "historicalLearnings": store.load_dict(),
+                        "newEpisodes": batch
+                    })
+            except Exception:
+                record_learning_batch(len(batch), time.perf_counter() - started, error=True)
+                raise
+            record_learning_batch(len(batch), time.perf_counter() - started)
+
+            store.save(result)
+            queue.remove_first(len(batch))
+            consumed += len(batch)
+
+        return store.load()
+
+
+class BatchLearner:
+    """
+    Runs learn_from_episode_queue in a background thread, off the critical path of the episodes.
+
+    notify() is called after an episode was queued and wakes the thread, which then
+    merges every full batch of `learning_batch_size` episodes. With a positive
+    `learning_batch_interval` the thread also wakes up on that schedule and merges all
+    queued episodes, including a last partial batch.
+
+    The queue is persisted, so nothing is lost when the process exits with episodes still
+    queued: they are picked up by the next run, flush() or
+    `python -m src.agent.learner batch`. A failed background run is logged and its error
+    is kept in `error`; its episodes stay queued and are retried on the next wake-up.
+    """
+
+    def __init__(self, configurable: Configuration):
+        self.configurable = configurable
+        self.error: Optional[BaseException] = None
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="batch-learner", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        "Tell the background thread that an episode was queued"
+        self._wake.set()
+
+    def flush(self) -> Optional[HistoricalLearnings]:
+        "Merge every queued episode now, in the calling thread, waiting for a background run to finish first"
+        return learn_from_episode_queue(self.configurable)
+
+    def _run(self):
+        interval = self.configurable.learning_batch_interval or None
+        while True:
+            notified = self._wake.wait(timeout=interval)
+            self._wake.clear()
+            try:
+                learn_from_episode_queue(self.configurable, full_batches_only=notified)
+                self.error = None
+            except Exception as e:
+                self.error = e
+                logger.exception(
+                    "Batch learning from the episode queue in %s failed; the episodes stay queued",
+                    self.configurable.learning_path
+                )
+
+
+_batch_learner_registry = {}
+_batch_learner_registry_lock = threading.Lock()
+
+
+def get_batch_learner(configurable: Configuration) -> BatchLearner:
+    "Return the process-wide BatchLearner for the learning path, LLM and batch settings of a configuration"
+    key = (
+        os.path.abspath(configurable.learning_path),
+        configurable.provider,
+        configurable.model,
+        float(configurable.temperature),
+        configurable.learning_batch_size,
+        configurable.learning_batch_interval,
+        configurable.metrics_path
+    )
+    with _batch_learner_registry_lock:
+        if key not in _batch_learner_registry:
+            _batch_learner_registry[key] = BatchLearner(configurable)
+        return _batch_learner_registry[key]
+
+
+def flush_batch_learners():
+    "Merge the episodes queued by every batch learner of the process, e.g. at the end of a batch run"
+    with _batch_learner_registry_lock:
+        learners = list(_batch_learner_registry.values())
+    for learner in learners:
+        learner.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the historical learnings of the dungeon guardian.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    consolidate = subparsers.add_parser("consolidate", help="fold the learnings journal into the historical learnings")
+    consolidate.add_argument("--max-entries", type=int, default=0, help="journal entries to consume, 0 for all")
+    batch = subparsers.add_parser("batch", help="merge the queued episodes into the historical learnings")
+    batch.add_argument("--max-episodes", type=int, default=0, help="queued episodes to consume, 0 for all")
+    args = parser.parse_args()
+
+    configurable = Configuration.from_runnable_config({})
+
+    if args.command == "consolidate":
+        pending = len(get_learnings_journal(configurable.learning_path))
+        consolidate_learnings(configurable, max_entries=args.max_entries)
+        print(f"Consolidated {min(pending, args.max_entries or pending)} journal entries into {configurable.learning_path}")
+
+    if args.command == "batch":
+        pending = len(get_episode_queue(configurable.learning_path))
+        learn_from_episode_queue(configurable, max_episodes=args.max_episodes)
+        print(f"Learned from {min(pending, args.max_episodes or pending)} queued episodes into {configurable.learning_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,97 @@
-from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from typing import Union
+from langchain_core.messages import SystemMessage
 from langchain_core.prompts import (
     ChatPromptTemplate, 
     SystemMessagePromptTemplate, 
     HumanMessagePromptTemplate,
 )
-from langchain_core.messages import SystemMessage
 from .states import AgentState
 from ..configuration import Configuration
-from ..utils import init_llm, create_agent, check_failure_conditions, check_success_conditions
+from ..utils import get_agent, check_success_conditions, execute_action_sequence
 from .prompts import (
     GOAL_GENERATOR_SYSTEM_PROMPT_TEMPLATE,
     PLANNER_SYSTEM_PROMPT_TEMPLATE,
+    GOAL_PLANNER_SYSTEM_PROMPT_TEMPLATE,
     FAILURE_ANALYSIS_SYSTEM_PROMPT_TEMPLATE
 )
 from ..type import Goal
 from .structs import (
     GoalGeneratorResponse,
     PlannerResponse,
+    GoalPlanResponse,
     HistoricalLearnings
 )
 import os
-from ..action import action_descriptions, actions_dict, action_failure_probability
+import asyncio
+import time
+from ..action import action_descriptions
+from ..planner import plan_for_goals, validate_plan, score_plan, parse_goal, goals_satisfied
+from ..policy_index import get_policy_index
+from ..goal_policy import rule_based_goals
+from ..metrics import time_action_execution, record_plan_candidates, record_goal_decision, record_loop_detection
+from ..checkpoint import mark_thread_finished
+from ..episode_log import write_episode_file, get_episode_log_writer
+from ..cache import get_response_cache, cached_invoke, acached_invoke
+from ..learnings import get_learnings_store, get_learnings_journal, get_episode_queue
+from .context import build_episode_context, split_iterations, summarize_iteration
+from .progress import progress_view, iteration_fingerprint, detect_loop
+from .learner import episode_insights_agent, consolidate_learnings, aconsolidate_learnings, get_batch_learner
 import json
-import random
+
+
+# Prompt templates are static so that the pooled agents built from them can be reused
+# across calls; everything that changes per call is passed as a template variable.
+#
+# The first system message of every prompt is a fixed string, rendered once here, so
+# that it is byte-identical across calls and providers can cache it as a prompt prefix
+# (see init_llm). The variable parts follow from the slowest to the fastest changing:
+# learnings (per episode), the episode history (append-only with the full context
+# strategy) and finally the current world state.
+
+PLANNER_SYSTEM_PROMPT = PLANNER_SYSTEM_PROMPT_TEMPLATE.format(actions=action_descriptions, goals=Goal._member_names_)
+
+GOAL_GENERATOR_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessage(GOAL_GENERATOR_SYSTEM_PROMPT_TEMPLATE),
+    SystemMessagePromptTemplate.from_template("## Learnings from past failures: \n{historicalLearnings}\n"),
+    SystemMessagePromptTemplate.from_template("{episodeMessages}"),
+    HumanMessagePromptTemplate.from_template(
+        template = """
+        ## Current world state: \n{currentWorldState}\n
+        """
+    )
+])
+
+PLANNER_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessage(PLANNER_SYSTEM_PROMPT),
+    HumanMessagePromptTemplate.from_template(
+        template="""
+        ## Action failure reasons: \n{actionFailureSuggestions}\n
+        ## Current world state:\n{currentWorldState}\n
+        """
+    )
+])
+
+GOAL_PLANNER_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessage(GOAL_PLANNER_SYSTEM_PROMPT_TEMPLATE.format(actions=action_descriptions, goals=Goal._member_names_)),
+    SystemMessagePromptTemplate.from_template("## Learnings from past failures: \n{historicalLearnings}\n"),
+    SystemMessagePromptTemplate.from_template("{episodeMessages}"),
+    HumanMessagePromptTemplate.from_template(
+        template = """
+        ## Current world state: \n{currentWorldState}\n
+        """
+    )
+])
+
+FAILURE_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessagePromptTemplate.from_template(FAILURE_ANALYSIS_SYSTEM_PROMPT_TEMPLATE),
+    HumanMessagePromptTemplate.from_template(
+        template="""
+        ## Historical Learnings: \n{historicalLearnings}\n
+        ## New Episode: \n{newEpisode}\n
+        """
+    ),
+])
 
 
 
@@ -33,6 +102,11 @@ def goal_generator_node(state: AgentState, config: RunnableConfig) -> AgentState
     This node is responsible for analyzing the current world state and past failure experiences
     to generate appropriate primary and secondary goals for the agent. It loads historical
     learnings from previous failures to inform better goal setting and decision making.
+
+    Depending on `goal_mode`, the goals come from the LLM ("llm"), from the rule-based
+    goal policy ("rules"), or from the policy with the LLM as an escalation when its
+    confidence is below `goal_confidence_threshold` or an action of the previous
+    iteration failed ("hybrid").
     
     Args:
         state (AgentState): The current state of the agent containing world state, messages,
@@ -47,48 +121,146 @@ def goal_generator_node(state: AgentState, config: RunnableConfig) -> AgentState
             - primaryGoal: Generated primary objective for the agent
             - secondaryGoal: Generated secondary objective for the agent
             - goalJustification: Reasoning behind the generated goals
+            - goalSource: "rules" or "llm", whichever picked the goals
     """
     
     configurable = Configuration.from_runnable_config(config)
-    learning_path = configurable.learning_path
 
-    if os.path.exists(os.path.join(learning_path, "historical_learnings.json")):
-        with open(os.path.join(learning_path, "historical_learnings.json"), "r") as f:
-            historical_learnings = json.load(f)
-    else:
-        historical_learnings = {}
+    result = _rule_based_goals(state, configurable)
+    if result is not None:
+        return _goal_generator_update(state, result, source="rules")
+
+    historical_learnings = get_learnings_store(configurable.learning_path).load_dict()
+
+    goal_generator_agent = _goal_generator_agent(configurable)
+    result = _invoke_agent(goal_generator_agent, _goal_generator_inputs(state, historical_learnings, configurable), configurable, GoalGeneratorResponse)
+
+    return _goal_generator_update(state, result)
+
+
+
+async def agoal_generator_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    "Async variant of goal_generator_node that awaits the LLM call and reads learnings off the event loop"
+
+    configurable = Configuration.from_runnable_config(config)
+
+    result = _rule_based_goals(state, configurable)
+    if result is not None:
+        return _goal_generator_update(state, result, source="rules")
+
+    historical_learnings = await asyncio.to_thread(get_learnings_store(configurable.learning_path).load_dict)
+
+    goal_generator_agent = _goal_generator_agent(configurable)
+    result = await _ainvoke_agent(goal_generator_agent, _goal_generator_inputs(state, historical_learnings, configurable), configurable, GoalGeneratorResponse)
+
+    return _goal_generator_update(state, result)
+
+
+def _response_cache(configurable: Configuration):
+    return get_response_cache(
+        configurable.response_cache,
+        path=configurable.response_cache_path or os.path.join(configurable.learning_path, "response_cache.sqlite"),
+        max_entries=configurable.response_cache_max_entries,
+        ttl=configurable.response_cache_ttl
+    )
+
+
+def _invoke_agent(agent, inputs: dict, configurable: Configuration, output_structure):
+    "Invoke an agent, going through the response cache when one is configured"
+    cache = _response_cache(configurable)
+    if cache is None:
+        return agent.invoke(inputs)
+    return cached_invoke(
+        agent, inputs, cache,
+        configurable.provider, configurable.model, configurable.temperature, output_structure
+    )
 
-    llm = init_llm(
+
+async def _ainvoke_agent(agent, inputs: dict, configurable: Configuration, output_structure):
+    "Async variant of _invoke_agent"
+    cache = _response_cache(configurable)
+    if cache is None:
+        return await agent.ainvoke(inputs)
+    return await acached_invoke(
+        agent, inputs, cache,
+        configurable.provider, configurable.model, configurable.temperature, output_structure
+    )
+
+
+def _goal_generator_agent(configurable: Configuration):
+    return get_agent(
         provider=configurable.provider,
         model=configurable.model,
-        temperature=configurable.temperature
+        temperature=configurable.temperature,
+        prompt=GOAL_GENERATOR_PROMPT,
+        output_structure=GoalGeneratorResponse,
+        prompt_caching=configurable.prompt_caching
     )
 
-    goal_generator_system_prompt = ChatPromptTemplate.from_messages([
-        SystemMessagePromptTemplate.from_template(GOAL_GENERATOR_SYSTEM_PROMPT_TEMPLATE),
-        SystemMessage(content=json.dumps(state['messages'])),
-        HumanMessagePromptTemplate.from_template(
-            template = """
-            ## Current world state: \n{currentWorldState}\n
-            ## Learnings from past failures: \n{historicalLearnings}\n
-            """
+
+def _goal_generator_inputs(state: AgentState, historical_learnings: dict, configurable: Configuration) -> dict:
+    if configurable.context_strategy not in ("full", "window"):
+        raise ValueError(f"Unknown context_strategy '{configurable.context_strategy}'. Must be one of 'full' or 'window'.")
+
+    if configurable.context_strategy == "window":
+        episode_messages = build_episode_context(
+            state['messages'],
+            keep_iterations=configurable.context_keep_iterations,
+            token_budget=configurable.context_token_budget
         )
-    ])
+    else:
+        episode_messages = json.dumps(state['messages'])
+
+    return {
+        **state,
+        "episodeMessages": episode_messages,
+        "historicalLearnings": historical_learnings
+    }
+
+
+def _rule_based_goals(state: AgentState, configurable: Configuration) -> Union[GoalGeneratorResponse, None]:
+    """
+    Goals from the rule-based goal policy, or None when the LLM has to pick them.
+
+    Every decision of the policy is recorded with record_goal_decision, including the
+    reason when "hybrid" escalates to the LLM, so the escalation rate shows in the metrics.
+    """
+    if configurable.goal_mode not in ("llm", "rules", "hybrid"):
+        raise ValueError(f"Unknown goal_mode '{configurable.goal_mode}'. Must be one of 'llm', 'rules' or 'hybrid'.")
+
+    if configurable.goal_mode == "llm":
+        return None
 
-    goal_generator_agent = create_agent(
-        llm=llm,
-        prompt=goal_generator_system_prompt,
-        output_structure=GoalGeneratorResponse
+    decision = rule_based_goals(state["currentWorldState"])
+    escalation = None
+    if configurable.goal_mode == "hybrid":
+        if state.get("actionFailed"):
+            escalation = "action_failed"
+        elif state.get("loopAction") == "reset":
+            escalation = "strategy_reset"
+        elif decision.confidence < configurable.goal_confidence_threshold:
+            escalation = "low_confidence"
+    record_goal_decision(decision.confidence, escalation)
+    if escalation:
+        return None
+
+    return GoalGeneratorResponse(
+        primaryGoal=decision.primary_goal.value,
+        secondaryGoal=decision.secondary_goal.value,
+        goalJustification=f"{decision.justification} (rule-based, confidence {decision.confidence:.2f})"
     )
 
-    result = goal_generator_agent.invoke({**state, "historicalLearnings": historical_learnings})
 
+def _goal_generator_update(state: AgentState, result: GoalGeneratorResponse, source: str = "llm") -> AgentState:
     return {
         "messages": [
             {"worldState": state["currentWorldState"]},
             {"goalGenerator": {**result.model_dump()}}
         ],
         "currentWorldState": state["currentWorldState"],
+        "planRepairs": 0,
+        "iterationStartedAt": time.time(),
+        "goalSource": source,
         **result.model_dump()
     }
 
@@ -102,6 +274,12 @@ def planner_node(state: AgentState, config: RunnableConfig) -> AgentState:
     the agent's primary and secondary goals, and any previous action failure suggestions.
     It uses a language model to generate a sequence of actions that should help the
     agent achieve its objectives while considering past failures.
+
+    Depending on `planner_mode`, the plan comes from the LLM ("llm"), from the symbolic
+    A* planner over the action preconditions and effects ("symbolic"), or from the
+    symbolic planner with the LLM as a fallback when no plan is found ("hybrid").
+    With `plan_candidates` above 1, the LLM is asked for that many plans concurrently
+    and the best one according to a dry run (score_plan) is kept.
     
     Args:
         state (AgentState): The current state of the agent containing:
@@ -109,49 +287,285 @@ def planner_node(state: AgentState, config: RunnableConfig) -> AgentState:
             - primaryGoal: The agent's primary objective
             - secondaryGoal: The agent's secondary objective
             - actionFailureSuggestions: Suggestions from previous action failures
-        config (RunnableConfig): Configuration containing LLM provider settings
+        config (RunnableConfig): Configuration containing LLM provider settings and planner mode
     
     Returns:
         AgentState: Updated state containing:
             - messages: List with the planner's response added
             - actionSequence: Generated sequence of actions to execute
             - plannerJustification: Reasoning behind the generated plan
+            - planCandidates: The dry run results of the candidate plans, if any
     """
     
     configurable = Configuration.from_runnable_config(config)
-    
-    llm = init_llm(
+
+    update = _symbolic_planner_update(state, configurable)
+    if update is not None:
+        return update
+
+    candidates = []
+    planner_agent = _planner_agent(configurable, state, candidates)
+    result = _invoke_agent(planner_agent, state, configurable, PlannerResponse)
+
+    return _planner_update(result, candidates)
+
+
+
+async def aplanner_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    "Async variant of planner_node that awaits the LLM call and runs the symbolic planner in a worker thread"
+
+    configurable = Configuration.from_runnable_config(config)
+
+    update = await asyncio.to_thread(_symbolic_planner_update, state, configurable)
+    if update is not None:
+        return update
+
+    candidates = []
+    planner_agent = _planner_agent(configurable, state, candidates)
+    result = await _ainvoke_agent(planner_agent, state, configurable, PlannerResponse)
+
+    return _planner_update(result, candidates)
+
+
+def goal_planner_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """
+    Generate the goals and the action sequence for them in a single LLM call.
+
+    This node replaces the goal_generator -> planner chain when `fuse_goal_planner` is
+    set, saving one LLM round-trip per iteration. The response schema extends both
+    GoalGeneratorResponse and PlannerResponse, and the state and messages are updated
+    exactly as the two nodes would update them. With a `planner_mode` other than "llm"
+    the plan does not come from the LLM, and when the rule-based goal policy picks the
+    goals (see `goal_mode`) there is nothing to fuse, so the node runs the goal generator
+    and the planner one after the other instead.
+
+    Args:
+        state (AgentState): The current state of the agent, as for goal_generator_node.
+        config (RunnableConfig): Configuration containing LLM provider settings and planner mode
+
+    Returns:
+        AgentState: The updates of goal_generator_node and planner_node combined.
+    """
+
+    configurable = Configuration.from_runnable_config(config)
+
+    result = _rule_based_goals(state, configurable)
+    if result is not None:
+        goal_update = _goal_generator_update(state, result, source="rules")
+        return _combine_updates(goal_update, planner_node({**state, **goal_update}, config))
+
+    historical_learnings = get_learnings_store(configurable.learning_path).load_dict()
+    inputs = _goal_generator_inputs(state, historical_learnings, configurable)
+
+    if configurable.planner_mode != "llm":
+        result = _invoke_agent(_goal_generator_agent(configurable), inputs, configurable, GoalGeneratorResponse)
+        goal_update = _goal_generator_update(state, result)
+        return _combine_updates(goal_update, planner_node({**state, **goal_update}, config))
+
+    result = _invoke_agent(_goal_planner_agent(configurable), inputs, configurable, GoalPlanResponse)
+    return _goal_planner_update(state, result)
+
+
+async def agoal_planner_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    "Async variant of goal_planner_node"
+
+    configurable = Configuration.from_runnable_config(config)
+
+    result = _rule_based_goals(state, configurable)
+    if result is not None:
+        goal_update = _goal_generator_update(state, result, source="rules")
+        return _combine_updates(goal_update, await aplanner_node({**state, **goal_update}, config))
+
+    historical_learnings = await asyncio.to_thread(get_learnings_store(configurable.learning_path).load_dict)
+    inputs = _goal_generator_inputs(state, historical_learnings, configurable)
+
+    if configurable.planner_mode != "llm":
+        result = await _ainvoke_agent(_goal_generator_agent(configurable), inputs, configurable, GoalGeneratorResponse)
+        goal_update = _goal_generator_update(state, result)
+        return _combine_updates(goal_update, await aplanner_node({**state, **goal_update}, config))
+
+    result = await _ainvoke_agent(_goal_planner_agent(configurable), inputs, configurable, GoalPlanResponse)
+    return _goal_planner_update(state, result)
+
+
+def _goal_planner_agent(configurable: Configuration):
+    return get_agent(
         provider=configurable.provider,
         model=configurable.model,
-        temperature=configurable.temperature
+        temperature=configurable.temperature,
+        prompt=GOAL_PLANNER_PROMPT,
+        output_structure=GoalPlanResponse,
+        prompt_caching=configurable.prompt_caching
     )
-    
-    planner_system_prompt = ChatPromptTemplate.from_messages([
-        SystemMessagePromptTemplate.from_template(PLANNER_SYSTEM_PROMPT_TEMPLATE),
-        HumanMessagePromptTemplate.from_template(
-            template="""
-            ## Current world state:\n{currentWorldState}\n
-            ## Goals: \n{goals}\n
-            ## Action failure reasons: \n{actionFailureSuggestions}\n
-            """
-        )
-    ])
 
-    planner_agent = create_agent(
-        llm=llm,
-        prompt=planner_system_prompt,
-        output_structure=PlannerResponse
+
+def _goal_planner_update(state: AgentState, result: GoalPlanResponse) -> AgentState:
+    "Split a fused response into the updates of the goal generator and the planner"
+    values = result.model_dump()
+    return _combine_updates(
+        _goal_generator_update(state, GoalGeneratorResponse.model_validate(
+            {name: values[name] for name in GoalGeneratorResponse.model_fields}
+        )),
+        _planner_update(PlannerResponse.model_validate(
+            {name: values[name] for name in PlannerResponse.model_fields}
+        ))
+    )
+
+
+def _combine_updates(goal_update: AgentState, plan_update: AgentState) -> AgentState:
+    return {**goal_update, **plan_update, "messages": goal_update["messages"] + plan_update["messages"]}
+
+
+def _symbolic_planner_update(state: AgentState, configurable: Configuration) -> Union[AgentState, None]:
+    "Plan with the symbolic planner, returning None when the LLM planner should be used instead"
+
+    if configurable.planner_mode not in ("symbolic", "llm", "hybrid"):
+        raise ValueError(f"Unknown planner_mode '{configurable.planner_mode}'. Must be one of 'symbolic', 'llm' or 'hybrid'.")
+
+    if configurable.planner_mode == "llm":
+        return None
+
+    if configurable.policy_index_path:
+        action_sequence = get_policy_index(configurable.policy_index_path).plan(state["currentWorldState"])
+        if action_sequence is not None and _plan_meets_goals(state, action_sequence):
+            return _planner_update(PlannerResponse(
+                actionSequence=action_sequence,
+                plannerJustification="Optimal action sequence looked up in the precomputed policy index."
+            ))
+
+    action_sequence, planner_justification = plan_for_goals(
+        state["currentWorldState"],
+        state.get("primaryGoal"),
+        state.get("secondaryGoal")
+    )
+
+    if action_sequence is None and configurable.planner_mode == "hybrid":
+        return None
+
+    return _planner_update(PlannerResponse(
+        actionSequence=action_sequence or [],
+        plannerJustification=planner_justification
+    ))
+
+
+def _plan_meets_goals(state: AgentState, action_sequence: list) -> bool:
+    """
+    Check that a plan from the policy index ends in a world state where the primary goal
+    holds, or the secondary goal if the primary one is unknown, so the index never
+    executes a plan that contradicts the goals the goal generator just picked.
+    """
+    goals = [goal for goal in (parse_goal(state.get("primaryGoal")), parse_goal(state.get("secondaryGoal"))) if goal][:1]
+    predicted = validate_plan(state["currentWorldState"], action_sequence)["predictedWorldState"]
+    return goals_satisfied(predicted, goals)
+
+
+def _planner_agent(configurable: Configuration, state: AgentState, candidates: list):
+    """
+    The planner agent, answering with the best of `plan_candidates` plans when that is above 1.
+
+    The candidates are requested concurrently from the model with the same rendered
+    prompt, scored with score_plan against the current world state and goals, and their
+    dry run results are appended to `candidates`. With a response cache only the chosen
+    plan is cached.
+    """
+
+    planner_agent = get_agent(
+        provider=configurable.provider,
+        model=configurable.model,
+        temperature=configurable.temperature,
+        prompt=PLANNER_PROMPT,
+        output_structure=PlannerResponse,
+        prompt_caching=configurable.prompt_caching
     )
+    count = configurable.plan_candidates
+    if count <= 1:
+        return planner_agent
+
+    def best(results: list) -> PlannerResponse:
+        responses = [result for result in results if not isinstance(result, Exception)]
+        if not responses:
+            raise results[0]
+
+        scored = [
+            score_plan(state["currentWorldState"], response.actionSequence, state.get("primaryGoal"), state.get("secondaryGoal"))
+            for response in responses
+        ]
+        chosen = max(range(len(responses)), key=lambda i: scored[i]["score"])
+        candidates.extend(
+            {"actionSequence": response.actionSequence, **{key: value for key, value in score.items() if key != "score"}}
+            for response, score in zip(responses, scored)
+        )
+        record_plan_candidates(len(results), sum(score["valid"] for score in scored), chosen)
+        return responses[chosen]
+
+    def generate(prompt_value):
+        return best(planner_agent.llm.batch([prompt_value] * count, {"max_concurrency": count}, return_exceptions=True))
+
+    async def agenerate(prompt_value):
+        return best(await planner_agent.llm.abatch([prompt_value] * count, return_exceptions=True))
 
-    result = planner_agent.invoke({**state, "actions": action_descriptions, "goals": Goal._member_names_})
+    return planner_agent._replace(llm=RunnableLambda(generate, afunc=agenerate))
 
+
+def _planner_update(result: PlannerResponse, candidates: list = None) -> AgentState:
     return {
         "messages": [{"planner": {**result.model_dump()}}],
+        "planCandidates": candidates or [],
         **result.model_dump()
     }
 
 
 
+def plan_validator_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """
+    Dry-run the planned action sequence before it is executed.
+
+    The plan is simulated against a copy of the current world state. If an action's
+    preconditions would not be met, or it would trigger a game failure, the plan is sent
+    back to the planner with the first invalid step as an action failure suggestion, at
+    most `plan_max_repairs` times per iteration. Otherwise it goes on to the executor.
+
+    Args:
+        state (AgentState): The current state of the agent containing:
+            - currentWorldState: Current state of the game world
+            - actionSequence: List of action names to validate
+            - planRepairs: Number of repairs already requested in this iteration
+        config (RunnableConfig): Configuration containing the repair limit
+
+    Returns:
+        AgentState: Updated state containing:
+            - messages: List with the validation result
+            - planValidation: The result of validate_plan
+            - planNeedsRepair: True if the plan should go back to the planner
+            - planRepairs: Updated number of repairs
+            - actionFailureSuggestions: Suggestions extended with the invalid step, on repair
+    """
+
+    configurable = Configuration.from_runnable_config(config)
+
+    validation = validate_plan(state["currentWorldState"], state["actionSequence"])
+    repairs = state.get("planRepairs", 0)
+    needs_repair = not validation["valid"] and repairs < configurable.plan_max_repairs
+
+    update = {
+        "messages": [{"planValidator": validation}],
+        "planValidation": validation,
+        "planNeedsRepair": needs_repair,
+        "planRepairs": repairs + 1 if needs_repair else repairs
+    }
+
+    if needs_repair:
+        update["actionFailureSuggestions"] = "\n".join(filter(None, [
+            state.get("actionFailureSuggestions"),
+            f"The plan {state['actionSequence']} is invalid: step {validation['invalidStep'] + 1} "
+            f"({validation['invalidAction']}) cannot be executed because {validation['reason']}. "
+            f"The world state before that step would be {json.dumps(validation['predictedWorldState'])}."
+        ]))
+
+    return update
+
+
+
 def action_executor_node(state: AgentState, config: RunnableConfig) -> AgentState:
     """
     Execute a sequence of actions and update the world state accordingly.
@@ -183,93 +597,49 @@ def action_executor_node(state: AgentState, config: RunnableConfig) -> AgentStat
             - failureOccurred: Boolean indicating if game failure occurred
             - failureReason: Description of failure if one occurred
             - actionFailed: Boolean indicating if any action failed to execute
+            - iterationRecords: The flat record of this iteration for the episode log
+            - iterationFingerprints: The hash of the world state and plan of this iteration
+            - stagnantIterations: Consecutive iterations after which the world state was unchanged
     """
     
-    previous_world_state = state["currentWorldState"]
-    current_world_state = state["currentWorldState"].copy()
-    action_sequence = state["actionSequence"]
-    
-    executed_actions = []
-    failure_occurred = False
-    failure_reason = ""
-    action_failed = False
-
-    game_message = ""
-
-    for action_name in action_sequence:
-
-        # Handle action failure due to probability
-        action_failure_probability_object = action_failure_probability.get(action_name, None)
-        if action_failure_probability_object:
-            if (random.random() < action_failure_probability_object["probability"]):
-                action_failed = True
-                game_message += f"Action {action_name} failed because of the following reason: {action_failure_probability_object['reason']}\n"
-                game_message += f"Executed actions: {executed_actions}"
-                for key, value in action_failure_probability_object["effects"].items():
-                    current_world_state[key] = value(current_world_state)
-
-                return {
-                    "messages": [
-                        {"gameMessage": game_message}
-                    ],
-                    "currentWorldState": current_world_state,
-                    "previousWorldState": previous_world_state,
-                    "failureOccurred": failure_occurred,
-                    "failureReason": failure_reason,
-                    "actionFailed": action_failed,
-                }
-
-
-        action_obj = actions_dict[action_name]
-        preconditions_met = True
-        
-        for precondition in action_obj["preconditions"]:
-            if not precondition(current_world_state):
-                preconditions_met = False
-                game_message += f"Action {action_name} failed because precondition is not met.\n"
-                action_failed = True
-                break
-
-        if preconditions_met:
-            for key, value in action_obj["effects"].items():
-                current_world_state[key] = value(current_world_state)
-            
-            executed_actions.append(action_name)
-            
-            # Handle game failure due to failure conditions
-            is_failed, reason = check_failure_conditions(current_world_state)
-            if is_failed:
-                failure_occurred = True
-                failure_reason = reason
-                game_message += f"You have failed due to the following reason: {reason}.\nPlease try again."
-
-                return {
-                    "messages": [
-                        {"gameMessage": game_message}
-                    ],
-                    "currentWorldState": previous_world_state,
-                    "previousWorldState": previous_world_state,
-                    "failureOccurred": failure_occurred,
-                    "failureReason": failure_reason,
-                    "actionFailed": action_failed,
-                }
-                
-        else:
-            continue
-
-    game_message += f"No game failure occurred.\n"
-    game_message += f"Executed actions: {executed_actions}"
+    with time_action_execution() as timing:
+        result = execute_action_sequence(state["currentWorldState"], state["actionSequence"])
+        timing["actions"] = len(result["executedActions"])
 
+    iteration_record = {
+        "iteration": state.get("iterations", 0) + 1,
+        "worldState": state["currentWorldState"],
+        "primaryGoal": state["primaryGoal"],
+        "secondaryGoal": state["secondaryGoal"],
+        "goalSource": state.get("goalSource"),
+        "actionSequence": state["actionSequence"],
+        "executedActions": result["executedActions"],
+        "failedActions": result["failedActions"],
+        "actionFailed": result["actionFailed"],
+        "failureOccurred": result["failureOccurred"],
+        "failureReason": result["failureReason"],
+        "planValid": state.get("planValidation", {}).get("valid"),
+        "planRepairs": state.get("planRepairs", 0),
+        "planCandidates": len(state.get("planCandidates") or []),
+        "executionSeconds": timing["seconds"],
+        "iterationSeconds": time.time() - state["iterationStartedAt"] if state.get("iterationStartedAt") else None
+    }
 
     return {
         "messages": [
-            {"gameMessage": game_message}
+            {"gameMessage": result["gameMessage"]}
         ],
-        "currentWorldState": current_world_state,
-        "previousWorldState": previous_world_state,
-        "failureOccurred": failure_occurred,
-        "failureReason": failure_reason,
-        "actionFailed": action_failed,
+        "currentWorldState": result["currentWorldState"],
+        "previousWorldState": state["currentWorldState"],
+        "failureOccurred": result["failureOccurred"],
+        "failureReason": result["failureReason"],
+        "actionFailed": result["actionFailed"],
+        "iterationRecords": [iteration_record],
+        "iterationFingerprints": [iteration_fingerprint(state["currentWorldState"], state["actionSequence"])],
+        "stagnantIterations": (
+            state.get("stagnantIterations", 0) + 1
+            if progress_view(result["currentWorldState"]) == progress_view(state["currentWorldState"]) else 0
+        ),
     }
     
 
@@ -281,6 +651,14 @@ def check_success_conditions_node(state: AgentState, config: RunnableConfig) ->
     This node evaluates the current world state to determine if the agent has successfully
     completed its mission. It also handles iteration limits and provides appropriate
     game messages based on the outcome.
+
+    While the episode goes on, it also checks whether the episode is going in circles:
+    the same plan chosen from the same world state `loop_repeats` times (a cycle) or a
+    world state that no plan changed for `loop_stagnation_iterations` iterations
+    (stagnation), both judged on the progress view of the world state, without
+    stamina and comfyActions. Depending on `loop_action`, a detected loop is only recorded ("none"),
+    answered with a strategy reset ("reset", at most `loop_max_resets` times per
+    episode, after which the episode is stopped) or ends the episode ("terminate").
     
     Args:
         state (AgentState): The current state of the agent containing world state,
@@ -293,6 +671,8 @@ def check_success_conditions_node(state: AgentState, config: RunnableConfig) ->
             - messages: Game message indicating success, continuation, or timeout
             - successOccurred: Boolean indicating if success conditions were met
             - endReason: String describing why the game ended (success message or timeout)
+            - loopDetected: "cycle", "stagnation" or an empty string
+            - loopAction: "reset" or "terminate" if success_router has to act on the loop
     """
 
     configurable = Configuration.from_runnable_config(config)
@@ -329,6 +709,29 @@ def check_success_conditions_node(state: AgentState, config: RunnableConfig) ->
                 "iterationsLimitReached": iterations_limit_reached
             }
         
+        loop_detected = detect_loop(
+            state.get("iterationFingerprints", []),
+            state.get("stagnantIterations", 0),
+            configurable.loop_repeats,
+            configurable.loop_stagnation_iterations
+        )
+        loop_action = _loop_action(state, configurable) if loop_detected else ""
+        if loop_detected:
+            record_loop_detection(loop_detected, loop_action or "none")
+
+        if loop_action == "terminate":
+            return {
+                "messages": [
+                    {"gameMessage": f"The game has been stopped because {LOOP_DESCRIPTIONS[loop_detected]}."}
+                ],
+                "successOccurred": is_successful,
+                "endReason": f"The game has been stopped because {LOOP_DESCRIPTIONS[loop_detected]}.",
+                "iterations": iterations,
+                "iterationsLimitReached": iterations_limit_reached,
+                "loopDetected": loop_detected,
+                "loopAction": loop_action
+            }
+
         game_message += f"The game is still running. Please continue.\n"
         return {
             "messages": [
@@ -337,8 +740,58 @@ def check_success_conditions_node(state: AgentState, config: RunnableConfig) ->
             "successOccurred": is_successful,
             "endReason": success_msg,
             "iterations": iterations,
-            "iterationsLimitReached": iterations_limit_reached
+            "iterationsLimitReached": iterations_limit_reached,
+            "loopDetected": loop_detected,
+            "loopAction": loop_action
         }
+
+
+LOOP_DESCRIPTIONS = {
+    "cycle": "the same plan keeps being chosen from the same world state",
+    "stagnation": "the world state has stopped making progress"
+}
+
+
+def _loop_action(state: AgentState, configurable: Configuration) -> str:
+    if configurable.loop_action == "reset":
+        return "reset" if state.get("strategyResets", 0) < configurable.loop_max_resets else "terminate"
+    if configurable.loop_action == "terminate":
+        return "terminate"
+    return ""
+
+
+def strategy_reset_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """
+    Break a loop that check_success_conditions_node detected before the next iteration starts.
+
+    The node adds a game message to the episode history that the goal generator sees,
+    saying that the current strategy is not working, so that the LLM picks different
+    goals and a different plan. With goal_mode
+    "hybrid" the next goals are escalated to the LLM even if the rule-based policy is
+    confident.
+
+    Args:
+        state (AgentState): The current state of the agent, with loopDetected set.
+        config (RunnableConfig): Configuration object (unused).
+
+    Returns:
+        AgentState: Updated state containing:
+            - messages: Game message asking for a new strategy
+            - strategyResets: Number of strategy resets in this episode
+            - stagnantIterations: Reset to 0
+    """
+
+    message = (
+        f"Strategy reset: {LOOP_DESCRIPTIONS[state['loopDetected']]}. "
+        "The previous goals and plans are not making progress; choose different goals and a different plan."
+    )
+    return {
+        "messages": [
+            {"gameMessage": message}
+        ],
+        "strategyResets": state.get("strategyResets", 0) + 1,
+        "stagnantIterations": 0
+    }
     
 
 
@@ -350,6 +803,14 @@ def failure_analysis_node(state: AgentState, config: RunnableConfig) -> AgentSta
     extracting key learnings from successes and failures, and updating the historical
     learnings database. It uses an LLM to analyze the episode messages and generate
     structured insights that can inform future agent behavior.
+
+    With `learning_mode` "rewrite" the LLM merges the episode into the full historical
+    learnings, which are then overwritten. With "journal" the LLM only sees this episode
+    and its insights are appended to the learnings journal; once the journal holds
+    `learning_consolidation_threshold` entries they are consolidated into the historical
+    learnings, unless another episode is already doing so. With "batch" the node makes no
+    LLM call at all: it queues a condensed summary of the episode and wakes the batch
+    learner, which merges `learning_batch_size` episodes per LLM call in the background.
     
     Args:
         state (AgentState): The current state of the agent containing:
@@ -365,55 +826,87 @@ def failure_analysis_node(state: AgentState, config: RunnableConfig) -> AgentSta
     
     Returns:
         AgentState: Updated state containing:
-            - messages: Analysis results with extracted learnings in structured format
+            - messages: Analysis results with extracted learnings in structured format, none
+              in batch mode
     """
     
     configurable = Configuration.from_runnable_config(config)
     learning_path = configurable.learning_path
 
-    os.makedirs(learning_path, exist_ok=True)
+    if configurable.learning_mode == "batch":
+        get_episode_queue(learning_path).append(_episode_queue_entry(state, configurable))
+        get_batch_learner(configurable).notify()
+        return {"messages": []}
 
-    if os.path.exists(os.path.join(learning_path, "historical_learnings.json")):
-        with open(os.path.join(learning_path, "historical_learnings.json"), "r") as f:
-            historical_learnings = json.load(f)
-    else:
-        historical_learnings = {}
+    if configurable.learning_mode == "journal":
+        insights = episode_insights_agent(configurable).invoke({"newEpisode": _episode_summary(state)})
+        journal = get_learnings_journal(learning_path)
+        journal.append(_journal_entry(state, configurable, insights))
 
-    new_episode = {
-        "messages": state["messages"],
-        "status": "success" if state["successOccurred"] else "failure" if state["failureOccurred"] else "timed_out",
-        "endReason": state["endReason"] if state["endReason"] != "" else "The game has run out of iterations."
+        threshold = configurable.learning_consolidation_threshold
+        if threshold and len(journal) >= threshold:
+            consolidate_learnings(configurable, blocking=False)
+
+        return {
+            "messages": [
+                {"learner": {**insights.model_dump()}}
+            ]
+        }
+
+    learnings_store = get_learnings_store(learning_path)
+    historical_learnings = learnings_store.load_dict()
+
+    failure_analysis_agent = _failure_analysis_agent(configurable)
+    result = failure_analysis_agent.invoke({
+        "historicalLearnings": historical_learnings,
+        "newEpisode": _episode_summary(state)
+    })
+
+    learnings_store.save(result)
+
+    return {
+        "messages": [
+            {"learner": {**result.model_dump()}}
+        ]
     }
 
-    llm = init_llm(
-        provider=configurable.provider,
-        model=configurable.model,
-        temperature=configurable.temperature
-    )
 
-    failure_analysis_system_prompt = ChatPromptTemplate.from_messages([
-        SystemMessagePromptTemplate.from_template(FAILURE_ANALYSIS_SYSTEM_PROMPT_TEMPLATE),
-        HumanMessagePromptTemplate.from_template(
-            template="""
-            ## Historical Learnings: \n{historicalLearnings}\n
-            ## New Episode: \n{newEpisode}\n
-            """
-        ),
-    ])
+async def afailure_analysis_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    "Async variant of failure_analysis_node that awaits the LLM call and does file I/O off the event loop"
 
-    failure_analysis_agent = create_agent(
-        llm=llm,
-        prompt=failure_analysis_system_prompt,
-        output_structure=HistoricalLearnings
-    )
+    configurable = Configuration.from_runnable_config(config)
+    learning_path = configurable.learning_path
 
-    result = failure_analysis_agent.invoke({
+    if configurable.learning_mode == "batch":
+        await asyncio.to_thread(get_episode_queue(learning_path).append, _episode_queue_entry(state, configurable))
+        get_batch_learner(configurable).notify()
+        return {"messages": []}
+
+    if configurable.learning_mode == "journal":
+        insights = await episode_insights_agent(configurable).ainvoke({"newEpisode": _episode_summary(state)})
+        journal = get_learnings_journal(learning_path)
+        await asyncio.to_thread(journal.append, _journal_entry(state, configurable, insights))
+
+        threshold = configurable.learning_consolidation_threshold
+        if threshold and await asyncio.to_thread(len, journal) >= threshold:
+            await aconsolidate_learnings(configurable, blocking=False)
+
+        return {
+            "messages": [
+                {"learner": {**insights.model_dump()}}
+            ]
+        }
+
+    learnings_store = get_learnings_store(learning_path)
+    historical_learnings = await asyncio.to_thread(learnings_store.load_dict)
+
+    failure_analysis_agent = _failure_analysis_agent(configurable)
+    result = await failure_analysis_agent.ainvoke({
         "historicalLearnings": historical_learnings,
-        "newEpisode": new_episode
+        "newEpisode": _episode_summary(state)
     })
 
-    with open(os.path.join(learning_path, "historical_learnings.json"), "w") as f:
-        json.dump(result.model_dump(), f, indent=4)
+    await asyncio.to_thread(learnings_store.save, result)
 
     return {
         "messages": [
@@ -422,6 +915,62 @@ def failure_analysis_node(state: AgentState, config: RunnableConfig) -> AgentSta
     }
 
 
+def _journal_entry(state: AgentState, configurable: Configuration, insights: HistoricalLearnings) -> dict:
+    return {
+        "threadId": configurable.thread_id,
+        "status": _episode_summary(state)["status"],
+        "insights": insights.model_dump()
+    }
+
+
+def _episode_queue_entry(state: AgentState, configurable: Configuration) -> dict:
+    "An episode condensed to one line per iteration, for the batch learner"
+    summary = _episode_summary(state)
+    return {
+        "threadId": configurable.thread_id,
+        "scenario": configurable.scenario_name,
+        "status": summary["status"],
+        "endReason": summary["endReason"],
+        "iterations": [
+            summarize_iteration(number, iteration)
+            for number, iteration in enumerate(split_iterations(state["messages"]), start=1)
+        ]
+    }
+
+
+def _episode_summary(state: AgentState) -> dict:
+    return {
+        "messages": state["messages"],
+        "status": (
+            "success" if state["successOccurred"]
+            else "failure" if state["failureOccurred"]
+            else "stalled" if state.get("loopAction") == "terminate"
+            else "timed_out"
+        ),
+        "endReason": state["endReason"] if state["endReason"] != "" else "The game has run out of iterations."
+    }
+
+
+def _episode_log_record(state: AgentState, configurable: Configuration) -> dict:
+    "The episode summary plus the scenario name and flat per-iteration records, for the episode log"
+    return {
+        **_episode_summary(state),
+        "scenario": configurable.scenario_name,
+        "iterationRecords": state.get("iterationRecords", [])
+    }
+
+
+def _failure_analysis_agent(configurable: Configuration):
+    return get_agent(
+        provider=configurable.provider,
+        model=configurable.model,
+        temperature=configurable.temperature,
+        prompt=FAILURE_ANALYSIS_PROMPT,
+        output_structure=HistoricalLearnings,
+        prompt_caching=configurable.prompt_caching
+    )
+
+
 def logger_node(state: AgentState, config: RunnableConfig) -> AgentState:
     """
     Log the final state and outcome of an agent episode to a JSON file.
@@ -444,18 +993,50 @@ def logger_node(state: AgentState, config: RunnableConfig) -> AgentState:
     """
     
     configurable = Configuration.from_runnable_config(config)
-    log_path = configurable.log_path
-    thread_id = configurable.thread_id
+    _check_episode_log(configurable)
+    _log_episode(configurable, _episode_log_record(state, configurable))
+    _release_checkpoints(configurable, config)
+    
+    return {}
 
-    os.makedirs(log_path, exist_ok=True)
 
-    payload = {
-        "messages": state["messages"],
-        "status": "success" if state["successOccurred"] else "failure" if state["failureOccurred"] else "timed_out",
-        "endReason": state["endReason"] if state["endReason"] != "" else "The game has run out of iterations."
-    }
+async def alogger_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    "Async variant of logger_node that writes the episode log off the event loop"
+
+    configurable = Configuration.from_runnable_config(config)
+    _check_episode_log(configurable)
+    if configurable.episode_log == "jsonl":
+        _log_episode(configurable, _episode_log_record(state, configurable))
+    else:
+        await asyncio.to_thread(_log_episode, configurable, _episode_log_record(state, configurable))
+    _release_checkpoints(configurable, config)
 
-    with open(f"{log_path}/{thread_id}.json", "w") as f:
-        json.dump(payload, f, indent=4)
-    
     return {}
+
+
+def _release_checkpoints(configurable: Configuration, config: RunnableConfig):
+    "Let the bounded in-memory checkpointer drop the episode once its final checkpoint is written"
+    if configurable.checkpointer == "memory" and configurable.checkpointer_evict_finished:
+        mark_thread_finished(configurable.thread_id, config.get("metadata", {}).get("langgraph_step", 0))
+
+
+def _check_episode_log(configurable: Configuration):
+    if configurable.episode_log not in ("file", "jsonl"):
+        raise ValueError(f"Unknown episode_log '{configurable.episode_log}'. Must be one of 'file' or 'jsonl'.")
+
+
+def _log_episode(configurable: Configuration, payload: dict):
+    "Write the episode to its own JSON file, or queue it for the shared JSONL episode log"
+    if configurable.episode_log == "file":
+        write_episode_file(configurable.log_path, configurable.thread_id, payload)
+        return
+
+    writer = get_episode_log_writer(
+        configurable.log_path,
+        compression=configurable.episode_log_compression,
+        rotate_bytes=configurable.episode_log_rotate_bytes,
+        rotate_seconds=configurable.episode_log_rotate_seconds,
+        fsync=configurable.episode_log_fsync,
+        flush_interval=configurable.episode_log_flush_interval
+    )
+    writer.write({"threadId": configurable.thread_id, "timestamp": time.time(), **payload})
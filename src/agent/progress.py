@@ -0,0 +1,67 @@
+from typing import List, Tuple
+import hashlib
+import json
+from ..type import WorldState
+
+
+def progress_view(world_state: WorldState) -> Tuple:
+    """
+    Reduce a world state to the fields that show whether the episode is making progress.
+
+    Stamina and comfyActions are left out because almost every action changes them, so
+    an episode that goes back and forth (e.g. retreat -> return_to_treasure -> retreat)
+    would never repeat a world state. Health and treasureHealth are bucketed into steps
+    of 10 for the same reason.
+    """
+    return (
+        world_state["isInSafeZone"],
+        world_state["enemyNearby"],
+        world_state["enemyLevel"],
+        world_state["treasureThreatLevel"],
+        world_state["health"] // 10,
+        world_state["treasureHealth"] // 10,
+        world_state["isBackup"]
+    )
+
+
+def iteration_fingerprint(world_state: WorldState, action_sequence: List[str]) -> str:
+    """
+    Hash the progress view of the world state an iteration started from together with the plan it executed.
+
+    The hash is stable across processes, so fingerprints stored in a persisted
+    checkpoint still compare equal when an episode is resumed elsewhere.
+    """
+    payload = json.dumps([list(progress_view(world_state)), list(action_sequence)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def detect_loop(
+        fingerprints: List[str],
+        stagnant_iterations: int,
+        loop_repeats: int,
+        loop_stagnation_iterations: int
+) -> str:
+    """
+    Decide whether an episode is going in circles.
+
+    Args:
+        fingerprints: The iteration fingerprints of the episode so far, the current
+                      iteration last.
+        stagnant_iterations: Number of consecutive iterations, up to the current one,
+                             after which the progress view of the world state was
+                             unchanged.
+        loop_repeats: Number of times the same plan from the same world state has to be
+                      seen to count as a cycle, 0 to disable cycle detection.
+        loop_stagnation_iterations: Number of consecutive iterations without any change
+                                    of the progress view that count as stagnation, 0
+                                    to disable stagnation detection.
+
+    Returns:
+        "cycle", "stagnation" or an empty string if the episode is making progress.
+    """
+
+    if loop_repeats and fingerprints and fingerprints.count(fingerprints[-1]) >= loop_repeats:
+        return "cycle"
+    if loop_stagnation_iterations and stagnant_iterations >= loop_stagnation_iterations:
+        return "stagnation"
+    return ""
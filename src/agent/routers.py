@@ -8,7 +8,8 @@ def success_router(state: AgentState):
     This router determines the next node in the agent workflow by checking if the agent
     has successfully completed its mission. If success has occurred, it routes to the
     failure analysis node for final processing. Otherwise, it continues the main loop
-    by routing back to the goal generator.
+    by routing back to the goal generator, through the strategy reset node when the
+    episode was found going in circles (see check_success_conditions_node).
     
     Args:
         state (AgentState): The current state of the agent containing success status
@@ -16,11 +17,34 @@ def success_router(state: AgentState):
     
     Returns:
         str: The name of the next node to execute:
-            - 'failure_analysis_node' if success has occurred
-            - 'goal_generator' if success has not occurred
+            - 'failure_analysis_node' if success has occurred, the iterations ran out or the
+              episode was stopped because of a loop
+            - 'strategy_reset' if a loop was detected and the strategy has to be reset
+            - 'goal_generator' otherwise
     """
     
-    if state['successOccurred'] or state['iterationsLimitReached']:
+    if state['successOccurred'] or state['iterationsLimitReached'] or state.get('loopAction') == 'terminate':
         return 'failure_analysis_node'
+    elif state.get('loopAction') == 'reset':
+        return 'strategy_reset'
     else:
-        return 'goal_generator'
\ No newline at end of file
+        return 'goal_generator'
+
+
+def plan_validation_router(state: AgentState):
+    """
+    Route a validated plan to execution, or back to the planner for repair.
+
+    Args:
+        state (AgentState): The current state of the agent after plan validation.
+
+    Returns:
+        str: The name of the next node to execute:
+            - 'planner' if the plan is invalid and may still be repaired
+            - 'action_executor' otherwise
+    """
+
+    if state.get('planNeedsRepair'):
+        return 'planner'
+    else:
+        return 'action_executor'
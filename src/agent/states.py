@@ -10,9 +10,14 @@ class AgentState(TypedDict):
     primaryGoal: str
     secondaryGoal: str
     goalJustification: str
+    goalSource: str
     actionFailureSuggestions: Union[str, None]
     actionSequence: list[str]
     plannerJustification: str
+    planCandidates: List[Dict[str, Any]]
+    planValidation: Dict[str, Any]
+    planNeedsRepair: bool
+    planRepairs: int
     failureOccurred: bool
     failureReason: str
     successOccurred: bool
@@ -20,4 +25,11 @@ class AgentState(TypedDict):
     actionFailed: bool
     iterations: int
     iterationsLimitReached: bool
+    iterationStartedAt: float
+    iterationRecords: Annotated[List[Dict[str, Any]], operator.add]
+    iterationFingerprints: Annotated[List[str], operator.add]
+    stagnantIterations: int
+    loopDetected: str
+    loopAction: str
+    strategyResets: int
     
\ No newline at end of file
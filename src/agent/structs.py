@@ -13,6 +13,10 @@ class PlannerResponse(BaseModel):
     plannerJustification: str = Field(description="The reasoning for the action sequence")
 
 
+class GoalPlanResponse(PlannerResponse, GoalGeneratorResponse):
+    "The goals for the current situation, followed by the action sequence that achieves them"
+
+
 class HistoricalLearnings(BaseModel):
     actionFailureLearnings: list[str] = Field(
         default_factory=list,
@@ -0,0 +1,301 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import argparse
+import ast
+import re
+import time
+from .episode_log import iter_episode_logs
+from .type import WorldState
+
+
+_EXECUTED_ACTIONS_PATTERN = re.compile(r"Executed actions: (\[.*?\])")
+_FAILED_ACTION_PATTERN = re.compile(r"Action (\w+) failed because")
+_GAME_FAILURE_PATTERN = re.compile(r"You have failed due to the following reason: (.*)\.\nPlease try again", re.DOTALL)
+
+_ITERATION_COLUMNS = (
+    "primaryGoal",
+    "secondaryGoal",
+    "goalSource",
+    "actionSequence",
+    "executedActions",
+    "failedActions",
+    "actionFailed",
+    "failureOccurred",
+    "failureReason",
+    "planValid",
+    "planRepairs",
+    "planCandidates",
+    "executionSeconds",
+    "iterationSeconds",
+)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "Episode analytics require pyarrow. Install it with `pip install pyarrow`."
+        ) from e
+    return pyarrow
+
+
+def episode_schema():
+    "Arrow schema of the iteration table, one world state column per WorldState field"
+    pa = _import_pyarrow()
+    world_state_types = {int: pa.int32(), bool: pa.bool_()}
+    return pa.schema(
+        [
+            ("threadId", pa.string()),
+            ("scenario", pa.string()),
+            ("status", pa.string()),
+            ("iteration", pa.int32()),
+        ]
+        + [(name, world_state_types.get(kind, pa.string())) for name, kind in WorldState.__annotations__.items()]
+        + [
+            ("primaryGoal", pa.string()),
+            ("secondaryGoal", pa.string()),
+            ("goalSource", pa.string()),
+            ("actionSequence", pa.list_(pa.string())),
+            ("executedActions", pa.list_(pa.string())),
+            ("failedActions", pa.list_(pa.string())),
+            ("actionFailed", pa.bool_()),
+            ("failureOccurred", pa.bool_()),
+            ("failureReason", pa.string()),
+            ("planValid", pa.bool_()),
+            ("planRepairs", pa.int32()),
+            ("planCandidates", pa.int32()),
+            ("executionSeconds", pa.float64()),
+            ("iterationSeconds", pa.float64()),
+        ]
+    )
+
+
+def _iterations_from_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rebuild the iteration records of an episode logged before iterationRecords existed.
+
+    Executed and failed actions and game failures are parsed from the game messages;
+    plan validation and timings are not available and are left empty.
+    """
+
+    iterations = []
+    for message in messages:
+        if "worldState" in message:
+            iterations.append({"iteration": len(iterations) + 1, "worldState": message["worldState"]})
+        elif not iterations:
+            continue
+        elif "goalGenerator" in message:
+            iterations[-1]["primaryGoal"] = message["goalGenerator"].get("primaryGoal")
+            iterations[-1]["secondaryGoal"] = message["goalGenerator"].get("secondaryGoal")
+        elif "planner" in message:
+            iterations[-1]["actionSequence"] = message["planner"].get("actionSequence")
+        elif "gameMessage" in message and "executedActions" not in iterations[-1]:
+            text = message["gameMessage"]
+            executed = _EXECUTED_ACTIONS_PATTERN.search(text)
+            failure = _GAME_FAILURE_PATTERN.search(text)
+            if not executed and not failure:
+                continue
+            failed_actions = _FAILED_ACTION_PATTERN.findall(text)
+            iterations[-1].update({
+                "executedActions": ast.literal_eval(executed.group(1)) if executed else [],
+                "failedActions": failed_actions,
+                "actionFailed": bool(failed_actions),
+                "failureOccurred": failure is not None,
+                "failureReason": failure.group(1) if failure else ""
+            })
+    return iterations
+
+
+def episode_rows(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Flatten episode log records into one row per iteration.
+
+    Args:
+        records: Episode log records, e.g. from iter_episode_logs.
+
+    Returns:
+        An iterator over rows with the columns of episode_schema.
+    """
+
+    for record in records:
+        iterations = record.get("iterationRecords") or _iterations_from_messages(record.get("messages", []))
+        for iteration in iterations:
+            yield {
+                "threadId": record.get("threadId"),
+                "scenario": record.get("scenario") or "",
+                "status": record.get("status"),
+                "iteration": iteration["iteration"],
+                **{name: iteration["worldState"].get(name) for name in WorldState.__annotations__},
+                **{name: iteration.get(name) for name in _ITERATION_COLUMNS}
+            }
+
+
+def export_episodes(log_path: str, output: str, format: str = "parquet", batch_rows: int = 65536) -> int:
+    """
+    Export the episodes of a log directory as a columnar table with one row per iteration.
+
+    Rows are converted and written in record batches of `batch_rows`, so memory stays
+    bounded regardless of the number of episodes.
+
+    Args:
+        log_path: The log directory, in either episode log format.
+        output: Path of the Parquet or Arrow IPC file to write.
+        format: "parquet" or "arrow".
+        batch_rows: Number of rows per record batch (and Parquet row group).
+
+    Returns:
+        The number of rows written.
+
+    Raises:
+        ValueError: If the format is unknown.
+        ImportError: If pyarrow is not installed.
+    """
+
+    if format not in ("parquet", "arrow"):
+        raise ValueError(f"Unknown export format '{format}'. Must be one of 'parquet' or 'arrow'.")
+
+    pa = _import_pyarrow()
+    schema = episode_schema()
+    if format == "parquet":
+        writer = pa.parquet.ParquetWriter(output, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(output, schema)
+
+    rows_written = 0
+    batch = []
+    with writer:
+        for row in episode_rows(iter_episode_logs(log_path)):
+            batch.append(row)
+            if len(batch) == batch_rows:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                rows_written += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            rows_written += len(batch)
+    return rows_written
+
+
+def load_episodes(path: str, columns: Optional[List[str]] = None):
+    """
+    Read an exported iteration table, or a directory of them, reading only `columns`.
+
+    Files ending in .arrow or .feather are read as Arrow IPC, anything else as Parquet.
+    """
+    pa = _import_pyarrow()
+    format = "ipc" if path.endswith((".arrow", ".feather")) else "parquet"
+    return pa.dataset.dataset(path, format=format).to_table(columns=columns)
+
+
+def success_rate_by_scenario(table):
+    """
+    Episodes, success rate and mean iterations per scenario.
+
+    Args:
+        table: Iteration table with the scenario, threadId, status and iteration columns.
+
+    Returns:
+        An Arrow table with the columns scenario, episodes, successes, successRate and
+        meanIterations, sorted by scenario.
+    """
+
+    pa = _import_pyarrow()
+    pc = pa.compute
+    episodes = table.group_by(["scenario", "threadId"]).aggregate([("status", "min"), ("iteration", "max")])
+    episodes = episodes.append_column("success", pc.cast(pc.equal(episodes["status_min"], "success"), pa.int64()))
+    by_scenario = episodes.group_by("scenario").aggregate([
+        ("threadId", "count"),
+        ("success", "sum"),
+        ("iteration_max", "mean")
+    ])
+    return pa.table({
+        "scenario": by_scenario["scenario"],
+        "episodes": by_scenario["threadId_count"],
+        "successes": by_scenario["success_sum"],
+        "successRate": pc.divide(pc.cast(by_scenario["success_sum"], pa.float64()), by_scenario["threadId_count"]),
+        "meanIterations": by_scenario["iteration_max_mean"]
+    }).sort_by("scenario")
+
+
+def action_failure_frequency(table):
+    """
+    Attempts, failures and failure rate per action.
+
+    An action is attempted when it is executed or fails; actions after a probabilistic
+    failure or a game failure in the same sequence are not attempted.
+
+    Args:
+        table: Iteration table with the executedActions and failedActions columns.
+
+    Returns:
+        An Arrow table with the columns action, attempts, failures and failureRate,
+        sorted by failure rate, highest first.
+    """
+
+    pa = _import_pyarrow()
+    pc = pa.compute
+
+    def counts(column):
+        values = pc.list_flatten(table[column])
+        counted = pc.value_counts(values) if len(values) else pa.array([], pa.struct([("values", pa.string()), ("counts", pa.int64())]))
+        return pa.table({"action": counted.field("values"), column: counted.field("counts")})
+
+    executed, failed = counts("executedActions"), counts("failedActions")
+    joined = executed.join(failed, "action", join_type="full outer")
+    executed_counts = pc.fill_null(joined["executedActions"], 0)
+    failures = pc.fill_null(joined["failedActions"], 0)
+    attempts = pc.add(executed_counts, failures)
+    return pa.table({
+        "action": joined["action"],
+        "attempts": attempts,
+        "failures": failures,
+        "failureRate": pc.divide(pc.cast(failures, pa.float64()), attempts)
+    }).sort_by([("failureRate", "descending"), ("action", "ascending")])
+
+
+def format_table(table) -> str:
+    "Render a small Arrow table as aligned text"
+    rows = [[f"{value:.3f}" if isinstance(value, float) else str(value) for value in row.values()] for row in table.to_pylist()]
+    widths = [max([len(name)] + [len(row[i]) for row in rows]) for i, name in enumerate(table.column_names)]
+    lines = ["  ".join(name.ljust(width) for name, width in zip(table.column_names, widths))]
+    lines += ["  ".join(value.ljust(width) for value, width in zip(row, widths)) for row in rows]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Export and query dungeon guardian episode logs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="flatten episode logs into one row per iteration")
+    export_parser.add_argument("log_path", help="directory with the episode logs")
+    export_parser.add_argument("--output", required=True, help="Parquet or Arrow file to write")
+    export_parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    export_parser.add_argument("--batch-rows", type=int, default=65536)
+
+    query_parser = commands.add_parser("query", help="aggregate an exported table")
+    query_parser.add_argument("path", help="exported file or directory of exported files")
+    query_parser.add_argument("--report", choices=["scenarios", "actions", "all"], default="all")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.command == "export":
+        rows = export_episodes(args.log_path, args.output, format=args.format, batch_rows=args.batch_rows)
+        print(f"wrote {rows} rows to {args.output} in {time.perf_counter() - started:.1f}s")
+        return
+
+    if args.report in ("scenarios", "all"):
+        table = load_episodes(args.path, columns=["scenario", "threadId", "status", "iteration"])
+        print(format_table(success_rate_by_scenario(table)))
+        print()
+    if args.report in ("actions", "all"):
+        table = load_episodes(args.path, columns=["executedActions", "failedActions"])
+        print(format_table(action_failure_frequency(table)))
+        print()
+    print(f"query time {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
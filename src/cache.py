@@ -0,0 +1,247 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Type
+from pydantic import BaseModel
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from .metrics import record_cache_lookup
+
+
+class ResponseCache(ABC):
+    "Base class for caches of structured LLM responses, with hit/miss counters"
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 0):
+        """
+        Args:
+            max_entries: Maximum number of responses kept; the least recently used ones
+                         are evicted first.
+            ttl: Time to live of a response in seconds. 0 keeps responses until evicted.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        "Return the cached response for the key, or None, and count the hit or miss"
+        value = self._get(key)
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]):
+        "Store a response under the key"
+        self._set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        "Return the hit and miss counters and the hit rate"
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / total if total else 0.0
+        }
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl > 0 and time.time() - created > self.ttl
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        "Return the stored response for the key, or None if it is missing or expired"
+
+    @abstractmethod
+    def _set(self, key: str, value: Dict[str, Any]):
+        "Store a response under the key and evict responses over the limits"
+
+
+class InMemoryResponseCache(ResponseCache):
+    "LRU response cache held in process memory"
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 0):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if self._expired(created):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteResponseCache(ResponseCache):
+    "Response cache persisted in a SQLite database, shared across processes and runs"
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float = 0):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self._expired(created):
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            return json.loads(value)
+
+    def _set(self, key: str, value: Dict[str, Any]):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            if self.ttl > 0:
+                self._connection.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+
+_cache_registry = {}
+_cache_registry_lock = threading.Lock()
+
+
+def get_response_cache(
+        kind: str,
+        path: str = "",
+        max_entries: int = 10000,
+        ttl: float = 0
+) -> Optional[ResponseCache]:
+    """
+    Return the process-wide response cache for the given settings.
+
+    Args:
+        kind: "none", "memory" or "sqlite".
+        path: Path of the SQLite database, only used for the "sqlite" kind.
+        max_entries: Maximum number of cached responses.
+        ttl: Time to live of a response in seconds, 0 for no expiry.
+
+    Returns:
+        The shared cache, or None if caching is disabled.
+
+    Raises:
+        ValueError: If the kind is unknown.
+    """
+
+    if kind == "none":
+        return None
+    if kind not in ("memory", "sqlite"):
+        raise ValueError(f"Unknown response cache '{kind}'. Must be one of 'none', 'memory' or 'sqlite'.")
+
+    key = (kind, os.path.abspath(path) if kind == "sqlite" else "", max_entries, ttl)
+    with _cache_registry_lock:
+        if key not in _cache_registry:
+            if kind == "memory":
+                _cache_registry[key] = InMemoryResponseCache(max_entries=max_entries, ttl=ttl)
+            else:
+                _cache_registry[key] = SQLiteResponseCache(path, max_entries=max_entries, ttl=ttl)
+        return _cache_registry[key]
+
+
+def make_cache_key(
+        prompt: str,
+        provider: str,
+        model: str,
+        temperature: float,
+        output_structure: Type[BaseModel]
+) -> str:
+    "Hash the rendered prompt together with the model settings and the output schema"
+    payload = json.dumps(
+        [prompt, provider, model, float(temperature), output_structure.model_json_schema()],
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cached_invoke(
+        agent,
+        inputs: Dict[str, Any],
+        cache: ResponseCache,
+        provider: str,
+        model: str,
+        temperature: float,
+        output_structure: Type[BaseModel]
+) -> BaseModel:
+    """
+    Invoke an agent, serving the structured response from the cache when possible.
+
+    The agent's prompt is rendered first so that the cache key covers exactly the text that
+    would be sent to the model. On a miss the rendered prompt is passed on to the agent's
+    language model and the response is stored.
+    """
+
+    prompt_value = agent.prompt.invoke(inputs)
+    key = make_cache_key(prompt_value.to_string(), provider, model, temperature, output_structure)
+
+    cached = cache.get(key)
+    record_cache_lookup(cached is not None)
+    if cached is not None:
+        return output_structure.model_validate(cached)
+
+    result = agent.llm.invoke(prompt_value)
+    cache.set(key, result.model_dump())
+    return result
+
+
+async def acached_invoke(
+        agent,
+        inputs: Dict[str, Any],
+        cache: ResponseCache,
+        provider: str,
+        model: str,
+        temperature: float,
+        output_structure: Type[BaseModel]
+) -> BaseModel:
+    "Async variant of cached_invoke"
+
+    prompt_value = await agent.prompt.ainvoke(inputs)
+    key = make_cache_key(prompt_value.to_string(), provider, model, temperature, output_structure)
+
+    cached = cache.get(key)
+    record_cache_lookup(cached is not None)
+    if cached is not None:
+        return output_structure.model_validate(cached)
+
+    result = await agent.llm.ainvoke(prompt_value)
+    cache.set(key, result.model_dump())
+    return result
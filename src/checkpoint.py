@@ -0,0 +1,165 @@
+from collections import OrderedDict
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from .configuration import Configuration
+
+
+_finished_threads = {}
+_finished_threads_lock = threading.Lock()
+
+
+def mark_thread_finished(thread_id: str, step: int):
+    """
+    Mark an episode as finished at graph step `step`, so that bounded checkpointers drop
+    its checkpoints as soon as the graph has written the checkpoint of that step.
+
+    The step matters because the sync graph writes checkpoints in the background: the
+    checkpoint of the previous step can still be pending when the final node runs.
+    """
+    with _finished_threads_lock:
+        _finished_threads[thread_id] = step
+
+
+def _pop_finished(thread_id: str, step: int) -> bool:
+    with _finished_threads_lock:
+        if thread_id in _finished_threads and step >= _finished_threads[thread_id]:
+            del _finished_threads[thread_id]
+            return True
+        return False
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    In-memory checkpointer that bounds the number of threads it keeps.
+
+    Threads are evicted when more than `max_threads` are stored (least recently used
+    first), when they have not been used for `ttl` seconds, and, if `evict_finished` is
+    set, right after the final checkpoint of an episode marked with mark_thread_finished.
+    An evicted thread can no longer be resumed or inspected with graph.get_state, so
+    `max_threads` and `ttl` must leave room for the episodes that are still running.
+    """
+
+    def __init__(self, max_threads: int = 1000, ttl: float = 0, evict_finished: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self.evict_finished = evict_finished
+        self._last_used = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _touch(self, config: RunnableConfig):
+        thread_id = config["configurable"]["thread_id"]
+        now = time.time()
+        self._last_used[thread_id] = now
+        self._last_used.move_to_end(thread_id)
+
+        while self._last_used:
+            oldest, last_used = next(iter(self._last_used.items()))
+            expired = self.ttl > 0 and now - last_used > self.ttl
+            if oldest == thread_id or not (expired or len(self._last_used) > self.max_threads):
+                break
+            self._evict(oldest)
+
+    def _evict(self, thread_id: str):
+        self._last_used.pop(thread_id, None)
+        super().delete_thread(thread_id)
+
+    def get_tuple(self, config: RunnableConfig):
+        with self._lock:
+            return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        with self._lock:
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            if self.evict_finished and _pop_finished(thread_id, metadata.get("step", 0)):
+                self._evict(thread_id)
+            else:
+                self._touch(config)
+            return next_config
+
+    def put_writes(self, config, writes, task_id, task_path="") -> None:
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self._touch(config)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._evict(thread_id)
+
+
+def create_checkpointer(configurable: Configuration, async_graph: bool = False):
+    """
+    Create the checkpointer selected by `checkpointer` in the configuration.
+
+    Args:
+        configurable: Configuration with the checkpointer settings.
+        async_graph: Create a checkpointer that supports the async graph methods.
+
+    Returns:
+        None for "none", a BoundedMemorySaver for "memory", or a SQLite saver for "sqlite".
+
+    Raises:
+        ValueError: If the checkpointer kind is unknown.
+        ImportError: If "sqlite" is selected and langgraph-checkpoint-sqlite is not installed.
+    """
+
+    kind = configurable.checkpointer
+
+    if kind == "none":
+        return None
+
+    if kind == "memory":
+        return BoundedMemorySaver(
+            max_threads=configurable.checkpointer_max_threads,
+            ttl=configurable.checkpointer_ttl,
+            evict_finished=configurable.checkpointer_evict_finished
+        )
+
+    if kind == "sqlite":
+        path = configurable.checkpointer_path or os.path.join(configurable.learning_path, "checkpoints.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError as e:
+            raise ImportError(
+                "The sqlite checkpointer requires langgraph-checkpoint-sqlite. "
+                "Install it with `pip install langgraph-checkpoint-sqlite`."
+            ) from e
+
+        class ThreadedSqliteSaver(SqliteSaver):
+            """
+            SqliteSaver whose async methods run the sync ones in a worker thread.
+
+            AsyncSqliteSaver binds its connection to the event loop it was created in,
+            which does not work for a shared graph driven by a new event loop in every
+            asyncio.run call.
+            """
+
+            async def aget_tuple(self, config):
+                return await asyncio.to_thread(self.get_tuple, config)
+
+            async def alist(self, config, *, filter=None, before=None, limit=None):
+                for item in await asyncio.to_thread(
+                    lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+                ):
+                    yield item
+
+            async def aput(self, config, checkpoint, metadata, new_versions):
+                return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+            async def aput_writes(self, config, writes, task_id, task_path=""):
+                return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+            async def adelete_thread(self, thread_id):
+                return await asyncio.to_thread(self.delete_thread, thread_id)
+
+        saver_class = ThreadedSqliteSaver if async_graph else SqliteSaver
+        return saver_class(sqlite3.connect(path, check_same_thread=False))
+
+    raise ValueError(f"Unknown checkpointer '{kind}'. Must be one of 'none', 'memory' or 'sqlite'.")
@@ -1,7 +1,7 @@
 from dataclasses import dataclass, fields
 from langchain_core.runnables import RunnableConfig
 import os
-from typing import Any
+from typing import Any, Literal
 
 @dataclass(kw_only=True)
 class Configuration:
@@ -9,9 +9,45 @@ class Configuration:
     provider: str = "openai"
     model: str = "gpt-4o-mini"
     temperature: float = 0.5
+    prompt_caching: bool = True
     log_path: str = "/Users/psykick/Documents/GitHub/dungeon-guardian/temp/game_logs"
+    episode_log: Literal["file", "jsonl"] = "file"
+    episode_log_compression: Literal["none", "gzip", "zstd"] = "none"
+    episode_log_rotate_bytes: int = 100000000
+    episode_log_rotate_seconds: float = 0
+    episode_log_fsync: Literal["never", "rotate", "always"] = "rotate"
+    episode_log_flush_interval: float = 1.0
     learning_path: str = "/Users/psykick/Documents/GitHub/dungeon-guardian/temp/learning"
     total_iterations: int = 10
+    loop_action: Literal["none", "reset", "terminate"] = "none"
+    loop_repeats: int = 3
+    loop_stagnation_iterations: int = 2
+    loop_max_resets: int = 1
+    goal_mode: Literal["llm", "rules", "hybrid"] = "llm"
+    goal_confidence_threshold: float = 0.7
+    planner_mode: Literal["symbolic", "llm", "hybrid"] = "llm"
+    fuse_goal_planner: bool = False
+    policy_index_path: str = ""
+    plan_max_repairs: int = 1
+    plan_candidates: int = 1
+    response_cache: Literal["none", "memory", "sqlite"] = "none"
+    response_cache_path: str = ""
+    response_cache_max_entries: int = 10000
+    response_cache_ttl: float = 0
+    learning_mode: Literal["rewrite", "journal", "batch"] = "rewrite"
+    learning_consolidation_threshold: int = 10
+    learning_batch_size: int = 20
+    learning_batch_interval: float = 0
+    context_strategy: Literal["full", "window"] = "full"
+    context_keep_iterations: int = 3
+    context_token_budget: int = 4000
+    metrics_path: str = ""
+    checkpointer: Literal["none", "memory", "sqlite"] = "memory"
+    checkpointer_path: str = ""
+    checkpointer_max_threads: int = 1000
+    checkpointer_ttl: float = 0
+    checkpointer_evict_finished: bool = True
+    scenario_name: str = ""
     thread_id: str
     
     @classmethod
@@ -30,4 +66,15 @@ class Configuration:
             if f.init
         }
 
+        for f in fields(cls):
+            if f.init and isinstance(values[f.name], str) and f.type in (int, float, bool):
+                values[f.name] = _parse_env_value(values[f.name], f.type)
+
         return cls(**values)
+
+
+def _parse_env_value(value: str, field_type: type) -> Any:
+    "Convert a string from the environment into the type of the configuration field"
+    if field_type is bool:
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return field_type(value)
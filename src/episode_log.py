@@ -0,0 +1,255 @@
+from typing import Any, Dict, Iterator, Literal, Optional
+import atexit
+import glob
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+import time
+
+
+Compression = Literal["none", "gzip", "zstd"]
+FsyncPolicy = Literal["never", "rotate", "always"]
+
+_EXTENSIONS = {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+_CLOSE = object()
+
+
+def write_episode_file(log_path: str, thread_id: str, payload: dict):
+    "Write one episode to its own pretty-printed JSON file, named after the thread id"
+    os.makedirs(log_path, exist_ok=True)
+
+    with open(f"{log_path}/{thread_id}.json", "w") as f:
+        json.dump(payload, f, indent=4)
+
+
+def _open_segment(path: str, compression: Compression):
+    "Open a log segment for binary appends, returning the writable stream and the raw file"
+    raw = open(path, "ab")
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="ab"), raw
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raw.close()
+            raise ImportError(
+                "zstd compressed episode logs require zstandard. "
+                "Install it with `pip install zstandard`."
+            ) from e
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=False), raw
+    return raw, raw
+
+
+class EpisodeLogWriter:
+    """
+    Appends episode records as compact JSON lines from a background thread.
+
+    Records are queued by write() and written in batches every `flush_interval` seconds
+    or as soon as the writer thread is idle, so graph nodes never wait for the disk.
+    Segments are named `episodes-<timestamp>-<pid>-<sequence>.jsonl` (with `.gz` or `.zst`
+    when compressed), so several processes can log to the same directory, and a new
+    segment is started once `rotate_bytes` uncompressed bytes or `rotate_seconds` seconds
+    are reached (0 disables either limit).
+
+    The fsync policy trades durability for throughput: "never" leaves it to the OS,
+    "rotate" syncs every segment when it is closed and "always" after every batch.
+    Compressed segments only become fully readable once they are closed.
+    """
+
+    def __init__(
+            self,
+            log_path: str,
+            compression: Compression = "none",
+            rotate_bytes: int = 100_000_000,
+            rotate_seconds: float = 0,
+            fsync: FsyncPolicy = "rotate",
+            flush_interval: float = 1.0
+    ):
+        if compression not in _EXTENSIONS:
+            raise ValueError(f"Unknown episode log compression '{compression}'. Must be one of 'none', 'gzip' or 'zstd'.")
+        if fsync not in ("never", "rotate", "always"):
+            raise ValueError(f"Unknown episode log fsync policy '{fsync}'. Must be one of 'never', 'rotate' or 'always'.")
+
+        self.log_path = log_path
+        self.compression = compression
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.fsync = fsync
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue()
+        self._stream = None
+        self._raw = None
+        self._segment_bytes = 0
+        self._segment_opened = 0.0
+        self._sequence = 0
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+        os.makedirs(log_path, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="episode-log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]):
+        "Queue one record; it is serialized right away and written by the background thread"
+        if self._error is not None:
+            raise RuntimeError("The episode log writer failed") from self._error
+        if self._closed:
+            raise RuntimeError("The episode log writer is closed")
+        self._queue.put(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+
+    def flush(self):
+        "Block until every queued record has been written to the current segment"
+        self._queue.join()
+
+    def close(self):
+        "Write the queued records, close the current segment and stop the background thread"
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                self._rotate_if_expired()
+                continue
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            closing = any(line is _CLOSE for line in batch)
+            try:
+                self._write_batch([line for line in batch if line is not _CLOSE])
+                if closing:
+                    self._close_segment()
+            except BaseException as e:
+                self._error = e
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if closing:
+                return
+
+    def _write_batch(self, lines):
+        for line in lines:
+            if self._stream is None:
+                self._open_next_segment()
+            self._stream.write(line)
+            self._segment_bytes += len(line)
+            if self.rotate_bytes and self._segment_bytes >= self.rotate_bytes:
+                self._close_segment()
+
+        if self._stream is not None:
+            if self.compression == "none" or self.fsync == "always":
+                self._stream.flush()
+                self._raw.flush()
+            if self.fsync == "always":
+                os.fsync(self._raw.fileno())
+        self._rotate_if_expired()
+
+    def _rotate_if_expired(self):
+        if self._stream is not None and self.rotate_seconds and time.time() - self._segment_opened >= self.rotate_seconds:
+            self._close_segment()
+
+    def _open_next_segment(self):
+        self._sequence += 1
+        name = f"episodes-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._sequence:04d}{_EXTENSIONS[self.compression]}"
+        self._stream, self._raw = _open_segment(os.path.join(self.log_path, name), self.compression)
+        self._segment_bytes = 0
+        self._segment_opened = time.time()
+
+    def _close_segment(self):
+        if self._stream is None:
+            return
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.flush()
+        if self.fsync != "never":
+            os.fsync(self._raw.fileno())
+        self._raw.close()
+        self._stream = self._raw = None
+
+
+_writer_registry = {}
+_writer_registry_lock = threading.Lock()
+
+
+def get_episode_log_writer(
+        log_path: str,
+        compression: Compression = "none",
+        rotate_bytes: int = 100_000_000,
+        rotate_seconds: float = 0,
+        fsync: FsyncPolicy = "rotate",
+        flush_interval: float = 1.0
+) -> EpisodeLogWriter:
+    "Return the process-wide EpisodeLogWriter for a log directory and its settings"
+    key = (os.path.abspath(log_path), compression, rotate_bytes, rotate_seconds, fsync, flush_interval)
+    with _writer_registry_lock:
+        if key not in _writer_registry:
+            _writer_registry[key] = EpisodeLogWriter(
+                log_path,
+                compression=compression,
+                rotate_bytes=rotate_bytes,
+                rotate_seconds=rotate_seconds,
+                fsync=fsync,
+                flush_interval=flush_interval
+            )
+        return _writer_registry[key]
+
+
+@atexit.register
+def close_episode_logs():
+    "Close every episode log writer of the process, writing the records still queued"
+    with _writer_registry_lock:
+        writers = list(_writer_registry.values())
+        _writer_registry.clear()
+    for writer in writers:
+        writer.close()
+
+
+def _read_segment(path: str) -> Iterator[bytes]:
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            yield from f
+    elif path.endswith(".zst"):
+        import zstandard
+        with open(path, "rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as reader:
+            yield from io.BufferedReader(reader)
+    else:
+        with open(path, "rb") as f:
+            yield from f
+
+
+def iter_episode_logs(log_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read every episode logged in a directory, in either log format.
+
+    Args:
+        log_path: The log directory.
+
+    Returns:
+        An iterator over the episode records. Records from per-episode JSON files get
+        their `threadId` from the file name.
+    """
+
+    for path in sorted(glob.glob(os.path.join(log_path, "episodes-*.jsonl*"))):
+        for line in _read_segment(path):
+            if line.strip():
+                yield json.loads(line)
+
+    for path in sorted(glob.glob(os.path.join(log_path, "*.json"))):
+        with open(path, "r") as f:
+            record = json.load(f)
+        record.setdefault("threadId", os.path.splitext(os.path.basename(path))[0])
+        yield record
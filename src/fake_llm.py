@@ -0,0 +1,158 @@
+from typing import Any, Dict, List, Optional, Type
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel, PrivateAttr
+import ast
+import asyncio
+import itertools
+import json
+import re
+import threading
+import time
+from .agent.structs import GoalGeneratorResponse, PlannerResponse, GoalPlanResponse, HistoricalLearnings
+from .planner import plan_for_goals
+from .simulator import default_goals
+
+
+_WORLD_STATE_PATTERN = re.compile(r"Current world state:\s*(\{.*?\})\s*$", re.MULTILINE)
+
+
+def _world_state_from_prompt(text: str) -> Optional[dict]:
+    "Find the current world state that the goal generator and planner prompts render"
+    match = _WORLD_STATE_PATTERN.search(text)
+    if not match:
+        return None
+    try:
+        return ast.literal_eval(match.group(1))
+    except (ValueError, SyntaxError):
+        return None
+
+
+def rule_based_response(output_structure: Type[BaseModel], prompt: str) -> BaseModel:
+    """
+    Answer a prompt without a model, with the same rules as the simulator's planner policy.
+
+    Goals are picked from the world state in the prompt with fixed thresholds and plans
+    come from the symbolic planner, so episodes make progress like with a real model.
+    """
+
+    world_state = _world_state_from_prompt(prompt)
+
+    if output_structure is GoalGeneratorResponse:
+        primary_goal, secondary_goal = default_goals(world_state) if world_state else ("survive", "protect_treasure")
+        return GoalGeneratorResponse(
+            primaryGoal=primary_goal,
+            secondaryGoal=secondary_goal,
+            goalJustification="Rule-based goals of the fake provider."
+        )
+
+    if output_structure is PlannerResponse:
+        action_sequence = None
+        if world_state:
+            action_sequence, _ = plan_for_goals(world_state, *default_goals(world_state))
+        return PlannerResponse(
+            actionSequence=action_sequence or [],
+            plannerJustification="Symbolic plan of the fake provider."
+        )
+
+    if output_structure is GoalPlanResponse:
+        goals = rule_based_response(GoalGeneratorResponse, prompt)
+        plan = rule_based_response(PlannerResponse, prompt)
+        return GoalPlanResponse(**goals.model_dump(), **plan.model_dump())
+
+    if output_structure is HistoricalLearnings:
+        return HistoricalLearnings(generalLearnings=["Rule-based learning of the fake provider."])
+
+    raise ValueError(f"The fake provider cannot answer with {output_structure.__name__}")
+
+
+def load_script(path: Optional[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Load scripted responses for FakeChatModel from a JSON file.
+
+    The file maps output structure names to the list of responses to cycle through, e.g.
+    {"PlannerResponse": [{"actionSequence": ["rest"], "plannerJustification": "..."}]}.
+    Output structures that are not listed get rule-based responses.
+    """
+    if not path:
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model for offline runs and benchmarks.
+
+    Structured output is answered with scripted responses when a script is given, cycling
+    through the responses listed for each output structure name, and with
+    rule_based_response otherwise. Every call waits `latency` seconds and reports token
+    usage estimated from the text length, so the callbacks and metrics behave as with a
+    real provider. With `prompt_caching`, a leading system message that was sent before
+    is reported as cache read tokens, like a provider's prompt prefix cache.
+    """
+
+    latency: float = 0.0
+    script: Dict[str, List[Dict[str, Any]]] = {}
+    prompt_caching: bool = True
+
+    _cycles: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    _cached_prefixes: set = PrivateAttr(default_factory=set)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"latency": self.latency}
+
+    def _respond(self, messages: List[BaseMessage], output_structure: Optional[Type[BaseModel]]) -> ChatResult:
+        prompt = "\n".join(str(message.content) for message in messages)
+
+        if output_structure is None:
+            content = "ok"
+        elif output_structure.__name__ in self.script:
+            with self._lock:
+                cycle = self._cycles.setdefault(output_structure.__name__, itertools.cycle(self.script[output_structure.__name__]))
+                content = json.dumps(next(cycle))
+        else:
+            content = rule_based_response(output_structure, prompt).model_dump_json()
+
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        if self.prompt_caching and messages and messages[0].type == "system":
+            prefix = str(messages[0].content)
+            with self._lock:
+                cached = prefix in self._cached_prefixes
+                self._cached_prefixes.add(prefix)
+            prefix_tokens = len(prefix) // 4
+            usage_metadata["input_token_details"] = (
+                {"cache_read": prefix_tokens} if cached else {"cache_creation": prefix_tokens}
+            )
+        message = AIMessage(content=content, usage_metadata=usage_metadata)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, output_structure=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages, output_structure)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, output_structure=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages, output_structure)
+
+    def with_structured_output(self, schema: Type[BaseModel], **kwargs):
+        "Return a runnable that answers with instances of `schema`"
+        return self.bind(output_structure=schema) | RunnableLambda(
+            lambda message: schema.model_validate_json(message.content)
+        )
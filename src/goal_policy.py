@@ -0,0 +1,66 @@
+from typing import NamedTuple
+from .type import WorldState, Goal
+
+
+# Health below which the guardian has to survive first, as in the goal generator prompt
+SURVIVE_HEALTH = 40
+# Distance from SURVIVE_HEALTH at which the health rule is fully confident
+HEALTH_MARGIN = 20
+# Health below which fighting a high or very high level enemy is a judgement call
+STRONG_ENEMY_HEALTH = 60
+# Stamina one attack costs
+ATTACK_STAMINA = 15
+# Confidence of a decision that one of the rules above makes doubtful
+DOUBTFUL_CONFIDENCE = 0.5
+
+
+class GoalDecision(NamedTuple):
+    "Goals picked by the rule-based goal policy, with how sure the rules are about them"
+    primary_goal: Goal
+    secondary_goal: Goal
+    confidence: float
+    justification: str
+
+
+def rule_based_goals(world_state: WorldState) -> GoalDecision:
+    """
+    Pick primary and secondary goals with the thresholds the goal generator prompt describes.
+
+    The confidence is 1 when the world state is clearly on one side of every rule and
+    drops when it is not: linearly as health approaches the survive threshold, and to
+    DOUBTFUL_CONFIDENCE when an enemy has to be fought by a weakened guardian facing a
+    strong enemy or without the stamina for an attack. Those are the situations the
+    rules cannot settle and the LLM should decide.
+
+    Args:
+        world_state: The current world state.
+
+    Returns:
+        The goals, the confidence between 0 and 1 and a justification for the goal generator message.
+    """
+
+    health = world_state["health"]
+    confidence = min(1.0, abs(health - SURVIVE_HEALTH) / HEALTH_MARGIN)
+
+    if health < SURVIVE_HEALTH:
+        return GoalDecision(Goal.SURVIVE, Goal.PREPARE_FOR_BATTLE, confidence, f"Health {health} is below {SURVIVE_HEALTH}.")
+
+    if world_state["enemyNearby"]:
+        justification = "An enemy is nearby."
+        if world_state["enemyLevel"] in ("high", "very_high") and health < STRONG_ENEMY_HEALTH:
+            confidence = min(confidence, DOUBTFUL_CONFIDENCE)
+            justification += f" The enemy is {world_state['enemyLevel']} and health is only {health}."
+        if world_state["stamina"] < ATTACK_STAMINA:
+            confidence = min(confidence, DOUBTFUL_CONFIDENCE)
+            justification += f" Stamina {world_state['stamina']} is too low to attack."
+        return GoalDecision(Goal.ELIMINATE_THREAT, Goal.PROTECT_TREASURE, confidence, justification)
+
+    if world_state["treasureThreatLevel"] != "low":
+        return GoalDecision(
+            Goal.PROTECT_TREASURE,
+            Goal.PREPARE_FOR_BATTLE,
+            confidence,
+            f"No enemy is nearby but the treasure threat level is {world_state['treasureThreatLevel']}."
+        )
+
+    return GoalDecision(Goal.PREPARE_FOR_BATTLE, Goal.PROTECT_TREASURE, confidence, "No enemy is nearby and the treasure is safe.")
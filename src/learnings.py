@@ -0,0 +1,227 @@
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Union
+import json
+import os
+import tempfile
+import threading
+from .agent.structs import HistoricalLearnings
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock is used
+    fcntl = None
+
+
+LEARNINGS_FILE_NAME = "historical_learnings.json"
+JOURNAL_FILE_NAME = "learnings_journal.jsonl"
+EPISODE_QUEUE_FILE_NAME = "episode_queue.jsonl"
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False, blocking: bool = True):
+    """
+    Hold an advisory lock on `path` + ".lock" across processes.
+
+    Args:
+        path: The file to lock.
+        shared: Take a shared (read) lock instead of an exclusive (write) lock.
+        blocking: Wait for the lock. If False, the context yields False instead of
+                  waiting when another process holds the lock.
+
+    Yields:
+        bool: True when the lock is held.
+    """
+
+    if fcntl is None:
+        yield True
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(lock_file.fileno(), flags if blocking else flags | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write_json(path: str, payload, indent: Optional[int] = 4):
+    "Write JSON to a temporary file next to `path` and atomically replace `path` with it"
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class LearningsStore:
+    """
+    In-memory view of historical_learnings.json.
+
+    The file is parsed once and served from memory until its modification time, size or
+    inode changes. Writes go through a temporary file and an atomic rename while holding
+    an exclusive lock, so concurrent readers never observe a partially written file.
+    """
+
+    def __init__(self, learning_path: str):
+        self.path = os.path.join(learning_path, LEARNINGS_FILE_NAME)
+        self._lock = threading.RLock()
+        self._learnings: Optional[HistoricalLearnings] = None
+        self._signature = None
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def load(self) -> Optional[HistoricalLearnings]:
+        """
+        Return the historical learnings, re-reading the file only when it has changed.
+
+        Returns:
+            A copy of the parsed learnings, or None if the file does not exist yet.
+        """
+
+        with self._lock:
+            signature = self._file_signature()
+            if signature is None:
+                self._learnings, self._signature = None, None
+                return None
+
+            if signature != self._signature:
+                with file_lock(self.path, shared=True):
+                    signature = self._file_signature()
+                    with open(self.path, "r") as f:
+                        self._learnings = HistoricalLearnings.model_validate(json.load(f))
+                self._signature = signature
+
+            return self._learnings.model_copy(deep=True)
+
+    def load_dict(self) -> dict:
+        "Return the learnings as a dictionary, or an empty dictionary if there are none yet"
+        learnings = self.load()
+        return learnings.model_dump() if learnings else {}
+
+    def save(self, learnings: Union[HistoricalLearnings, dict]):
+        "Atomically replace the learnings file and the in-memory copy"
+
+        if isinstance(learnings, dict):
+            learnings = HistoricalLearnings.model_validate(learnings)
+
+        with self._lock, file_lock(self.path):
+            atomic_write_json(self.path, learnings.model_dump())
+            self._learnings = learnings.model_copy(deep=True)
+            self._signature = self._file_signature()
+
+
+class LearningsJournal:
+    """
+    Append-only JSONL journal of per-episode learning insights.
+
+    Every episode appends one line under an exclusive lock, so concurrent episodes never
+    overwrite each other's insights. A consolidation step later folds the journal into
+    the HistoricalLearnings summary and removes the entries it consumed. The same class
+    backs the episode queue of the batch learning mode (see get_episode_queue).
+    """
+
+    def __init__(self, learning_path: str, file_name: str = JOURNAL_FILE_NAME):
+        self.path = os.path.join(learning_path, file_name)
+        self._lock = threading.Lock()
+
+    def append(self, entry: Dict[str, Any]):
+        "Append one entry as a single JSON line"
+
+        line = json.dumps(entry) + "\n"
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock, file_lock(self.path):
+            with open(self.path, "a") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read(self) -> List[Dict[str, Any]]:
+        "Return all entries currently in the journal"
+
+        with self._lock, file_lock(self.path, shared=True):
+            return self._read()
+
+    def _read(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def __len__(self) -> int:
+        return len(self.read())
+
+    def remove_first(self, count: int):
+        """
+        Drop the first `count` entries, keeping any entry appended after them.
+
+        Used by consolidation after the entries it read have been merged into the
+        historical learnings.
+        """
+
+        with self._lock, file_lock(self.path):
+            remaining = self._read()[count:]
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".jsonl")
+            with os.fdopen(fd, "w") as f:
+                for entry in remaining:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+
+
+_store_registry = {}
+_store_registry_lock = threading.Lock()
+
+
+def get_learnings_store(learning_path: str) -> LearningsStore:
+    "Return the process-wide LearningsStore for a learning path"
+    key = os.path.abspath(learning_path)
+    with _store_registry_lock:
+        if key not in _store_registry:
+            _store_registry[key] = LearningsStore(learning_path)
+        return _store_registry[key]
+
+
+_journal_registry = {}
+
+
+def get_learnings_journal(learning_path: str) -> LearningsJournal:
+    "Return the process-wide LearningsJournal for a learning path"
+    key = os.path.abspath(learning_path)
+    with _store_registry_lock:
+        if key not in _journal_registry:
+            _journal_registry[key] = LearningsJournal(learning_path)
+        return _journal_registry[key]
+
+
+_episode_queue_registry = {}
+
+
+def get_episode_queue(learning_path: str) -> LearningsJournal:
+    "Return the process-wide queue of episode summaries waiting for the batch learner"
+    key = os.path.abspath(learning_path)
+    with _store_registry_lock:
+        if key not in _episode_queue_registry:
+            _episode_queue_registry[key] = LearningsJournal(learning_path, EPISODE_QUEUE_FILE_NAME)
+        return _episode_queue_registry[key]
@@ -0,0 +1,465 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+import asyncio
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from .configuration import Configuration
+
+
+# Upper bounds of the latency histogram buckets in seconds, as in the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class MetricsRegistry:
+    """
+    In-process registry of counters and histograms in the style of Prometheus.
+
+    Metrics are identified by name and a set of labels. The registry is thread-safe and
+    can be rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._counters: Dict[tuple, float] = {}
+        self._histograms: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> tuple:
+        return (name, tuple(sorted((key, str(value)) for key, value in labels.items())))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        "Increase a counter"
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        "Record one observation of a histogram"
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    "count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(self.buckets)
+                }
+            histogram["count"] += 1
+            histogram["sum"] += value
+            histogram["max"] = max(histogram["max"], value)
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                histogram["buckets"][index] += 1
+
+    def counter(self, name: str, **labels) -> float:
+        "Return the sum of a counter over all label sets that include the given labels"
+        wanted = set((key, str(value)) for key, value in labels.items())
+        with self._lock:
+            return sum(value for (metric, key), value in self._counters.items() if metric == name and wanted <= set(key))
+
+    def snapshot(self) -> Dict[str, List[dict]]:
+        "Return all metrics as plain data, grouped by metric name"
+        snapshot: Dict[str, List[dict]] = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                snapshot.setdefault(name, []).append({"labels": dict(labels), "value": value})
+            for (name, labels), histogram in self._histograms.items():
+                snapshot.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": histogram["count"],
+                    "sum": histogram["sum"],
+                    "max": histogram["max"]
+                })
+        return snapshot
+
+    def render_prometheus(self) -> str:
+        "Render all metrics in the Prometheus text exposition format"
+
+        def render_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{render_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, histogram["buckets"]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{render_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_bucket{render_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+                    lines.append(f"{name}_sum{render_labels(labels)} {histogram['sum']}")
+                    lines.append(f"{name}_count{render_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        "Drop all recorded metrics"
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
+
+
+class MetricsWriter:
+    "Appends metric events as JSON lines to a file, shared by all threads of the process"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def write(self, event: Dict[str, Any]):
+        line = json.dumps(event) + "\n"
+        with self._lock, open(self.path, "a") as f:
+            f.write(line)
+
+
+_writer_registry = {}
+_writer_registry_lock = threading.Lock()
+
+
+def get_metrics_writer(path: str) -> MetricsWriter:
+    "Return the process-wide MetricsWriter for a JSONL path"
+    key = os.path.abspath(path)
+    with _writer_registry_lock:
+        if key not in _writer_registry:
+            _writer_registry[key] = MetricsWriter(path)
+        return _writer_registry[key]
+
+
+# The node invocation that is currently running in this thread or task, so that LLM calls,
+# cache lookups and action executions are attributed to it.
+_node_context: ContextVar[Optional[dict]] = ContextVar("node_context", default=None)
+
+
+def _current_node() -> str:
+    context = _node_context.get()
+    return context["node"] if context else ""
+
+
+def record_event(event: str, **fields):
+    "Write a metric event to the JSONL file of the running node, if metrics_path is configured"
+    context = _node_context.get()
+    if not context or not context["metricsPath"]:
+        return
+    get_metrics_writer(context["metricsPath"]).write({
+        "timestamp": time.time(),
+        "event": event,
+        "node": context["node"],
+        "threadId": context["threadId"],
+        "iteration": context["iteration"],
+        **fields
+    })
+
+
+def record_llm_call(
+        seconds: float,
+        model: str = "",
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        error: bool = False,
+        cache_read_tokens: int = 0,
+        cache_creation_tokens: int = 0
+):
+    """
+    Record the latency and token usage of one LLM request.
+
+    Cache read and cache creation tokens are the parts of the prompt tokens that the
+    provider served from, or wrote to, its prompt prefix cache.
+    """
+    node = _current_node()
+    registry.observe("dungeon_llm_request_duration_seconds", seconds, node=node)
+    registry.inc("dungeon_llm_requests_total", node=node, status="error" if error else "ok")
+    registry.inc("dungeon_llm_tokens_total", prompt_tokens, node=node, type="prompt")
+    registry.inc("dungeon_llm_tokens_total", completion_tokens, node=node, type="completion")
+    registry.inc("dungeon_llm_tokens_total", cache_read_tokens, node=node, type="cache_read")
+    registry.inc("dungeon_llm_tokens_total", cache_creation_tokens, node=node, type="cache_creation")
+    record_event(
+        "llm",
+        seconds=seconds,
+        model=model,
+        promptTokens=prompt_tokens,
+        completionTokens=completion_tokens,
+        cacheReadTokens=cache_read_tokens,
+        cacheCreationTokens=cache_creation_tokens,
+        error=error
+    )
+
+
+def record_cache_lookup(hit: bool):
+    "Record a response cache hit or miss"
+    registry.inc("dungeon_response_cache_lookups_total", node=_current_node(), result="hit" if hit else "miss")
+    record_event("cache", hit=hit)
+
+
+def record_goal_decision(confidence: float, escalation: Optional[str] = None):
+    "Record a decision of the rule-based goal policy and, if the LLM was asked instead, why"
+    registry.inc(
+        "dungeon_goal_decisions_total",
+        node=_current_node(),
+        source="llm" if escalation else "rules",
+        reason=escalation or "confident"
+    )
+    record_event("goalDecision", confidence=confidence, escalation=escalation)
+
+
+def record_loop_detection(kind: str, action: str):
+    "Record that an episode was found going in circles (`kind` is cycle or stagnation) and what was done about it"
+    registry.inc("dungeon_loop_detections_total", node=_current_node(), kind=kind, action=action)
+    record_event("loop", kind=kind, action=action)
+
+
+def record_learning_batch(episodes: int, seconds: float, error: bool = False):
+    "Record one LLM call of the batch learner and the number of queued episodes it covered"
+    registry.observe("dungeon_learning_batch_seconds", seconds)
+    registry.inc("dungeon_learning_batches_total", status="error" if error else "ok")
+    if not error:
+        registry.inc("dungeon_learning_batch_episodes_total", episodes)
+    record_event("learningBatch", episodes=episodes, seconds=seconds, error=error)
+
+
+@contextmanager
+def attribute_to(node: str, metrics_path: str = ""):
+    "Attribute the metrics recorded in the block to `node`, for LLM work done outside of the graph"
+    token = _node_context.set({"node": node, "threadId": "", "iteration": 0, "metricsPath": metrics_path})
+    try:
+        yield
+    finally:
+        _node_context.reset(token)
+
+
+def record_plan_candidates(candidates: int, valid: int, chosen: int):
+    "Record how many candidate plans were generated, how many passed the dry run and which one was chosen"
+    node = _current_node()
+    registry.inc("dungeon_plan_candidates_total", valid, node=node, valid="true")
+    registry.inc("dungeon_plan_candidates_total", candidates - valid, node=node, valid="false")
+    record_event("planCandidates", candidates=candidates, valid=valid, chosen=chosen)
+
+
+@contextmanager
+def time_action_execution():
+    """
+    Time the execution of an action sequence and yield a dict to store the number of executed
+    actions in. The elapsed `seconds` are added to the dict when the block exits.
+    """
+    result = {"actions": 0}
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        seconds = result["seconds"] = time.perf_counter() - started
+        registry.observe("dungeon_action_execution_seconds", seconds)
+        registry.inc("dungeon_actions_executed_total", result["actions"])
+        record_event("actions", seconds=seconds, actions=result["actions"])
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    "LangChain callback handler that records the latency and token usage of every chat model call"
+
+    run_inline = True
+
+    def __init__(self):
+        self._runs: Dict[UUID, tuple] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs):
+        self._runs[run_id] = (time.perf_counter(), (metadata or {}).get("ls_model_name", ""))
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs):
+        self._runs[run_id] = (time.perf_counter(), (metadata or {}).get("ls_model_name", ""))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        started, model = self._runs.pop(run_id, (time.perf_counter(), ""))
+        prompt_tokens, completion_tokens, cache_read_tokens, cache_creation_tokens = _token_usage(response)
+        record_llm_call(
+            time.perf_counter() - started,
+            model,
+            prompt_tokens,
+            completion_tokens,
+            cache_read_tokens=cache_read_tokens,
+            cache_creation_tokens=cache_creation_tokens
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        started, model = self._runs.pop(run_id, (time.perf_counter(), ""))
+        record_llm_call(time.perf_counter() - started, model, error=True)
+
+
+def _token_usage(response: LLMResult) -> tuple[int, int, int, int]:
+    "Read the prompt, completion, cache read and cache creation token counts from a chat model response"
+    prompt_tokens = completion_tokens = cache_read_tokens = cache_creation_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+                details = usage.get("input_token_details") or {}
+                cache_read_tokens += details.get("cache_read", 0) or 0
+                cache_creation_tokens += details.get("cache_creation", 0) or 0
+    if not prompt_tokens and not completion_tokens and response.llm_output:
+        usage = response.llm_output.get("token_usage") or response.llm_output.get("usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0
+        completion_tokens = usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0
+    return prompt_tokens, completion_tokens, cache_read_tokens, cache_creation_tokens
+
+
+llm_metrics_callback = LLMMetricsCallback()
+
+
+def instrument_node(name: str, node):
+    """
+    Wrap a graph node so that every invocation records its wall time.
+
+    While the node runs, LLM calls, cache lookups and action executions are attributed to
+    it and to the episode and iteration it belongs to. Events go to the JSONL file set by
+    `metrics_path` and all metrics to the in-process registry.
+
+    Args:
+        name: The name of the node in the graph.
+        node: The node function, sync or async, taking (state, config).
+
+    Returns:
+        The wrapped node with the same signature.
+    """
+
+    def enter(state, config):
+        configurable = Configuration.from_runnable_config(config)
+        return _node_context.set({
+            "node": name,
+            "threadId": configurable.thread_id,
+            "iteration": state.get("iterations", 0),
+            "metricsPath": configurable.metrics_path
+        })
+
+    def leave(token, started, error):
+        seconds = time.perf_counter() - started
+        status = "error" if error else "ok"
+        registry.observe("dungeon_node_duration_seconds", seconds, node=name, status=status)
+        record_event("node", seconds=seconds, status=status)
+        _node_context.reset(token)
+
+    if asyncio.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(state, config):
+            token, started, error = enter(state, config), time.perf_counter(), True
+            try:
+                result = await node(state, config)
+                error = False
+                return result
+            finally:
+                leave(token, started, error)
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(state, config):
+        token, started, error = enter(state, config), time.perf_counter(), True
+        try:
+            result = node(state, config)
+            error = False
+            return result
+        finally:
+            leave(token, started, error)
+    return wrapper
+
+
+def format_metrics_summary(metrics: MetricsRegistry = registry) -> str:
+    "Render a plain text report of node latencies, LLM usage, cache hits, goal policy escalations, loops, batch learning and action execution time"
+
+    snapshot = metrics.snapshot()
+    lines = []
+
+    def histogram_rows(name, label):
+        rows = {}
+        for entry in snapshot.get(name, []):
+            key = entry["labels"].get(label, "")
+            row = rows.setdefault(key, {"count": 0, "sum": 0.0, "max": 0.0})
+            row["count"] += entry["count"]
+            row["sum"] += entry["sum"]
+            row["max"] = max(row["max"], entry["max"])
+        return rows
+
+    nodes = histogram_rows("dungeon_node_duration_seconds", "node")
+    if nodes:
+        lines.append(f"{'node':<26} {'calls':>7} {'mean s':>9} {'max s':>9} {'total s':>9}")
+        for node, row in sorted(nodes.items(), key=lambda item: -item[1]["sum"]):
+            lines.append(
+                f"{node:<26} {row['count']:>7} {row['sum'] / row['count']:>9.3f} {row['max']:>9.3f} {row['sum']:>9.3f}"
+            )
+
+    llm = histogram_rows("dungeon_llm_request_duration_seconds", "node")
+    if llm:
+        lines.append("")
+        lines.append(
+            f"{'llm calls by node':<26} {'calls':>7} {'mean s':>9} {'prompt tok':>11} {'cached tok':>11} {'compl tok':>10}"
+        )
+        for node, row in sorted(llm.items()):
+            lines.append(
+                f"{node:<26} {row['count']:>7} {row['sum'] / row['count']:>9.3f} "
+                f"{int(metrics.counter('dungeon_llm_tokens_total', node=node, type='prompt')):>11} "
+                f"{int(metrics.counter('dungeon_llm_tokens_total', node=node, type='cache_read')):>11} "
+                f"{int(metrics.counter('dungeon_llm_tokens_total', node=node, type='completion')):>10}"
+            )
+
+    hits = metrics.counter("dungeon_response_cache_lookups_total", result="hit")
+    misses = metrics.counter("dungeon_response_cache_lookups_total", result="miss")
+    if hits or misses:
+        lines.append("")
+        lines.append(f"response cache: {int(hits)} hits, {int(misses)} misses ({hits / (hits + misses):.0%} hit rate)")
+
+    decisions = metrics.counter("dungeon_goal_decisions_total")
+    if decisions:
+        escalated = metrics.counter("dungeon_goal_decisions_total", source="llm")
+        lines.append(
+            f"goal policy: {int(decisions)} decisions, {int(escalated)} escalated to the LLM "
+            f"({escalated / decisions:.0%}; "
+            f"{int(metrics.counter('dungeon_goal_decisions_total', reason='low_confidence'))} low confidence, "
+            f"{int(metrics.counter('dungeon_goal_decisions_total', reason='action_failed'))} after an action failure, "
+            f"{int(metrics.counter('dungeon_goal_decisions_total', reason='strategy_reset'))} after a strategy reset)"
+        )
+
+    loops = metrics.counter("dungeon_loop_detections_total")
+    if loops:
+        lines.append(
+            f"loop detection: {int(metrics.counter('dungeon_loop_detections_total', kind='cycle'))} cycles, "
+            f"{int(metrics.counter('dungeon_loop_detections_total', kind='stagnation'))} stagnations "
+            f"({int(metrics.counter('dungeon_loop_detections_total', action='reset'))} strategy resets, "
+            f"{int(metrics.counter('dungeon_loop_detections_total', action='terminate'))} terminations)"
+        )
+
+    batches = metrics.counter("dungeon_learning_batches_total")
+    if batches:
+        lines.append(
+            f"batch learning: {int(batches)} LLM calls for "
+            f"{int(metrics.counter('dungeon_learning_batch_episodes_total'))} episodes "
+            f"({int(metrics.counter('dungeon_learning_batches_total', status='error'))} failed)"
+        )
+
+    actions = histogram_rows("dungeon_action_execution_seconds", "")
+    if actions:
+        row = actions[""]
+        lines.append(
+            f"action execution: {row['count']} sequences, "
+            f"{int(metrics.counter('dungeon_actions_executed_total'))} actions, "
+            f"{row['sum'] * 1000:.2f} ms total"
+        )
+
+    return "\n".join(lines)
@@ -0,0 +1,290 @@
+from typing import List, Optional, Tuple
+from itertools import count
+import heapq
+from .type import WorldState, FrozenWorldState, Goal
+from .action import compiled_actions, action_failure_probability
+from .utils import check_failure_conditions, check_success_conditions
+
+
+goal_conditions = {
+    Goal.SURVIVE: [
+        lambda x: x['health'] >= 40,
+        lambda x: x['isInSafeZone'] == True or x['enemyNearby'] == False
+    ],
+    Goal.ELIMINATE_THREAT: [
+        lambda x: x['enemyNearby'] == False
+    ],
+    Goal.PROTECT_TREASURE: [
+        lambda x: x['treasureThreatLevel'] == 'low'
+    ],
+    Goal.PREPARE_FOR_BATTLE: [
+        lambda x: x['potionCount'] > 0,
+        lambda x: x['health'] >= 60,
+        lambda x: x['stamina'] >= 50
+    ]
+}
+
+
+def parse_goal(goal: Optional[str]) -> Optional[Goal]:
+    """
+    Map a free-form goal string onto the Goal enum.
+
+    The goal generator answers with names such as "Survive", "EliminateThreat" or
+    "ELIMINATE_THREAT", so the comparison ignores case, spaces and underscores.
+
+    Args:
+        goal: The goal string produced by the goal generator.
+
+    Returns:
+        The matching Goal, or None if the string does not name a known goal.
+    """
+
+    if not goal:
+        return None
+
+    normalized = "".join(c for c in goal.lower() if c.isalnum())
+    for member in Goal:
+        if normalized == member.value.replace("_", ""):
+            return member
+    return None
+
+
+def apply_action(world_state: WorldState, action_name: str) -> Optional[WorldState]:
+    """
+    Apply an action deterministically, the same way the action executor does.
+
+    Args:
+        world_state: The world state to apply the action to. It is not modified.
+        action_name: The name of the action in compiled_actions.
+
+    Returns:
+        The resulting world state, or None if a precondition is not met.
+    """
+
+    return compiled_actions[action_name](world_state)
+
+
+def goals_satisfied(world_state: WorldState, goals: List[Goal]) -> bool:
+    "Check whether every condition of every goal holds in the world state"
+    return all(condition(world_state) for goal in goals for condition in goal_conditions[goal])
+
+
+def plan(
+        world_state: WorldState,
+        goals: List[Goal],
+        max_depth: int = 8,
+        max_expansions: int = 50000
+) -> Optional[List[str]]:
+    """
+    Find the shortest action sequence that satisfies all given goals using A* search.
+
+    Every action costs 1 and the heuristic is 1 while any goal condition is unmet, so
+    the returned sequence is a shortest one. States that trigger a game failure
+    condition (health, stamina or treasure health reaching 0) are never expanded.
+    Probabilistic action failures are ignored; the search assumes every action succeeds.
+
+    Args:
+        world_state: The starting world state.
+        goals: The goals whose conditions must all hold at the end of the plan.
+        max_depth: The maximum number of actions in a plan.
+        max_expansions: The maximum number of states to expand before giving up.
+
+    Returns:
+        The list of action names to execute, an empty list if the goals already hold,
+        or None if no plan was found within the limits.
+    """
+
+    def heuristic(state: WorldState) -> int:
+        return 0 if goals_satisfied(state, goals) else 1
+
+    tie_breaker = count()
+    frontier = [(heuristic(world_state), next(tie_breaker), world_state, [])]
+    best_cost = {FrozenWorldState.from_dict(world_state): 0}
+    expansions = 0
+
+    while frontier and expansions < max_expansions:
+        _, _, state, sequence = heapq.heappop(frontier)
+
+        if goals_satisfied(state, goals):
+            return sequence
+
+        if best_cost.get(FrozenWorldState.from_dict(state), float("inf")) < len(sequence) or len(sequence) >= max_depth:
+            continue
+
+        expansions += 1
+
+        for action_name in compiled_actions:
+            next_state = apply_action(state, action_name)
+            if next_state is None or check_failure_conditions(next_state)[0]:
+                continue
+
+            next_key = FrozenWorldState.from_dict(next_state)
+            cost = len(sequence) + 1
+            if cost < best_cost.get(next_key, float("inf")):
+                best_cost[next_key] = cost
+                heapq.heappush(
+                    frontier,
+                    (cost + heuristic(next_state), next(tie_breaker), next_state, sequence + [action_name])
+                )
+
+    return None
+
+
+def plan_for_goals(
+        world_state: WorldState,
+        primary_goal: Optional[str],
+        secondary_goal: Optional[str],
+        max_depth: int = 8
+) -> Tuple[Optional[List[str]], str]:
+    """
+    Plan for the primary and secondary goals, falling back to each goal alone.
+
+    The planner first tries to satisfy both goals, then the primary goal only and
+    finally the secondary goal only, mirroring the fallback rules of the LLM planner.
+
+    Args:
+        world_state: The starting world state.
+        primary_goal: The primary goal string from the goal generator.
+        secondary_goal: The secondary goal string from the goal generator.
+        max_depth: The maximum number of actions in a plan.
+
+    Returns:
+        tuple[Optional[List[str]], str]: (action_sequence, justification)
+            - action_sequence: The plan found, or None if no goal could be planned for
+            - justification: A short explanation of which goals the plan achieves
+    """
+
+    primary = parse_goal(primary_goal)
+    secondary = parse_goal(secondary_goal)
+
+    attempts = []
+    if primary and secondary and primary != secondary:
+        attempts.append([primary, secondary])
+    if primary:
+        attempts.append([primary])
+    if secondary and secondary != primary:
+        attempts.append([secondary])
+
+    for goals in attempts:
+        action_sequence = plan(world_state, goals, max_depth=max_depth)
+        if action_sequence is not None:
+            goal_names = " and ".join(goal.name for goal in goals)
+            return action_sequence, f"Shortest action sequence found by symbolic search that achieves {goal_names}."
+
+    return None, f"Symbolic search found no valid action sequence for goals {primary_goal!r} and {secondary_goal!r}."
+
+
+def validate_plan(world_state: WorldState, action_sequence: List[str]) -> dict:
+    """
+    Dry-run an action sequence against a copy of the world state, without executing it.
+
+    Every action is assumed to succeed, i.e. the failure probabilities are ignored. The
+    check is pure and cheap, so it can run in a graph node or directly in a router.
+
+    Args:
+        world_state: The world state the plan starts from. It is not modified.
+        action_sequence: The planned action names.
+
+    Returns:
+        dict: The validation result containing:
+            - valid: True if every action can be executed without triggering a game failure
+            - invalidStep: Index of the first invalid action, None if the plan is valid
+            - invalidAction: Name of the first invalid action, None if the plan is valid
+            - reason: Why that action is invalid, empty string if the plan is valid
+            - predictedWorldState: World state after the valid prefix of the plan
+    """
+
+    def result(state, step=None, action_name=None, reason=""):
+        return {
+            "valid": step is None,
+            "invalidStep": step,
+            "invalidAction": action_name,
+            "reason": reason,
+            "predictedWorldState": state
+        }
+
+    state = world_state
+    for step, action_name in enumerate(action_sequence):
+        if action_name not in compiled_actions:
+            return result(state, step, action_name, f"unknown action, must be one of {list(compiled_actions)}")
+
+        next_state = apply_action(state, action_name)
+        if next_state is None:
+            return result(state, step, action_name, "its preconditions are not met")
+
+        is_failed, reason = check_failure_conditions(next_state)
+        if is_failed:
+            return result(state, step, action_name, f"it would end the game: {reason}")
+
+        state = next_state
+
+    return result(state)
+
+
+def score_plan(
+        world_state: WorldState,
+        action_sequence: List[str],
+        primary_goal: Optional[str] = None,
+        secondary_goal: Optional[str] = None
+) -> dict:
+    """
+    Score a candidate plan with a dry run, so that the best of several plans can be executed.
+
+    Candidates are ranked by, in order: validity, whether the mission success conditions
+    hold after the plan, whether the primary and then the secondary goal hold, the
+    expected health plus treasure health, and finally the plan length (shorter is
+    better). The expectation weighs the predicted outcome with the probability that no
+    action fails by chance and assumes the current health and treasure health
+    otherwise, so a plan that does nothing never outranks one that makes progress just
+    because it cannot fail.
+
+    Args:
+        world_state: The world state the plan starts from. It is not modified.
+        action_sequence: The planned action names.
+        primary_goal: The primary goal string from the goal generator.
+        secondary_goal: The secondary goal string from the goal generator.
+
+    Returns:
+        dict: The validate_plan result extended with:
+            - success: True if the success conditions hold after the plan
+            - primaryGoalSatisfied: True if the primary goal holds after the plan
+            - secondaryGoalSatisfied: True if the secondary goal holds after the plan
+            - successProbability: Probability that no action of the plan fails by chance
+            - score: Tuple to compare candidates with, higher is better
+    """
+
+    validation = validate_plan(world_state, action_sequence)
+    predicted = validation["predictedWorldState"]
+    executed = action_sequence if validation["valid"] else action_sequence[:validation["invalidStep"]]
+
+    success_probability = 1.0
+    for action_name in executed:
+        success_probability *= 1 - action_failure_probability.get(action_name, {}).get("probability", 0)
+
+    def goal_satisfied(goal: Optional[str]) -> bool:
+        parsed = parse_goal(goal)
+        return parsed is not None and goals_satisfied(predicted, [parsed])
+
+    success = check_success_conditions(predicted)[0]
+    primary_satisfied = goal_satisfied(primary_goal)
+    secondary_satisfied = goal_satisfied(secondary_goal)
+
+    current_value = world_state["health"] + world_state["treasureHealth"]
+    predicted_value = predicted["health"] + predicted["treasureHealth"]
+    expected_value = success_probability * predicted_value + (1 - success_probability) * current_value
+
+    return {
+        **validation,
+        "success": success,
+        "primaryGoalSatisfied": primary_satisfied,
+        "secondaryGoalSatisfied": secondary_satisfied,
+        "successProbability": success_probability,
+        "score": (
+            validation["valid"],
+            success,
+            primary_satisfied,
+            secondary_satisfied,
+            expected_value,
+            -len(action_sequence)
+        )
+    }
@@ -0,0 +1,330 @@
+from typing import Dict, List, Optional
+import argparse
+import json
+import os
+import threading
+import numpy as np
+from .type import WorldState, FrozenWorldState
+from .action import (
+    action_failure_probability,
+    batch_apply,
+    compiled_actions,
+    pack_structured,
+    to_structured,
+    unpack_structured,
+)
+from .scenarios import load_scenarios
+
+
+INDEX_FILE_NAME = "policy_index.npy"
+METADATA_FILE_NAME = "policy_index.json"
+
+# Slot layout of the on-disk open addressing hash table. Empty slots hold EMPTY_KEY;
+# packed world states use 40 bits, so they never collide with it.
+INDEX_DTYPE = np.dtype([
+    ("key", np.uint64),
+    ("action", np.int8),
+    ("value", np.float32),
+])
+EMPTY_KEY = np.uint64(0xFFFFFFFFFFFFFFFF)
+NO_ACTION = -1
+
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _slots(keys: np.ndarray, bits: int) -> np.ndarray:
+    "Fibonacci hashing of packed world states onto a table of 2**bits slots"
+    with np.errstate(over="ignore"):
+        return ((keys * _HASH_MULTIPLIER) >> np.uint64(64 - bits)).astype(np.int64)
+
+
+def _terminal_masks(states: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    "Vectorized check_success_conditions and check_failure_conditions"
+    success = ~states["enemyNearby"] & (states["treasureThreatLevel"] == 0)
+    failure = (states["health"] <= 0) | (states["treasureHealth"] <= 0) | (states["stamina"] <= 0)
+    return success & ~failure, failure
+
+
+def enumerate_reachable(world_states: List[WorldState], max_states: int = 5_000_000) -> np.ndarray:
+    """
+    Enumerate every world state reachable from the given ones under the game actions.
+
+    The search runs breadth first over whole frontiers with the batch action kernels,
+    including the failure outcome of actions with a failure probability. Success and
+    game failure states are included but not expanded.
+
+    Args:
+        world_states: The initial world states, e.g. the scenarios.
+        max_states: Stop with an error if more states than this are reachable.
+
+    Returns:
+        Sorted array of the packed reachable world states.
+
+    Raises:
+        ValueError: If more than `max_states` states are reachable.
+    """
+
+    seen = np.unique(pack_structured(to_structured(world_states)))
+    frontier = seen
+
+    while len(frontier):
+        states = unpack_structured(frontier)
+        success, failure = _terminal_masks(states)
+        states = states[~(success | failure)]
+
+        successors = []
+        for action_name in compiled_actions:
+            next_states, applicable = batch_apply(action_name, states)
+            successors.append(pack_structured(next_states[applicable]))
+            if action_name in action_failure_probability:
+                failed_states, _ = batch_apply(action_name, states[applicable], failed=True)
+                successors.append(pack_structured(failed_states))
+
+        successors = np.unique(np.concatenate(successors)) if successors else frontier[:0]
+        frontier = np.setdiff1d(successors, seen, assume_unique=True)
+        seen = np.union1d(seen, frontier)
+        if len(seen) > max_states:
+            raise ValueError(f"More than {max_states} reachable world states")
+
+    return seen
+
+
+def value_iteration(
+        keys: np.ndarray,
+        discount: float = 0.95,
+        tolerance: float = 1e-6,
+        max_sweeps: int = 1000
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the optimal action of every state with value iteration.
+
+    Success states are worth 1 and game failure states 0; every action is discounted by
+    `discount`, so the value of a state is the discounted probability of reaching the
+    success conditions, and shorter plans are preferred. Actions with a failure
+    probability, such as heal_self, lead to their failure outcome with that probability.
+
+    Args:
+        keys: Sorted packed world states closed under the actions, from enumerate_reachable.
+        discount: Discount factor per action.
+        tolerance: Stop when no value changes by more than this.
+        max_sweeps: Maximum number of Bellman sweeps.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (actions, values)
+            - actions: Index into the compiled_actions names of the best action of each
+              state, NO_ACTION for terminal states and states without applicable actions
+            - values: The optimal value of each state
+    """
+
+    states = unpack_structured(keys)
+    success, failure = _terminal_masks(states)
+    terminal = success | failure
+
+    # Transition table: for each action, the successor index of every state on success
+    # and on failure, the failure probability and the applicability mask.
+    transitions = []
+    for action_name in compiled_actions:
+        next_states, applicable = batch_apply(action_name, states)
+        applicable &= ~terminal
+        next_states[~applicable] = states[~applicable]
+        next_index = np.searchsorted(keys, pack_structured(next_states))
+        failure_probability = action_failure_probability.get(action_name, {}).get("probability", 0.0)
+        if failure_probability:
+            failed_states, _ = batch_apply(action_name, states, failed=True)
+            failed_states[~applicable] = states[~applicable]
+            failed_index = np.where(applicable, np.searchsorted(keys, pack_structured(failed_states)), 0)
+        else:
+            failed_index = next_index
+        next_index = np.where(applicable, next_index, 0)
+        transitions.append((next_index, failed_index, failure_probability, applicable))
+
+    values = success.astype(np.float64)
+    q_values = np.full((len(transitions), len(keys)), -np.inf)
+
+    for _ in range(max_sweeps):
+        for a, (next_index, failed_index, failure_probability, applicable) in enumerate(transitions):
+            expected = (1 - failure_probability) * values[next_index] + failure_probability * values[failed_index]
+            q_values[a] = np.where(applicable, discount * expected, -np.inf)
+        best = q_values.max(axis=0)
+        new_values = np.where(terminal, values, np.where(np.isfinite(best), best, 0.0))
+        delta = np.abs(new_values - values).max() if len(keys) else 0.0
+        values = new_values
+        if delta < tolerance:
+            break
+
+    has_action = np.isfinite(q_values).any(axis=0) & ~terminal
+    actions = np.where(has_action, q_values.argmax(axis=0), NO_ACTION).astype(np.int8)
+    return actions, values
+
+
+def build_hash_table(keys: np.ndarray, actions: np.ndarray, values: np.ndarray) -> np.ndarray:
+    "Lay out the policy as an open addressing hash table with linear probing, at most half full"
+
+    bits = max(4, int(2 * len(keys) - 1).bit_length())
+    size = 1 << bits
+    table = np.zeros(size, dtype=INDEX_DTYPE)
+    table["key"] = EMPTY_KEY
+    table["action"] = NO_ACTION
+
+    pending = np.arange(len(keys))
+    slots = _slots(keys, bits)
+    while len(pending):
+        free = table["key"][slots] == EMPTY_KEY
+        # Of the pending keys probing the same free slot, the first one takes it
+        _, first = np.unique(np.where(free, slots, -1), return_index=True)
+        placed = first[free[first]]
+        table["key"][slots[placed]] = keys[pending[placed]]
+        table["action"][slots[placed]] = actions[pending[placed]]
+        table["value"][slots[placed]] = values[pending[placed]]
+
+        remaining = np.ones(len(pending), dtype=np.bool_)
+        remaining[placed] = False
+        pending = pending[remaining]
+        slots = (slots[remaining] + 1) % size
+
+    return table
+
+
+def build_policy_index(
+        world_states: List[WorldState],
+        path: str,
+        discount: float = 0.95,
+        max_states: int = 5_000_000
+) -> Dict[str, int]:
+    """
+    Enumerate the states reachable from `world_states`, solve them with value iteration
+    and write the optimal policy to `path` as a memory-mappable hash table.
+
+    Args:
+        world_states: The initial world states, e.g. the scenarios.
+        path: Directory for policy_index.npy and its policy_index.json metadata.
+        discount: Discount factor per action.
+        max_states: Maximum number of reachable states.
+
+    Returns:
+        The metadata written next to the index.
+    """
+
+    keys = enumerate_reachable(world_states, max_states=max_states)
+    actions, values = value_iteration(keys, discount=discount)
+    table = build_hash_table(keys, actions, values)
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, INDEX_FILE_NAME), table)
+
+    states = unpack_structured(keys)
+    success, failure = _terminal_masks(states)
+    metadata = {
+        "actions": list(compiled_actions),
+        "discount": discount,
+        "states": int(len(keys)),
+        "successStates": int(success.sum()),
+        "failureStates": int(failure.sum()),
+        "slots": int(len(table)),
+    }
+    with open(os.path.join(path, METADATA_FILE_NAME), "w") as f:
+        json.dump(metadata, f, indent=4)
+    return metadata
+
+
+class PolicyIndex:
+    """
+    Read-only view of a policy index built by build_policy_index.
+
+    The hash table is memory-mapped, so opening it is cheap, the pages are shared between
+    processes, and a lookup touches only the few slots it probes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._table = np.load(os.path.join(path, INDEX_FILE_NAME), mmap_mode="r")
+        with open(os.path.join(path, METADATA_FILE_NAME), "r") as f:
+            self.metadata = json.load(f)
+        self._action_names = self.metadata["actions"]
+        self._bits = len(self._table).bit_length() - 1
+        self._mask = len(self._table) - 1
+
+    def __len__(self) -> int:
+        return self.metadata["states"]
+
+    def _find(self, world_state: WorldState):
+        try:
+            key = np.uint64(FrozenWorldState.from_dict(world_state).pack())
+        except (KeyError, ValueError):
+            return None
+
+        slot = int(_slots(np.array([key]), self._bits)[0])
+        while True:
+            entry = self._table[slot]
+            if entry["key"] == key:
+                return entry
+            if entry["key"] == EMPTY_KEY:
+                return None
+            slot = (slot + 1) & self._mask
+
+    def __contains__(self, world_state: WorldState) -> bool:
+        return self._find(world_state) is not None
+
+    def best_action(self, world_state: WorldState) -> Optional[str]:
+        "Return the optimal action for the world state, or None if it is terminal or unknown"
+        entry = self._find(world_state)
+        if entry is None or entry["action"] == NO_ACTION:
+            return None
+        return self._action_names[entry["action"]]
+
+    def value(self, world_state: WorldState) -> Optional[float]:
+        "Return the optimal value of the world state, or None if it is unknown"
+        entry = self._find(world_state)
+        return None if entry is None else float(entry["value"])
+
+    def plan(self, world_state: WorldState, max_actions: int = 8) -> Optional[List[str]]:
+        """
+        Follow the policy from the world state, assuming every action succeeds.
+
+        Returns:
+            The action sequence that reaches the success conditions, or None if the state
+            is unknown, the policy cannot reach success, or it takes more than
+            `max_actions` actions.
+        """
+
+        sequence = []
+        while len(sequence) <= max_actions:
+            entry = self._find(world_state)
+            if entry is None:
+                return None
+            if entry["action"] == NO_ACTION:
+                return sequence if entry["value"] == 1 else None
+            action_name = self._action_names[entry["action"]]
+            sequence.append(action_name)
+            world_state = compiled_actions[action_name].apply(world_state)
+        return None
+
+
+_index_registry = {}
+_index_registry_lock = threading.Lock()
+
+
+def get_policy_index(path: str) -> PolicyIndex:
+    "Return the process-wide PolicyIndex for a directory"
+    key = os.path.abspath(path)
+    with _index_registry_lock:
+        if key not in _index_registry:
+            _index_registry[key] = PolicyIndex(path)
+        return _index_registry[key]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Precompute the optimal policy for the states reachable from scenarios.")
+    parser.add_argument("scenarios", help="JSON or JSONL file with the initial world states")
+    parser.add_argument("--output", required=True, help="directory to write the policy index to")
+    parser.add_argument("--discount", type=float, default=0.95)
+    parser.add_argument("--max-states", type=int, default=5_000_000)
+    args = parser.parse_args(argv)
+
+    world_states = [scenario.world_state for scenario in load_scenarios(args.scenarios)]
+    metadata = build_policy_index(world_states, args.output, discount=args.discount, max_states=args.max_states)
+    print(json.dumps(metadata, indent=4))
+
+
+if __name__ == "__main__":
+    main()
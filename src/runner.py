@@ -0,0 +1,316 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from .scenarios import Scenario, load_scenarios
+from .metrics import format_metrics_summary, registry
+from .configuration import Configuration
+from .agent.graph import get_graph
+from .agent.learner import flush_batch_learners
+
+
+@dataclass
+class ScenarioResult:
+    "Outcome of a single scenario run"
+    name: str
+    thread_id: str
+    provider: str
+    status: str
+    end_reason: str
+    iterations: int
+    duration_seconds: float
+    error: Optional[str] = None
+
+
+def _episode_status(results: Dict[str, Any]) -> str:
+    if results.get("successOccurred"):
+        return "success"
+    if results.get("failureOccurred"):
+        return "failure"
+    return "stalled" if results.get("loopAction") == "terminate" else "timed_out"
+
+
+def _episode_config(
+        scenario: Scenario,
+        configurable: Optional[Dict[str, Any]],
+        recursion_limit: int
+) -> Dict[str, Any]:
+    return {
+        "recursion_limit": recursion_limit,
+        "configurable": {**(configurable or {}), **scenario.configurable, "scenario_name": scenario.name, "thread_id": str(uuid.uuid4())}
+    }
+
+
+def _scenario_result(
+        scenario: Scenario,
+        config: Dict[str, Any],
+        started: float,
+        results: Optional[Dict[str, Any]] = None,
+        error: Optional[Exception] = None
+) -> ScenarioResult:
+    common = dict(
+        name=scenario.name,
+        thread_id=config["configurable"]["thread_id"],
+        provider=Configuration.from_runnable_config(config).provider,
+        duration_seconds=time.perf_counter() - started
+    )
+
+    if error is not None:
+        return ScenarioResult(
+            **common,
+            status="error",
+            end_reason="",
+            iterations=0,
+            error=f"{type(error).__name__}: {error}"
+        )
+
+    return ScenarioResult(
+        **common,
+        status=_episode_status(results),
+        end_reason=results.get("endReason") or "The game has run out of iterations.",
+        iterations=results.get("iterations", 0)
+    )
+
+
+def run_scenario(
+        scenario: Scenario,
+        configurable: Optional[Dict[str, Any]] = None,
+        recursion_limit: int = 100
+) -> ScenarioResult:
+    """
+    Run one scenario through the graph and summarize its outcome.
+
+    Errors raised by the graph are caught and reported in the result so that one failing
+    scenario does not abort a whole batch.
+    """
+
+    config = _episode_config(scenario, configurable, recursion_limit)
+    started = time.perf_counter()
+
+    try:
+        results = get_graph(config).invoke({"currentWorldState": scenario.world_state}, config)
+    except Exception as e:
+        return _scenario_result(scenario, config, started, error=e)
+
+    return _scenario_result(scenario, config, started, results=results)
+
+
+async def arun_scenario(
+        scenario: Scenario,
+        configurable: Optional[Dict[str, Any]] = None,
+        recursion_limit: int = 100
+) -> ScenarioResult:
+    "Async variant of run_scenario that drives the graph built from the async nodes"
+
+    config = _episode_config(scenario, configurable, recursion_limit)
+    started = time.perf_counter()
+
+    try:
+        results = await get_graph(config, async_nodes=True).ainvoke({"currentWorldState": scenario.world_state}, config)
+    except Exception as e:
+        return _scenario_result(scenario, config, started, error=e)
+
+    return _scenario_result(scenario, config, started, results=results)
+
+
+def _scenario_provider(scenario: Scenario, configurable: Optional[Dict[str, Any]]) -> str:
+    return Configuration.from_runnable_config(
+        {"configurable": {**(configurable or {}), **scenario.configurable}}
+    ).provider
+
+
+def run_scenarios(
+        scenarios: List[Scenario],
+        max_workers: int = 4,
+        provider_limits: Optional[Dict[str, int]] = None,
+        configurable: Optional[Dict[str, Any]] = None,
+        recursion_limit: int = 100
+) -> List[ScenarioResult]:
+    """
+    Run scenarios concurrently on thread pools with bounded concurrency per provider.
+
+    Each episode makes at most one LLM call at a time, so limiting the number of
+    concurrent episodes per provider also bounds the concurrent requests sent to it.
+    Every provider with a limit gets a pool of its own, so episodes queued behind a
+    saturated provider never hold the threads that episodes for other providers need.
+
+    Args:
+        scenarios: The scenarios to run.
+        max_workers: Size of the thread pool shared by the providers without a limit,
+                     and the upper bound of the pool of each provider with one.
+        provider_limits: Maximum number of concurrent episodes per provider, e.g.
+                         {"openai": 8, "ollama": 1}. Providers not listed are only
+                         bounded by max_workers.
+        configurable: Configurable values passed to every episode. Per-scenario
+                      configurable values take precedence.
+        recursion_limit: The recursion limit for each graph invocation.
+
+    Returns:
+        List of ScenarioResult in the same order as the scenarios.
+    """
+
+    executors = {
+        provider: ThreadPoolExecutor(max_workers=max(1, min(limit, max_workers)))
+        for provider, limit in (provider_limits or {}).items()
+    }
+    shared_executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    try:
+        futures = [
+            executors.get(_scenario_provider(scenario, configurable), shared_executor).submit(
+                run_scenario, scenario, configurable, recursion_limit
+            )
+            for scenario in scenarios
+        ]
+        return [future.result() for future in futures]
+    finally:
+        for executor in [*executors.values(), shared_executor]:
+            executor.shutdown()
+
+
+async def arun_scenarios(
+        scenarios: List[Scenario],
+        max_concurrency: int = 16,
+        provider_limits: Optional[Dict[str, int]] = None,
+        configurable: Optional[Dict[str, Any]] = None,
+        recursion_limit: int = 100
+) -> List[ScenarioResult]:
+    """
+    Run scenarios concurrently on the current event loop.
+
+    Works like run_scenarios, but every episode is a task driving the async graph, so a
+    single thread can keep many episodes waiting on the LLM at the same time.
+
+    Args:
+        scenarios: The scenarios to run.
+        max_concurrency: Maximum number of episodes running at the same time.
+        provider_limits: Maximum number of concurrent episodes per provider.
+        configurable: Configurable values passed to every episode. Per-scenario
+                      configurable values take precedence.
+        recursion_limit: The recursion limit for each graph invocation.
+
+    Returns:
+        List of ScenarioResult in the same order as the scenarios.
+    """
+
+    pool = asyncio.Semaphore(max_concurrency)
+    semaphores = {
+        provider: asyncio.Semaphore(limit) for provider, limit in (provider_limits or {}).items()
+    }
+
+    async def run(scenario: Scenario) -> ScenarioResult:
+        # The provider slot is taken before the pool slot, so episodes waiting for a
+        # saturated provider do not hold pool slots that other providers could use.
+        semaphore = semaphores.get(_scenario_provider(scenario, configurable))
+        if semaphore is None:
+            async with pool:
+                return await arun_scenario(scenario, configurable, recursion_limit)
+        async with semaphore, pool:
+            return await arun_scenario(scenario, configurable, recursion_limit)
+
+    return list(await asyncio.gather(*(run(scenario) for scenario in scenarios)))
+
+
+def format_summary(results: List[ScenarioResult]) -> str:
+    "Format scenario results as a plain-text summary table"
+
+    headers = ["scenario", "status", "iterations", "seconds", "end reason"]
+    rows = [
+        [
+            result.name,
+            result.status,
+            str(result.iterations),
+            f"{result.duration_seconds:.1f}",
+            result.error or result.end_reason
+        ]
+        for result in results
+    ]
+    widths = [max(len(row[i]) for row in [headers] + rows) for i in range(len(headers) - 1)]
+
+    def format_row(row: List[str]) -> str:
+        return "  ".join(cell.ljust(width) for cell, width in zip(row, widths)) + "  " + row[-1]
+
+    lines = [format_row(headers), format_row(["-" * width for width in widths] + ["-" * 10])]
+    lines.extend(format_row(row) for row in rows)
+
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    lines.append("")
+    lines.append(
+        f"{len(results)} scenarios: "
+        + ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+        + f" | total episode time {sum(result.duration_seconds for result in results):.1f}s"
+    )
+    return "\n".join(lines)
+
+
+def _parse_provider_limits(values: List[str]) -> Dict[str, int]:
+    limits = {}
+    for value in values:
+        provider, _, limit = value.partition("=")
+        if not limit:
+            raise argparse.ArgumentTypeError(f"Invalid provider limit '{value}', expected PROVIDER=N")
+        limits[provider] = int(limit)
+    return limits
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run dungeon guardian scenarios in parallel.")
+    parser.add_argument("scenarios", help="JSON or JSONL file with the world states to run")
+    parser.add_argument("--workers", type=int, default=4, help="size of the thread pool, or the maximum concurrency in async mode")
+    parser.add_argument(
+        "--mode", choices=["thread", "async"], default="thread",
+        help="run episodes on a thread pool or as tasks on one event loop"
+    )
+    parser.add_argument(
+        "--provider-limit", action="append", default=[], metavar="PROVIDER=N",
+        help="maximum concurrent episodes for a provider, may be repeated"
+    )
+    parser.add_argument("--recursion-limit", type=int, default=100)
+    parser.add_argument("--output", help="write one JSON result per line to this file")
+    parser.add_argument("--prometheus", help="write the collected metrics in the Prometheus text format to this file")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    scenarios = load_scenarios(args.scenarios)
+    provider_limits = _parse_provider_limits(args.provider_limit)
+
+    if args.mode == "async":
+        results = asyncio.run(arun_scenarios(
+            scenarios,
+            max_concurrency=args.workers,
+            provider_limits=provider_limits,
+            recursion_limit=args.recursion_limit
+        ))
+    else:
+        results = run_scenarios(
+            scenarios,
+            max_workers=args.workers,
+            provider_limits=provider_limits,
+            recursion_limit=args.recursion_limit
+        )
+    # Episodes queued by LEARNING_MODE=batch that did not fill a batch are learned from now
+    flush_batch_learners()
+
+    print(format_summary(results))
+    print(f"wall time {time.perf_counter() - started:.1f}s")
+    print()
+    print(format_metrics_summary())
+
+    if args.prometheus:
+        with open(args.prometheus, "w") as f:
+            f.write(registry.render_prometheus())
+
+    if args.output:
+        with open(args.output, "w") as f:
+            for result in results:
+                f.write(json.dumps(asdict(result)) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+import json
+from .type import WorldState
+
+
+@dataclass
+class Scenario:
+    "A named initial world state with optional per-scenario configurable overrides"
+    name: str
+    world_state: WorldState
+    configurable: Dict[str, Any] = field(default_factory=dict)
+
+
+def load_scenarios(path: str) -> List[Scenario]:
+    """
+    Load scenarios from a JSON or JSONL file.
+
+    A JSON file may hold a list of world states or an object mapping scenario names to
+    world states. A JSONL file holds one world state per line. In lists and JSONL files an
+    entry may also be an object of the form
+    {"name": ..., "worldState": {...}, "configurable": {...}}, where configurable
+    overrides settings such as provider or model for that scenario only.
+
+    Args:
+        path: Path to the .json or .jsonl file.
+
+    Returns:
+        List of scenarios in file order.
+    """
+
+    with open(path, "r") as f:
+        if path.endswith(".jsonl"):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = json.load(f)
+
+    if isinstance(entries, dict):
+        return [Scenario(name, WorldState(**world_state)) for name, world_state in entries.items()]
+
+    scenarios = []
+    for index, entry in enumerate(entries, start=1):
+        if "worldState" in entry:
+            scenarios.append(Scenario(
+                name=entry.get("name", f"scenario_{index}"),
+                world_state=WorldState(**entry["worldState"]),
+                configurable=entry.get("configurable", {})
+            ))
+        else:
+            scenarios.append(Scenario(f"scenario_{index}", WorldState(**entry)))
+    return scenarios
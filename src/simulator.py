@@ -0,0 +1,297 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import argparse
+import importlib
+import json
+import random
+import time
+from .type import WorldState
+from .action import compiled_actions
+from .goal_policy import rule_based_goals
+from .planner import plan_for_goals
+from .policy_index import get_policy_index
+from .scenarios import load_scenarios
+from .utils import execute_action_sequence, check_success_conditions
+
+
+Policy = Callable[[WorldState, random.Random], List[str]]
+
+
+def random_policy(max_actions: int = 3) -> Policy:
+    "Policy that plays between one and `max_actions` random actions whose preconditions hold"
+
+    action_names = list(compiled_actions)
+
+    def policy(world_state: WorldState, rng: random.Random) -> List[str]:
+        sequence = []
+        for _ in range(rng.randint(1, max_actions)):
+            applicable = [name for name in action_names if compiled_actions[name].is_applicable(world_state)]
+            if not applicable:
+                break
+            action_name = rng.choice(applicable)
+            sequence.append(action_name)
+            world_state = compiled_actions[action_name].apply(world_state)
+        return sequence
+
+    return policy
+
+
+def scripted_policy(sequences: List[List[str]]) -> Policy:
+    "Policy that plays the given action sequences in turn, one per iteration, cycling through them"
+
+    def policy(world_state: WorldState, rng: random.Random) -> List[str]:
+        policy.iteration += 1
+        return sequences[(policy.iteration - 1) % len(sequences)]
+
+    policy.iteration = 0
+    return policy
+
+
+def default_goals(world_state: WorldState) -> tuple[str, str]:
+    "Pick primary and secondary goals with the rule-based goal policy"
+
+    decision = rule_based_goals(world_state)
+    return decision.primary_goal.value, decision.secondary_goal.value
+
+
+def planner_policy(goals: Callable[[WorldState], tuple[str, str]] = default_goals, max_depth: int = 8) -> Policy:
+    "Policy that plans with the symbolic planner for the goals picked by `goals`"
+
+    def policy(world_state: WorldState, rng: random.Random) -> List[str]:
+        primary_goal, secondary_goal = goals(world_state)
+        action_sequence, _ = plan_for_goals(world_state, primary_goal, secondary_goal, max_depth=max_depth)
+        return action_sequence or []
+
+    return policy
+
+
+def index_policy(path: str) -> Policy:
+    "Policy that follows the optimal actions of a policy index built with src.policy_index"
+
+    index = get_policy_index(path)
+
+    def policy(world_state: WorldState, rng: random.Random) -> List[str]:
+        action_sequence = index.plan(world_state)
+        if action_sequence is None:
+            action_name = index.best_action(world_state)
+            action_sequence = [action_name] if action_name else []
+        return action_sequence
+
+    return policy
+
+
+POLICIES = {
+    "random": random_policy,
+    "scripted": scripted_policy,
+    "planner": planner_policy,
+    "index": index_policy,
+}
+
+
+def make_policy(name: str, **kwargs) -> Policy:
+    """
+    Build a policy by name.
+
+    Args:
+        name: One of the names in POLICIES, or "module:attribute" naming a policy factory
+              to plug in another planner.
+        **kwargs: Arguments for the policy factory.
+    """
+
+    if name in POLICIES:
+        return POLICIES[name](**kwargs)
+    module_name, _, attribute = name.partition(":")
+    if not attribute:
+        raise ValueError(f"Unknown policy '{name}'. Use one of {sorted(POLICIES)} or 'module:factory'.")
+    return getattr(importlib.import_module(module_name), attribute)(**kwargs)
+
+
+@dataclass
+class EpisodeOutcome:
+    "Outcome of one simulated episode"
+    status: str
+    iterations: int
+    game_failures: List[str] = field(default_factory=list)
+    action_failures: int = 0
+
+
+def simulate_episode(
+        world_state: WorldState,
+        policy: Policy,
+        rng: random.Random,
+        total_iterations: int = 10
+) -> EpisodeOutcome:
+    """
+    Play one episode with the same loop as the agent graph, without any LLM.
+
+    Each iteration the policy proposes an action sequence, which is executed with the
+    game rules, then the success conditions are checked. Game failures reset the world
+    state and the episode continues, as in the graph.
+    """
+
+    game_failures = []
+    action_failures = 0
+    failure_occurred = False
+
+    for iteration in range(1, total_iterations + 1):
+        result = execute_action_sequence(world_state, policy(world_state, rng), rng=rng, describe=False)
+        world_state = result["currentWorldState"]
+        failure_occurred = result["failureOccurred"]
+        if failure_occurred:
+            game_failures.append(result["failureReason"])
+        if result["actionFailed"]:
+            action_failures += 1
+
+        if check_success_conditions(world_state)[0]:
+            return EpisodeOutcome("success", iteration, game_failures, action_failures)
+
+    return EpisodeOutcome(
+        "failure" if failure_occurred else "timed_out",
+        total_iterations,
+        game_failures,
+        action_failures
+    )
+
+
+@dataclass
+class SimulationStats:
+    "Aggregate statistics over simulated episodes"
+    episodes: int = 0
+    status_counts: Dict[str, int] = field(default_factory=dict)
+    failure_reasons: Dict[str, int] = field(default_factory=dict)
+    total_iterations: int = 0
+    action_failures: int = 0
+
+    @property
+    def success_rate(self) -> float:
+        return self.status_counts.get("success", 0) / self.episodes if self.episodes else 0.0
+
+    @property
+    def mean_iterations(self) -> float:
+        return self.total_iterations / self.episodes if self.episodes else 0.0
+
+    def add(self, outcome: EpisodeOutcome):
+        self.episodes += 1
+        self.status_counts[outcome.status] = self.status_counts.get(outcome.status, 0) + 1
+        for reason in outcome.game_failures:
+            self.failure_reasons[reason] = self.failure_reasons.get(reason, 0) + 1
+        self.total_iterations += outcome.iterations
+        self.action_failures += outcome.action_failures
+
+    def merge(self, other: "SimulationStats"):
+        self.episodes += other.episodes
+        for status, count in other.status_counts.items():
+            self.status_counts[status] = self.status_counts.get(status, 0) + count
+        for reason, count in other.failure_reasons.items():
+            self.failure_reasons[reason] = self.failure_reasons.get(reason, 0) + count
+        self.total_iterations += other.total_iterations
+        self.action_failures += other.action_failures
+
+    def to_dict(self) -> dict:
+        return {
+            "episodes": self.episodes,
+            "successRate": self.success_rate,
+            "meanIterations": self.mean_iterations,
+            "statusCounts": self.status_counts,
+            "failureReasons": self.failure_reasons,
+            "actionFailures": self.action_failures
+        }
+
+
+def _simulate_chunk(
+        world_state: WorldState,
+        policy_name: str,
+        policy_kwargs: dict,
+        episodes: int,
+        seed: str,
+        total_iterations: int
+) -> SimulationStats:
+    rng = random.Random(seed)
+    stats = SimulationStats()
+    for _ in range(episodes):
+        policy = make_policy(policy_name, **policy_kwargs)
+        stats.add(simulate_episode(world_state, policy, rng, total_iterations))
+    return stats
+
+
+def simulate(
+        world_state: WorldState,
+        policy: str = "random",
+        episodes: int = 1000,
+        seed: int = 0,
+        total_iterations: int = 10,
+        workers: int = 1,
+        chunk_size: int = 10000,
+        policy_kwargs: Optional[dict] = None
+) -> SimulationStats:
+    """
+    Roll out many episodes from one world state and aggregate their outcomes.
+
+    Episodes are split into chunks of `chunk_size`, each with its own RNG stream seeded
+    from `seed` and the chunk index, so results are reproducible and do not depend on the
+    number of workers.
+
+    Args:
+        world_state: The initial world state of every episode.
+        policy: The policy name, see make_policy.
+        episodes: Number of episodes to simulate.
+        seed: Base seed of the RNG streams.
+        total_iterations: Maximum iterations per episode, as in the agent configuration.
+        workers: Number of processes; 1 runs in the current process.
+        chunk_size: Number of episodes per RNG stream and per task.
+        policy_kwargs: Arguments for the policy factory.
+
+    Returns:
+        The aggregated SimulationStats.
+    """
+
+    chunks = [
+        (world_state, policy, policy_kwargs or {}, min(chunk_size, episodes - start), f"{seed}:{index}", total_iterations)
+        for index, start in enumerate(range(0, episodes, chunk_size))
+    ]
+
+    stats = SimulationStats()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_stats in executor.map(_simulate_chunk, *zip(*chunks)):
+                stats.merge(chunk_stats)
+    else:
+        for chunk in chunks:
+            stats.merge(_simulate_chunk(*chunk))
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Simulate dungeon guardian episodes without an LLM.")
+    parser.add_argument("scenarios", help="JSON or JSONL file with the initial world states")
+    parser.add_argument("--policy", default="random", help=f"one of {sorted(POLICIES)} or module:factory")
+    parser.add_argument("--script", help="JSON list of action sequences for the scripted policy")
+    parser.add_argument("--policy-index", help="directory of the policy index for the index policy")
+    parser.add_argument("--episodes", type=int, default=10000, help="episodes per scenario")
+    parser.add_argument("--iterations", type=int, default=10, help="maximum iterations per episode")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    policy_kwargs = {"sequences": json.loads(args.script)} if args.script else {}
+    if args.policy_index:
+        policy_kwargs = {"path": args.policy_index}
+
+    for scenario in load_scenarios(args.scenarios):
+        started = time.perf_counter()
+        stats = simulate(
+            scenario.world_state,
+            policy=args.policy,
+            episodes=args.episodes,
+            seed=args.seed,
+            total_iterations=args.iterations,
+            workers=args.workers,
+            policy_kwargs=policy_kwargs
+        )
+        elapsed = time.perf_counter() - started
+        print(f"{scenario.name}: {json.dumps(stats.to_dict())} ({stats.episodes / elapsed:,.0f} episodes/s)")
+
+
+if __name__ == "__main__":
+    main()
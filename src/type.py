@@ -1,4 +1,4 @@
-from typing import TypedDict, Literal
+from typing import TypedDict, Literal, NamedTuple, Optional
 from enum import Enum
 
 class WorldState(TypedDict):
@@ -20,4 +20,127 @@ class Goal(Enum):
     SURVIVE = "survive"
     ELIMINATE_THREAT = "eliminate_threat"
     PROTECT_TREASURE = "protect_treasure"
-    PREPARE_FOR_BATTLE = "prepare_for_battle"
\ No newline at end of file
+    PREPARE_FOR_BATTLE = "prepare_for_battle"
+
+
+class TreasureThreatLevel(Enum):
+    "Enum for the treasure threat levels, ordered from lowest to highest"
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+    VERY_HIGH = "very_high"
+
+
+class EnemyLevel(Enum):
+    "Enum for the enemy levels, ordered from no enemy to the strongest enemy"
+    NONE = None
+    VERY_LOW = "very_low"
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+    VERY_HIGH = "very_high"
+    # Some scenarios spell the missing enemy as the string "none"; it is kept apart
+    # from None so that conversions stay lossless.
+    UNSPECIFIED = "none"
+
+
+_TREASURE_THREAT_LEVEL_CODES = {level.value: code for code, level in enumerate(TreasureThreatLevel)}
+_ENEMY_LEVEL_CODES = {level.value: code for code, level in enumerate(EnemyLevel)}
+_TREASURE_THREAT_LEVEL_VALUES = tuple(level.value for level in TreasureThreatLevel)
+_ENEMY_LEVEL_VALUES = tuple(level.value for level in EnemyLevel)
+
+# (field, bits) in packing order, least significant first. Integer fields are stored
+# with the offset in _PACKED_OFFSETS, half their range, so that overshooting values
+# such as a negative health, or the potion count a failed heal_self drops below 0,
+# stay representable.
+_PACKED_LAYOUT = (
+    ("health", 8),
+    ("stamina", 8),
+    ("treasureHealth", 8),
+    ("potionCount", 4),
+    ("comfyActions", 4),
+    ("treasureThreatLevel", 2),
+    ("enemyLevel", 3),
+    ("enemyNearby", 1),
+    ("isInSafeZone", 1),
+    ("isBackup", 1),
+)
+_PACKED_OFFSETS = {"health": 128, "stamina": 128, "treasureHealth": 128, "potionCount": 8}
+
+
+class FrozenWorldState(NamedTuple):
+    """
+    Immutable, hashable value type for the world state.
+
+    It holds the same fields as the WorldState TypedDict and converts to and from it
+    losslessly, so it can be used as a key for memoization, closed sets and
+    transposition tables while the graph state keeps using plain dictionaries.
+    """
+    health: int
+    stamina: int
+    potionCount: int
+    treasureThreatLevel: str
+    enemyNearby: bool
+    enemyLevel: Optional[str]
+    isInSafeZone: bool
+    isBackup: bool
+    treasureHealth: int
+    comfyActions: int
+
+    @classmethod
+    def from_dict(cls, world_state: WorldState) -> "FrozenWorldState":
+        "Create a FrozenWorldState from a WorldState dictionary"
+        return cls._make([world_state[field] for field in cls._fields])
+
+    def to_dict(self) -> WorldState:
+        "Convert back to a WorldState dictionary"
+        return WorldState(**self._asdict())
+
+    def pack(self) -> int:
+        """
+        Encode the world state as a single 40-bit integer.
+
+        Raises:
+            ValueError: If a field is outside of the range its bits can hold or an enum
+                        field holds an unknown value.
+        """
+        codes = {
+            **self._asdict(),
+            "treasureThreatLevel": _TREASURE_THREAT_LEVEL_CODES.get(self.treasureThreatLevel),
+            "enemyLevel": _ENEMY_LEVEL_CODES.get(self.enemyLevel),
+        }
+        for field, offset in _PACKED_OFFSETS.items():
+            codes[field] += offset
+
+        packed = 0
+        shift = 0
+        for field, bits in _PACKED_LAYOUT:
+            code = codes[field]
+            if code is None or not 0 <= int(code) < (1 << bits):
+                raise ValueError(f"Cannot pack {field}={getattr(self, field)!r} into {bits} bits")
+            packed |= int(code) << shift
+            shift += bits
+        return packed
+
+    @classmethod
+    def unpack(cls, packed: int) -> "FrozenWorldState":
+        "Decode a world state encoded with pack"
+        codes = {}
+        for field, bits in _PACKED_LAYOUT:
+            codes[field] = packed & ((1 << bits) - 1)
+            packed >>= bits
+        for field, offset in _PACKED_OFFSETS.items():
+            codes[field] -= offset
+
+        return cls(
+            health=codes["health"],
+            stamina=codes["stamina"],
+            potionCount=codes["potionCount"],
+            treasureThreatLevel=_TREASURE_THREAT_LEVEL_VALUES[codes["treasureThreatLevel"]],
+            enemyNearby=bool(codes["enemyNearby"]),
+            enemyLevel=_ENEMY_LEVEL_VALUES[codes["enemyLevel"]],
+            isInSafeZone=bool(codes["isInSafeZone"]),
+            isBackup=bool(codes["isBackup"]),
+            treasureHealth=codes["treasureHealth"],
+            comfyActions=codes["comfyActions"],
+        )
@@ -1,13 +1,16 @@
-from typing import Literal, List, Union
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_ollama import ChatOllama
+from typing import Any, Dict, Literal, List, NamedTuple, Optional
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.callbacks import BaseCallbackHandler
 from pydantic import BaseModel
 import os
+import threading
 from dotenv import load_dotenv
 from .type import WorldState
+from .action import action_failure_probability, compiled_actions, compiled_failure_effects
+from .metrics import llm_metrics_callback
+import random
 
 load_dotenv()
 
@@ -15,22 +18,31 @@ load_dotenv()
 
 
 def init_llm(
-        provider: Literal["openai", "anthropic", "google", "ollama"],
+        provider: Literal["openai", "anthropic", "google", "ollama", "fake"],
         model: str,
         temperature: float = 0.5,
+        prompt_caching: bool = True,
 ):
     """
     Initialize and return a language model chat interface based on the specified provider.
 
     This function creates a chat interface for different LLM providers including OpenAI, 
     Anthropic, Google, and Ollama. It handles API key validation and configuration for
-    each provider.
+    each provider. The "fake" provider needs no model or network: it answers with
+    scripted (FAKE_LLM_SCRIPT) or rule-based responses after FAKE_LLM_LATENCY seconds,
+    for offline runs and benchmarks.
+
+    With `prompt_caching` (the default), the leading system message of every prompt is
+    cached by the provider: Anthropic models mark it with an ephemeral cache_control
+    breakpoint, OpenAI caches repeated prompt prefixes automatically, and the fake model
+    reports the cached tokens it would have read, so the hit rate shows in the metrics.
 
     Args:
-        provider: The LLM provider to use. Must be one of "openai", "anthropic", "google", or "ollama".
+        provider: The LLM provider to use. Must be one of "openai", "anthropic", "google", "ollama" or "fake".
         model: The specific model name/identifier to use with the chosen provider.
         temperature: Controls randomness in the model's output. Higher values (e.g. 0.8) make the output
                     more random, while lower values (e.g. 0.2) make it more deterministic. Defaults to 0.5.
+        prompt_caching: Cache the static system prompt prefix with the provider. Defaults to True.
 
     Returns:
         A configured chat interface for the specified provider and model.
@@ -38,29 +50,78 @@ def init_llm(
     Raises:
         ValueError: If the required API key environment variable is not set for the chosen provider
                    (except for Ollama which runs locally).
+
+    Provider SDKs are imported only when selected, so a process pays the import cost of
+    the one provider it uses.
     """
     if provider == "openai":
         if "OPENAI_API_KEY" not in os.environ:
             raise ValueError("OPENAI_API_KEY is not set. Please set it in your environment variables.")
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(model=model, temperature=temperature, api_key=os.environ["OPENAI_API_KEY"])
     elif provider == "anthropic":
         if "ANTHROPIC_API_KEY" not in os.environ:
             raise ValueError("ANTHROPIC_API_KEY is not set. Please set it in your environment variables.")
-        return ChatAnthropic(model=model, temperature=temperature, api_key=os.environ["ANTHROPIC_API_KEY"])
+        from langchain_anthropic import ChatAnthropic
+
+        class PrefixCachingChatAnthropic(ChatAnthropic):
+            "ChatAnthropic that sets a cache breakpoint after the first system message block"
+
+            def _get_request_payload(self, input_, *, stop=None, **kwargs):
+                payload = super()._get_request_payload(input_, stop=stop, **kwargs)
+                system = payload.get("system")
+                if isinstance(system, str):
+                    system = [{"type": "text", "text": system}]
+                if system:
+                    payload["system"] = [{**system[0], "cache_control": {"type": "ephemeral"}}, *system[1:]]
+                return payload
+
+        chat_class = PrefixCachingChatAnthropic if prompt_caching else ChatAnthropic
+        return chat_class(model=model, temperature=temperature, api_key=os.environ["ANTHROPIC_API_KEY"])
     elif provider == "google":
         if "GOOGLE_API_KEY" not in os.environ:
             raise ValueError("GOOGLE_API_KEY is not set. Please set it in your environment variables.")
+        from langchain_google_genai import ChatGoogleGenerativeAI
         return ChatGoogleGenerativeAI(model=model, temperature=temperature, api_key=os.environ["GOOGLE_API_KEY"])
     elif provider == "ollama":
+        from langchain_ollama import ChatOllama
         return ChatOllama(model=model, temperature=temperature)
+    elif provider == "fake":
+        from .fake_llm import FakeChatModel, load_script
+        return FakeChatModel(
+            latency=float(os.environ.get("FAKE_LLM_LATENCY", 0)),
+            script=load_script(os.environ.get("FAKE_LLM_SCRIPT")),
+            prompt_caching=prompt_caching
+        )
     
 
 
+class Agent(NamedTuple):
+    """
+    A prompt template and the (structured) language model its rendered prompt is sent to.
+
+    The two steps are kept apart instead of being fused into one prompt | llm sequence,
+    so callers such as the response cache can render the prompt on its own and pass the
+    rendered prompt to the model.
+    """
+    prompt: ChatPromptTemplate
+    llm: Runnable
+
+    def invoke(self, inputs: Dict[str, Any], config: Optional[RunnableConfig] = None):
+        "Render the prompt with the inputs and invoke the language model on it"
+        return self.llm.invoke(self.prompt.invoke(inputs, config), config)
+
+    async def ainvoke(self, inputs: Dict[str, Any], config: Optional[RunnableConfig] = None):
+        "Async variant of invoke"
+        return await self.llm.ainvoke(await self.prompt.ainvoke(inputs, config), config)
+
+
 def create_agent(
-        llm: Union[ChatOpenAI, ChatAnthropic, ChatGoogleGenerativeAI, ChatOllama],
+        llm: BaseChatModel,
         prompt: ChatPromptTemplate,
         output_structure: BaseModel = None,
         tools: List[BaseModel] = None,
+        callbacks: List[BaseCallbackHandler] = None,
 ):
     """
     Create and configure a language model agent with optional structured output and tools.
@@ -73,20 +134,110 @@ def create_agent(
         prompt: The prompt template that defines the agent's behavior and instructions.
         output_structure: Optional Pydantic model to validate and structure the agent's output.
         tools: Optional list of tools/functions that the agent can use.
+        callbacks: Optional callback handlers attached to the language model calls.
 
     Returns:
         A configured agent that combines the language model, prompt, and optional components.
     """
-    
+
+    if tools:
+        llm = llm.bind_tools(tools)
+
     if output_structure:
         llm = llm.with_structured_output(output_structure)
-    
-    agent = prompt | llm
 
-    if tools:
-        agent = agent.with_tools(tools)
+    if callbacks:
+        llm = llm.with_config(callbacks=callbacks)
+
+    return Agent(prompt=prompt, llm=llm)
+
+_llm_registry = {}
+_agent_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_llm(
+        provider: Literal["openai", "anthropic", "google", "ollama", "fake"],
+        model: str,
+        temperature: float = 0.5,
+        prompt_caching: bool = True,
+):
+    """
+    Return a process-wide shared chat interface for the provider, model, temperature and
+    prompt caching setting.
+
+    The first call creates the client with init_llm; later calls return the same object,
+    so its HTTP connection pool is reused across node invocations instead of being
+    rebuilt on every call.
+
+    Args:
+        provider: The LLM provider to use.
+        model: The specific model name/identifier to use with the chosen provider.
+        temperature: Controls randomness in the model's output.
+        prompt_caching: Cache the static system prompt prefix with the provider.
+
+    Returns:
+        The shared chat interface for the specified provider, model and settings.
+    """
+
+    key = (provider, model, float(temperature), bool(prompt_caching))
+    with _registry_lock:
+        if key not in _llm_registry:
+            _llm_registry[key] = init_llm(provider=provider, model=model, temperature=temperature, prompt_caching=prompt_caching)
+        return _llm_registry[key]
+
+
+def get_agent(
+        provider: Literal["openai", "anthropic", "google", "ollama", "fake"],
+        model: str,
+        temperature: float,
+        prompt: ChatPromptTemplate,
+        output_structure: BaseModel = None,
+        prompt_caching: bool = True,
+):
+    """
+    Return a process-wide shared agent combining a pooled LLM with a prompt template.
+
+    Agents are keyed by provider, model, temperature, prompt caching, output structure and prompt, so the
+    structured-output wrapper and the agent are built once. The prompt
+    must therefore be a static template; per-call data has to be passed as template
+    variables when the agent is invoked.
+
+    Args:
+        provider: The LLM provider to use.
+        model: The specific model name/identifier to use with the chosen provider.
+        temperature: Controls randomness in the model's output.
+        prompt: The prompt template that defines the agent's behavior and instructions.
+        output_structure: Optional Pydantic model to validate and structure the agent's output.
+        prompt_caching: Cache the static system prompt prefix with the provider.
+
+    Returns:
+        The shared agent.
+    """
+
+    # The prompt is stored next to the agent, which keeps it alive and its id unique.
+    key = (provider, model, float(temperature), bool(prompt_caching), output_structure, id(prompt))
+    with _registry_lock:
+        if key in _agent_registry:
+            return _agent_registry[key][1]
+
+    agent = create_agent(
+        llm=get_llm(provider=provider, model=model, temperature=temperature, prompt_caching=prompt_caching),
+        prompt=prompt,
+        output_structure=output_structure,
+        callbacks=[llm_metrics_callback]
+    )
+
+    with _registry_lock:
+        return _agent_registry.setdefault(key, (prompt, agent))[1]
+
+
+def clear_llm_registry():
+    "Drop all pooled LLM clients and agents, e.g. after rotating API keys"
+    with _registry_lock:
+        _llm_registry.clear()
+        _agent_registry.clear()
 
-    return agent
 
 def check_failure_conditions(world_state: WorldState) -> tuple[bool, str]:
     """
@@ -132,3 +283,90 @@ def check_success_conditions(world_state: WorldState) -> tuple[bool, str]:
         return True, "Mission accomplished! All enemies defeated, treasure threat neutralized, and treasure well-protected"
     
     return False, ""
+
+
+def execute_action_sequence(
+        world_state: WorldState,
+        action_sequence: List[str],
+        rng: random.Random = random,
+        describe: bool = True
+) -> dict:
+    """
+    Execute a sequence of actions against a world state, following the game rules.
+
+    Actions are executed in order. An action whose preconditions are not met is skipped.
+    Execution stops when an action fails because of its failure probability, or when an
+    action triggers a game failure condition, in which case the world state is reset to
+    the one before the sequence.
+
+    Args:
+        world_state: The world state to start from. It is not modified.
+        action_sequence: The names of the actions to execute.
+        rng: Random number generator used for the probabilistic action failures.
+        describe: Build the human readable game message. Simulations can turn this off.
+
+    Returns:
+        dict: The execution result containing:
+            - currentWorldState: World state after the execution
+            - executedActions: Names of the actions that were applied
+            - failedActions: Names of the actions that failed or whose preconditions were not met
+            - actionFailed: True if an action failed or its preconditions were not met
+            - failureOccurred: True if a game failure condition was triggered
+            - failureReason: Description of the game failure, empty string otherwise
+            - gameMessage: Description of the execution, empty if describe is False
+    """
+
+    current_world_state = world_state
+    executed_actions = []
+    failed_actions = []
+    action_failed = False
+    game_message = ""
+
+    def result(current_world_state, failure_occurred=False, failure_reason=""):
+        return {
+            "currentWorldState": current_world_state,
+            "executedActions": executed_actions,
+            "failedActions": failed_actions,
+            "actionFailed": action_failed,
+            "failureOccurred": failure_occurred,
+            "failureReason": failure_reason,
+            "gameMessage": game_message
+        }
+
+    for action_name in action_sequence:
+
+        # Handle action failure due to probability
+        action_failure_probability_object = action_failure_probability.get(action_name, None)
+        if action_failure_probability_object:
+            if (rng.random() < action_failure_probability_object["probability"]):
+                action_failed = True
+                failed_actions.append(action_name)
+                if describe:
+                    game_message += f"Action {action_name} failed because of the following reason: {action_failure_probability_object['reason']}\n"
+                    game_message += f"Executed actions: {executed_actions}"
+                return result(compiled_failure_effects[action_name].apply(current_world_state))
+
+        compiled_action = compiled_actions[action_name]
+
+        if not compiled_action.is_applicable(current_world_state):
+            if describe:
+                game_message += f"Action {action_name} failed because precondition is not met.\n"
+            action_failed = True
+            failed_actions.append(action_name)
+            continue
+
+        current_world_state = compiled_action.apply(current_world_state)
+        executed_actions.append(action_name)
+
+        # Handle game failure due to failure conditions
+        is_failed, reason = check_failure_conditions(current_world_state)
+        if is_failed:
+            if describe:
+                game_message += f"You have failed due to the following reason: {reason}.\nPlease try again."
+            return result(world_state, failure_occurred=True, failure_reason=reason)
+
+    if describe:
+        game_message += f"No game failure occurred.\n"
+        game_message += f"Executed actions: {executed_actions}"
+
+    return result(current_world_state)
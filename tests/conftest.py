@@ -0,0 +1,47 @@
+import json
+import os
+import pytest
+from src.metrics import registry
+from src.utils import clear_llm_registry
+from main_run_batch import scenario_1, scenario_2, scenario_3, scenario_4, scenario_5
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_provider(tmp_path_factory):
+    "Run every test against the fake provider, with logs and learnings in a temporary directory"
+    root = tmp_path_factory.mktemp("dungeon-guardian")
+    os.environ["PROVIDER"] = "fake"
+    os.environ["MODEL"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = "0"
+    os.environ["LOG_PATH"] = str(root / "logs")
+    os.environ["LEARNING_PATH"] = str(root / "learning")
+    clear_llm_registry()
+    yield root
+    clear_llm_registry()
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    "Start every test with an empty metrics registry, so counters can be asserted exactly"
+    registry.reset()
+    yield registry
+    registry.reset()
+
+
+@pytest.fixture
+def world_states():
+    return [scenario_1, scenario_2, scenario_3, scenario_4, scenario_5]
+
+
+@pytest.fixture
+def fake_script(tmp_path, monkeypatch):
+    "Script the responses of the fake provider for one test, e.g. fake_script(PlannerResponse=[...])"
+
+    def set_script(**responses):
+        path = tmp_path / "fake_llm_script.json"
+        path.write_text(json.dumps(responses))
+        monkeypatch.setenv("FAKE_LLM_SCRIPT", str(path))
+        clear_llm_registry()
+
+    yield set_script
+    clear_llm_registry()
@@ -0,0 +1,51 @@
+import random
+import pytest
+from src.action import (
+    ENEMY_LEVELS,
+    TREASURE_THREAT_LEVELS,
+    batch_apply,
+    compiled_actions,
+    compiled_failure_effects,
+    from_structured,
+    to_structured,
+)
+
+
+def random_world_states(count, seed=0):
+    "World states over and beyond the ranges the game reaches, including overshooting values"
+    rng = random.Random(seed)
+    return [
+        {
+            "health": rng.randint(-20, 110),
+            "stamina": rng.randint(-20, 110),
+            "potionCount": rng.randint(-1, 3),
+            "treasureThreatLevel": rng.choice(TREASURE_THREAT_LEVELS),
+            "enemyNearby": rng.random() < 0.5,
+            "enemyLevel": rng.choice(ENEMY_LEVELS),
+            "isInSafeZone": rng.random() < 0.5,
+            "isBackup": rng.random() < 0.5,
+            "treasureHealth": rng.randint(-20, 110),
+            "comfyActions": rng.randint(0, 3),
+        }
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("action_name", list(compiled_actions))
+def test_batch_kernel_matches_scalar_action(action_name):
+    world_states = random_world_states(5000)
+    next_states, applicable = batch_apply(action_name, to_structured(world_states))
+
+    action = compiled_actions[action_name]
+    assert applicable.tolist() == [action.is_applicable(world_state) for world_state in world_states]
+    assert from_structured(next_states) == [action(world_state) or world_state for world_state in world_states]
+
+
+@pytest.mark.parametrize("action_name", list(compiled_failure_effects))
+def test_batch_failure_kernel_matches_scalar_failure_effects(action_name):
+    world_states = random_world_states(5000)
+    next_states, applicable = batch_apply(action_name, to_structured(world_states), failed=True)
+
+    failure = compiled_failure_effects[action_name]
+    assert applicable.all()
+    assert from_structured(next_states) == [failure.apply(world_state) for world_state in world_states]
@@ -0,0 +1,119 @@
+import os
+import subprocess
+import sys
+import pytest
+import src.cache as cache
+from src.agent.structs import GoalGeneratorResponse, PlannerResponse
+from src.agent.nodes import PLANNER_PROMPT
+from src.cache import InMemoryResponseCache, ResponseCache, SQLiteResponseCache, cached_invoke, make_cache_key
+from src.utils import get_agent
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Clock:
+    "Stand-in for the time module whose time only moves when the test advances it"
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return InMemoryResponseCache(**kwargs)
+        return SQLiteResponseCache(str(tmp_path / "cache.sqlite"), **kwargs)
+    return make
+
+
+def test_response_cache_is_abstract():
+    with pytest.raises(TypeError):
+        ResponseCache()
+
+
+def test_least_recently_used_response_is_evicted(make_cache, clock):
+    response_cache = make_cache(max_entries=2)
+    response_cache.set("a", {"value": 1})
+    clock.now += 1
+    response_cache.set("b", {"value": 2})
+    clock.now += 1
+    assert response_cache.get("a") == {"value": 1}
+    clock.now += 1
+    response_cache.set("c", {"value": 3})
+
+    assert response_cache.get("b") is None
+    assert response_cache.get("a") == {"value": 1}
+    assert response_cache.get("c") == {"value": 3}
+    assert response_cache.stats() == {"hits": 3, "misses": 1, "hitRate": 0.75}
+
+
+def test_expired_response_is_dropped(make_cache, clock):
+    response_cache = make_cache(ttl=60)
+    response_cache.set("a", {"value": 1})
+    clock.now += 59
+    assert response_cache.get("a") == {"value": 1}
+    clock.now += 2
+    assert response_cache.get("a") is None
+
+
+def test_sqlite_cache_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    SQLiteResponseCache(path).set("a", {"value": 1})
+    assert SQLiteResponseCache(path).get("a") == {"value": 1}
+
+
+def test_cache_key_is_stable_and_covers_every_setting():
+    key = make_cache_key("prompt", "openai", "gpt-4o", 0.5, PlannerResponse)
+    assert key == make_cache_key("prompt", "openai", "gpt-4o", 0.5, PlannerResponse)
+    assert len(key) == 64
+    assert len({
+        key,
+        make_cache_key("other prompt", "openai", "gpt-4o", 0.5, PlannerResponse),
+        make_cache_key("prompt", "anthropic", "gpt-4o", 0.5, PlannerResponse),
+        make_cache_key("prompt", "openai", "gpt-4o-mini", 0.5, PlannerResponse),
+        make_cache_key("prompt", "openai", "gpt-4o", 0.0, PlannerResponse),
+        make_cache_key("prompt", "openai", "gpt-4o", 0.5, GoalGeneratorResponse),
+    }) == 6
+    assert make_cache_key("prompt", "openai", "gpt-4o", 1, PlannerResponse) == make_cache_key("prompt", "openai", "gpt-4o", 1.0, PlannerResponse)
+
+
+def test_cache_key_is_stable_across_processes():
+    "SQLite caches are shared between runs, so the key must not depend on per-process hash seeds"
+    code = (
+        "from src.agent.structs import PlannerResponse\n"
+        "from src.cache import make_cache_key\n"
+        "print(make_cache_key('prompt', 'openai', 'gpt-4o', 0.5, PlannerResponse))"
+    )
+    keys = {
+        subprocess.run(
+            [sys.executable, "-c", code], env={**os.environ, "PYTHONHASHSEED": seed},
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        for seed in ("1", "2")
+    }
+    assert keys == {make_cache_key("prompt", "openai", "gpt-4o", 0.5, PlannerResponse)}
+
+
+def test_cached_invoke_calls_the_model_once_per_prompt(metrics):
+    agent = get_agent(provider="fake", model="fake", temperature=0.5, prompt=PLANNER_PROMPT, output_structure=PlannerResponse)
+    inputs = {name: "" for name in PLANNER_PROMPT.input_variables}
+    response_cache = InMemoryResponseCache()
+
+    first = cached_invoke(agent, inputs, response_cache, "fake", "fake", 0.5, PlannerResponse)
+    second = cached_invoke(agent, inputs, response_cache, "fake", "fake", 0.5, PlannerResponse)
+
+    assert first == second
+    assert response_cache.stats()["hits"] == 1
+    assert metrics.counter("dungeon_llm_requests_total") == 1
@@ -0,0 +1,87 @@
+import uuid
+import pytest
+import src.checkpoint as checkpoint
+from langgraph.checkpoint.base import empty_checkpoint
+from src.agent.graph import get_graph
+from src.checkpoint import BoundedMemorySaver, mark_thread_finished
+
+
+class Clock:
+    "Stand-in for the time module whose time only moves when the test advances it"
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(checkpoint, "time", clock)
+    return clock
+
+
+def thread_config(thread_id):
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+
+def put(saver, thread_id, step=0):
+    saver.put(thread_config(thread_id), empty_checkpoint(), {"step": step}, {})
+
+
+def stored(saver, *thread_ids):
+    return [thread_id for thread_id in thread_ids if saver.get_tuple(thread_config(thread_id)) is not None]
+
+
+def test_least_recently_used_thread_is_evicted(clock):
+    saver = BoundedMemorySaver(max_threads=2, evict_finished=False)
+    put(saver, "a")
+    put(saver, "b")
+    put(saver, "a", step=1)
+    put(saver, "c")
+
+    assert stored(saver, "a", "b", "c") == ["a", "c"]
+
+
+def test_idle_thread_expires(clock):
+    saver = BoundedMemorySaver(ttl=60, evict_finished=False)
+    put(saver, "a")
+    clock.now += 30
+    put(saver, "b")
+    clock.now += 31
+    put(saver, "c")
+    assert stored(saver, "a", "b", "c") == ["b", "c"]
+
+    clock.now += 61
+    put(saver, "c", step=1)
+    assert stored(saver, "a", "b", "c") == ["c"]
+
+
+@pytest.mark.parametrize("evict_finished", [True, False])
+def test_finished_thread_is_evicted_after_its_final_checkpoint(clock, evict_finished):
+    saver = BoundedMemorySaver(evict_finished=evict_finished)
+    put(saver, "a", step=0)
+    put(saver, "b", step=0)
+    mark_thread_finished("a", 2)
+
+    put(saver, "a", step=1)
+    assert stored(saver, "a", "b") == ["a", "b"]
+
+    put(saver, "a", step=2)
+    assert stored(saver, "a", "b") == (["b"] if evict_finished else ["a", "b"])
+    # Without evict_finished the mark is never consumed; drop it so it cannot leak into other tests
+    checkpoint._pop_finished("a", 2)
+
+
+@pytest.mark.parametrize("evict_finished", [True, False])
+def test_finished_episode_is_dropped_from_the_graph_checkpointer(world_states, evict_finished):
+    config = {
+        "recursion_limit": 200,
+        "configurable": {"thread_id": str(uuid.uuid4()), "total_iterations": 2, "checkpointer_evict_finished": evict_finished}
+    }
+    graph = get_graph(config)
+    graph.invoke({"currentWorldState": world_states[0]}, config)
+
+    assert bool(graph.get_state(config).values) != evict_finished
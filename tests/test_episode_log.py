@@ -0,0 +1,28 @@
+import asyncio
+import glob
+import os
+import uuid
+import pytest
+from src.agent.graph import get_graph
+from src.episode_log import close_episode_logs, iter_episode_logs
+
+
+@pytest.mark.parametrize("async_nodes", [False, True])
+@pytest.mark.parametrize("episode_log, pattern", [("file", "*.json"), ("jsonl", "episodes-*.jsonl")])
+def test_episode_is_logged_in_the_configured_format(world_states, tmp_path, monkeypatch, episode_log, pattern, async_nodes):
+    monkeypatch.setenv("LOG_PATH", str(tmp_path))
+    config = {
+        "recursion_limit": 200,
+        "configurable": {"thread_id": str(uuid.uuid4()), "total_iterations": 2, "episode_log": episode_log}
+    }
+    graph = get_graph(config, async_nodes=async_nodes)
+    if async_nodes:
+        asyncio.run(graph.ainvoke({"currentWorldState": world_states[0]}, config))
+    else:
+        graph.invoke({"currentWorldState": world_states[0]}, config)
+    close_episode_logs()
+
+    assert [os.path.basename(path) for path in glob.glob(str(tmp_path / "*"))] == [
+        os.path.basename(path) for path in glob.glob(str(tmp_path / pattern))
+    ]
+    assert [record["threadId"] for record in iter_episode_logs(str(tmp_path))] == [config["configurable"]["thread_id"]]
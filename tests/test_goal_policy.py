@@ -0,0 +1,69 @@
+import pytest
+from src.agent.nodes import _rule_based_goals
+from src.configuration import Configuration
+from src.goal_policy import DOUBTFUL_CONFIDENCE, HEALTH_MARGIN, SURVIVE_HEALTH, rule_based_goals
+from src.type import Goal
+
+
+@pytest.fixture
+def safe_world_state(world_states):
+    "No enemy and a safe treasure, so only the health rule affects the confidence"
+    return {**world_states[2], "health": 80, "stamina": 80}
+
+
+@pytest.mark.parametrize("health, confidence, primary_goal", [
+    (SURVIVE_HEALTH - HEALTH_MARGIN, 1.0, Goal.SURVIVE),
+    (SURVIVE_HEALTH - HEALTH_MARGIN // 2, 0.5, Goal.SURVIVE),
+    (SURVIVE_HEALTH - 1, 1 / HEALTH_MARGIN, Goal.SURVIVE),
+    (SURVIVE_HEALTH, 0.0, Goal.PREPARE_FOR_BATTLE),
+    (SURVIVE_HEALTH + HEALTH_MARGIN // 2, 0.5, Goal.PREPARE_FOR_BATTLE),
+    (SURVIVE_HEALTH + HEALTH_MARGIN, 1.0, Goal.PREPARE_FOR_BATTLE),
+    (100, 1.0, Goal.PREPARE_FOR_BATTLE),
+])
+def test_confidence_drops_towards_the_survive_threshold(safe_world_state, health, confidence, primary_goal):
+    decision = rule_based_goals({**safe_world_state, "health": health})
+    assert decision.primary_goal == primary_goal
+    assert decision.confidence == pytest.approx(confidence)
+
+
+@pytest.mark.parametrize("enemy_level, health, stamina, confidence", [
+    ("medium", 59, 80, (59 - SURVIVE_HEALTH) / HEALTH_MARGIN),
+    ("high", 60, 80, 1.0),
+    ("high", 59, 80, DOUBTFUL_CONFIDENCE),
+    ("very_high", 59, 80, DOUBTFUL_CONFIDENCE),
+    ("low", 80, 15, 1.0),
+    ("low", 80, 14, DOUBTFUL_CONFIDENCE),
+])
+def test_confidence_is_doubtful_for_hard_fights(safe_world_state, enemy_level, health, stamina, confidence):
+    decision = rule_based_goals({**safe_world_state, "enemyNearby": True, "enemyLevel": enemy_level, "health": health, "stamina": stamina})
+    assert decision.primary_goal == Goal.ELIMINATE_THREAT
+    assert decision.confidence == pytest.approx(confidence)
+
+
+@pytest.mark.parametrize("goal_mode, state, reason", [
+    ("rules", {"actionFailed": True}, "confident"),
+    ("hybrid", {}, "confident"),
+    ("hybrid", {"actionFailed": True}, "action_failed"),
+    ("hybrid", {"loopAction": "reset"}, "strategy_reset"),
+    ("hybrid", {"health": SURVIVE_HEALTH + 1}, "low_confidence"),
+])
+def test_goal_decisions_are_recorded_with_their_reason(safe_world_state, metrics, goal_mode, state, reason):
+    world_state = {**safe_world_state, **{key: value for key, value in state.items() if key in safe_world_state}}
+    state = {"currentWorldState": world_state, **{key: value for key, value in state.items() if key not in safe_world_state}}
+
+    result = _rule_based_goals(state, Configuration(thread_id="test", goal_mode=goal_mode))
+
+    assert (result is None) == (reason != "confident")
+    source = "rules" if reason == "confident" else "llm"
+    assert metrics.counter("dungeon_goal_decisions_total", source=source, reason=reason) == 1
+    assert metrics.counter("dungeon_goal_decisions_total") == 1
+
+
+def test_llm_goal_mode_records_no_decision(safe_world_state, metrics):
+    assert _rule_based_goals({"currentWorldState": safe_world_state}, Configuration(thread_id="test", goal_mode="llm")) is None
+    assert metrics.counter("dungeon_goal_decisions_total") == 0
+
+
+def test_unknown_goal_mode_is_rejected(safe_world_state):
+    with pytest.raises(ValueError, match="goal_mode"):
+        _rule_based_goals({"currentWorldState": safe_world_state}, Configuration(thread_id="test", goal_mode="rule"))
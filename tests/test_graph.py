@@ -0,0 +1,169 @@
+import asyncio
+import uuid
+import pytest
+from src.agent.graph import get_graph
+from src.learnings import get_episode_queue
+from src.runner import _episode_status
+
+
+def run_episode(world_state, total_iterations, **configurable):
+    config = {
+        "recursion_limit": 200,
+        "configurable": {"thread_id": str(uuid.uuid4()), "total_iterations": total_iterations, **configurable}
+    }
+    return get_graph(config).invoke({"currentWorldState": world_state}, config)
+
+
+@pytest.mark.parametrize("planner_mode", ["llm", "symbolic", "hybrid"])
+def test_episode_plays_every_iteration(world_states, metrics, planner_mode):
+    "scenario_1 never succeeds, so the episode runs to the iteration limit; the symbolic planner finds no plan and hybrid falls back to the LLM"
+    result = run_episode(world_states[0], 5, planner_mode=planner_mode)
+    assert result["iterations"] == 5
+    assert not result["successOccurred"]
+    assert metrics.counter("dungeon_llm_requests_total", node="goal_generator") == 5
+    assert metrics.counter("dungeon_llm_requests_total", node="planner") == (0 if planner_mode == "symbolic" else 5)
+
+
+def test_episode_succeeds(world_states):
+    result = run_episode(world_states[1], 10)
+    assert result["successOccurred"]
+    assert result["iterations"] < 10
+
+
+def test_plan_candidates_are_scored_and_counted(world_states, metrics):
+    result = run_episode(world_states[0], 3, plan_candidates=4)
+
+    assert result["iterations"] == 3
+    assert len(result["planCandidates"]) == 4
+    assert all("valid" in candidate and "successProbability" in candidate for candidate in result["planCandidates"])
+    assert metrics.counter("dungeon_llm_requests_total", node="planner") == 12
+    assert metrics.counter("dungeon_plan_candidates_total", node="planner") == 12
+
+
+def test_valid_plan_candidate_is_executed(world_states, metrics, fake_script):
+    "scenario_2 starts outside the safe zone, so heal_self is invalid and attack_enemy is valid"
+    fake_script(PlannerResponse=[
+        {"actionSequence": ["heal_self"], "plannerJustification": "Invalid outside of the safe zone."},
+        {"actionSequence": ["attack_enemy"], "plannerJustification": "Valid."},
+    ])
+    result = run_episode(world_states[1], 1, plan_candidates=2)
+
+    assert sorted(candidate["valid"] for candidate in result["planCandidates"]) == [False, True]
+    assert result["actionSequence"] == ["attack_enemy"]
+    assert metrics.counter("dungeon_plan_candidates_total", valid="true") == 1
+    assert metrics.counter("dungeon_plan_candidates_total", valid="false") == 1
+
+
+@pytest.mark.parametrize("async_nodes", [False, True])
+def test_fused_goal_planner_makes_one_request_per_iteration(world_states, metrics, async_nodes):
+    config = {
+        "recursion_limit": 200,
+        "configurable": {"thread_id": str(uuid.uuid4()), "total_iterations": 4, "fuse_goal_planner": True}
+    }
+    graph = get_graph(config, async_nodes=async_nodes)
+    if async_nodes:
+        result = asyncio.run(graph.ainvoke({"currentWorldState": world_states[0]}, config))
+    else:
+        result = graph.invoke({"currentWorldState": world_states[0]}, config)
+
+    assert result["iterations"] == 4
+    assert result["primaryGoal"] and result["actionSequence"] is not None
+    assert metrics.counter("dungeon_llm_requests_total", node="goal_planner") == 4
+    assert metrics.counter("dungeon_llm_requests_total", node="goal_generator") == 0
+    assert metrics.counter("dungeon_llm_requests_total", node="planner") == 0
+
+
+@pytest.mark.parametrize("prompt_caching", [False, True])
+def test_prompt_caching_is_configurable_per_run(world_states, metrics, prompt_caching):
+    result = run_episode(world_states[0], 3, prompt_caching=prompt_caching)
+
+    assert result["iterations"] == 3
+    assert (metrics.counter("dungeon_llm_tokens_total", type="cache_read") > 0) == prompt_caching
+
+
+@pytest.mark.parametrize("goal_mode", ["rules", "hybrid"])
+def test_confident_goal_decisions_make_no_goal_generator_requests(world_states, metrics, goal_mode):
+    "The rule-based policy is sure about every world state of this scenario_1 episode"
+    result = run_episode(world_states[0], 5, goal_mode=goal_mode)
+
+    assert result["iterations"] == 5
+    assert metrics.counter("dungeon_goal_decisions_total", source="rules", reason="confident") == 5
+    assert metrics.counter("dungeon_goal_decisions_total", source="llm") == 0
+    assert metrics.counter("dungeon_llm_requests_total", node="goal_generator") == 0
+
+
+def test_hybrid_goal_mode_escalates_doubtful_world_states(world_states, metrics):
+    "scenario_5 starts with health 30, too close to the survive threshold for the rules"
+    result = run_episode(world_states[4], 5, goal_mode="hybrid")
+
+    escalated = metrics.counter("dungeon_goal_decisions_total", source="llm")
+    assert metrics.counter("dungeon_goal_decisions_total", source="llm", reason="low_confidence") >= 1
+    assert metrics.counter("dungeon_goal_decisions_total") == result["iterations"]
+    assert metrics.counter("dungeon_llm_requests_total", node="goal_generator") == escalated
+
+
+def test_hybrid_goal_mode_escalates_after_a_failed_action(world_states, metrics, fake_script):
+    "heal_self cannot run outside of the safe zone, so every iteration after the first follows a failed action"
+    fake_script(PlannerResponse=[{"actionSequence": ["heal_self"], "plannerJustification": "Always fails outside of the safe zone."}])
+    result = run_episode(world_states[1], 3, goal_mode="hybrid", plan_max_repairs=0)
+
+    assert result["iterations"] == 3
+    assert metrics.counter("dungeon_goal_decisions_total", source="rules", reason="confident") == 1
+    assert metrics.counter("dungeon_goal_decisions_total", source="llm", reason="action_failed") == 2
+    assert metrics.counter("dungeon_llm_requests_total", node="goal_generator") == 2
+
+
+OSCILLATION = [
+    {"actionSequence": ["retreat"], "plannerJustification": "Back to the safe zone."},
+    {"actionSequence": ["return_to_treasure"], "plannerJustification": "Back to the treasure."},
+]
+
+
+def test_oscillation_is_reset_then_stopped(world_states, metrics, fake_script):
+    """
+    retreat -> return_to_treasure -> retreat from scenario_2 costs stamina every iteration; the fifth
+    iteration repeats the first a third time and is reset, the sixth repeats the second and stops the episode
+    """
+    fake_script(PlannerResponse=OSCILLATION)
+    result = run_episode(world_states[1], 12, loop_action="reset")
+
+    assert result["iterations"] == 6
+    assert result["strategyResets"] == 1
+    assert any(message.get("gameMessage", "").startswith("Strategy reset:") for message in result["messages"])
+    assert result["loopDetected"] == "cycle"
+    assert _episode_status(result) == "stalled"
+    assert metrics.counter("dungeon_loop_detections_total", kind="cycle", action="reset") == 1
+    assert metrics.counter("dungeon_loop_detections_total", kind="cycle", action="terminate") == 1
+    assert metrics.counter("dungeon_loop_detections_total", kind="stagnation") == 0
+
+
+@pytest.mark.parametrize("loop_action, iterations", [("none", 12), ("terminate", 5)])
+def test_oscillation_is_recorded_or_stopped(world_states, metrics, fake_script, loop_action, iterations):
+    fake_script(PlannerResponse=OSCILLATION)
+    result = run_episode(world_states[1], 12, loop_action=loop_action)
+
+    assert result["iterations"] == iterations
+    assert _episode_status(result) == ("stalled" if loop_action == "terminate" else "timed_out")
+    assert metrics.counter("dungeon_loop_detections_total", kind="cycle", action=loop_action) >= 1
+
+
+def test_stagnation_is_stopped(world_states, metrics):
+    "The symbolic planner finds no plan for scenario_1, so no iteration changes the world state"
+    result = run_episode(world_states[0], 10, loop_action="terminate")
+
+    assert result["iterations"] == 2
+    assert result["loopDetected"] == "stagnation"
+    assert _episode_status(result) == "stalled"
+    assert metrics.counter("dungeon_loop_detections_total", kind="stagnation", action="terminate") == 1
+    assert metrics.counter("dungeon_loop_detections_total", kind="cycle") == 0
+
+
+@pytest.mark.parametrize("learning_mode, requests", [("rewrite", 1), ("batch", 0)])
+def test_batch_learning_mode_queues_the_episode(world_states, metrics, tmp_path, monkeypatch, learning_mode, requests):
+    "The batch size is larger than one episode, so the background learner leaves the queued episode alone"
+    monkeypatch.setenv("LEARNING_PATH", str(tmp_path))
+    result = run_episode(world_states[1], 10, learning_mode=learning_mode, learning_batch_size=100)
+
+    assert result["successOccurred"]
+    assert metrics.counter("dungeon_llm_requests_total", node="failure_analysis_node") == requests
+    assert len(get_episode_queue(str(tmp_path))) == (1 if learning_mode == "batch" else 0)
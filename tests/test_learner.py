@@ -0,0 +1,41 @@
+import logging
+import time
+from src.agent.learner import BatchLearner
+from src.configuration import Configuration
+from src.learnings import get_episode_queue
+
+
+def test_batch_learner_consumes_a_full_batch(metrics, tmp_path):
+    configurable = Configuration(thread_id="test", provider="fake", model="fake", learning_path=str(tmp_path), learning_batch_size=1)
+    get_episode_queue(str(tmp_path)).append({"status": "success"})
+
+    BatchLearner(configurable).notify()
+    wait_for(lambda: len(get_episode_queue(str(tmp_path))) == 0)
+
+    assert metrics.counter("dungeon_learning_batches_total", status="ok") == 1
+    assert metrics.counter("dungeon_learning_batch_episodes_total") == 1
+
+
+def test_failed_background_run_is_logged(metrics, tmp_path, fake_script, caplog):
+    fake_script(HistoricalLearnings=[{"generalLearnings": "not a list"}])
+    configurable = Configuration(thread_id="test", provider="fake", model="fake", learning_path=str(tmp_path), learning_batch_size=1)
+    get_episode_queue(str(tmp_path)).append({"status": "success"})
+
+    with caplog.at_level(logging.ERROR, logger="src.agent.learner"):
+        learner = BatchLearner(configurable)
+        learner.notify()
+        wait_for(lambda: learner.error)
+        wait_for(lambda: caplog.records)
+
+    assert "failed" in caplog.records[0].getMessage()
+    assert caplog.records[0].exc_info
+    assert metrics.counter("dungeon_learning_batches_total", status="error") == 1
+    assert len(get_episode_queue(str(tmp_path))) == 1
+
+
+def wait_for(condition, timeout=5.0):
+    "Poll until the background thread of a BatchLearner made `condition` true"
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "the batch learner did not run"
+        time.sleep(0.01)
@@ -0,0 +1,53 @@
+import asyncio
+import json
+import threading
+import pytest
+import src.agent.nodes as nodes
+from src.agent.nodes import aplanner_node, logger_node, alogger_node, _goal_generator_inputs
+from src.configuration import Configuration
+
+
+def test_async_planner_runs_the_symbolic_planner_off_the_event_loop(world_states, monkeypatch):
+    threads = []
+    symbolic_planner_update = nodes._symbolic_planner_update
+
+    def record_thread(state, configurable):
+        threads.append(threading.get_ident())
+        return symbolic_planner_update(state, configurable)
+
+    monkeypatch.setattr(nodes, "_symbolic_planner_update", record_thread)
+
+    async def plan():
+        state = {"currentWorldState": world_states[1], "primaryGoal": "eliminate_threat", "secondaryGoal": "protect_treasure"}
+        update = await aplanner_node(state, {"configurable": {"planner_mode": "symbolic"}})
+        return threading.get_ident(), update
+
+    loop_thread, update = asyncio.run(plan())
+    assert threads and threads[0] != loop_thread
+    assert update["actionSequence"]
+
+
+def test_unknown_context_strategy_is_rejected(world_states):
+    state = {"currentWorldState": world_states[0], "messages": []}
+    with pytest.raises(ValueError, match="context_strategy"):
+        _goal_generator_inputs(state, {}, Configuration(thread_id="test", context_strategy="windowed"))
+
+
+def test_window_context_keeps_the_latest_iterations(world_states):
+    messages = [message for i in range(20) for message in ({"worldState": world_states[0]}, {"gameMessage": f"Iteration {i}. " + "x" * 200})]
+    state = {"currentWorldState": world_states[0], "messages": messages}
+    full = _goal_generator_inputs(state, {}, Configuration(thread_id="test", context_strategy="full"))
+    window = _goal_generator_inputs(state, {}, Configuration(thread_id="test", context_strategy="window", context_keep_iterations=2))
+    assert full["episodeMessages"] == json.dumps(messages)
+    assert len(window["episodeMessages"]) < len(full["episodeMessages"])
+    assert "Iteration 19." in window["episodeMessages"]
+
+
+@pytest.mark.parametrize("node", [logger_node, alogger_node])
+def test_unknown_episode_log_is_rejected(world_states, node):
+    state = {"currentWorldState": world_states[0], "messages": []}
+    config = {"configurable": {"thread_id": "test", "episode_log": "json"}}
+    with pytest.raises(ValueError, match="episode_log"):
+        result = node(state, config)
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
@@ -0,0 +1,56 @@
+import pytest
+from src.action import compiled_actions
+from src.agent.nodes import _symbolic_planner_update
+from src.configuration import Configuration
+from src.policy_index import PolicyIndex, build_policy_index
+from src.utils import check_success_conditions
+from main_run_batch import scenario_1, scenario_2, scenario_3, scenario_4, scenario_5
+
+
+@pytest.fixture(scope="module")
+def policy_index_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("policy"))
+    build_policy_index([scenario_1, scenario_2, scenario_3, scenario_4, scenario_5], path)
+    return path
+
+
+def test_policy_index_metadata(policy_index_path, world_states):
+    index = PolicyIndex(policy_index_path)
+    assert index.metadata["actions"] == list(compiled_actions)
+    assert 0 < index.metadata["successStates"] < len(index) <= index.metadata["slots"]
+    assert all(world_state in index for world_state in world_states)
+
+
+def test_policy_index_plan_reaches_success(policy_index_path, world_states):
+    index = PolicyIndex(policy_index_path)
+    action_sequence = index.plan(world_states[1])
+    assert action_sequence
+
+    world_state = world_states[1]
+    for action_name in action_sequence:
+        assert index.best_action(world_state) == action_name
+        world_state = compiled_actions[action_name](world_state)
+    assert check_success_conditions(world_state)[0]
+    assert index.best_action(world_state) is None
+    assert index.value(world_state) == 1
+    assert 0 < index.value(world_states[1]) < 1
+
+
+def test_policy_index_misses_unknown_states(policy_index_path, world_states):
+    index = PolicyIndex(policy_index_path)
+    unknown = {**world_states[1], "potionCount": -1, "health": 7}
+    assert unknown not in index
+    assert index.plan(unknown) is None
+    assert index.value(unknown) is None
+
+
+@pytest.mark.parametrize("primary_goal, source", [("eliminate_threat", "index"), ("prepare_for_battle", "search")])
+def test_policy_index_plan_must_meet_the_primary_goal(policy_index_path, world_states, primary_goal, source):
+    configurable = Configuration(thread_id="test", planner_mode="symbolic", policy_index_path=policy_index_path)
+    state = {"currentWorldState": world_states[1], "primaryGoal": primary_goal, "secondaryGoal": "protect_treasure"}
+
+    update = _symbolic_planner_update(state, configurable)
+
+    assert ("policy index" in update["plannerJustification"]) == (source == "index")
+    if source == "index":
+        assert update["actionSequence"] == PolicyIndex(policy_index_path).plan(world_states[1])
@@ -0,0 +1,47 @@
+from src.action import compiled_actions
+from src.agent.progress import detect_loop, iteration_fingerprint, progress_view
+
+
+def oscillate(world_state, iterations):
+    "Play retreat and return_to_treasure in turn, one per iteration, and fingerprint every iteration"
+    fingerprints = []
+    for number in range(iterations):
+        action_name = "retreat" if number % 2 == 0 else "return_to_treasure"
+        fingerprints.append(iteration_fingerprint(world_state, [action_name]))
+        world_state = compiled_actions[action_name].apply(world_state)
+    return fingerprints, world_state
+
+
+def test_oscillation_repeats_fingerprints(world_states):
+    "Every step costs stamina, so the full world states never repeat, but the fingerprints do"
+    fingerprints, world_state = oscillate(world_states[1], 8)
+
+    assert world_state["stamina"] < world_states[1]["stamina"]
+    assert len(set(fingerprints)) == 2
+    assert detect_loop(fingerprints[:4], 0, 3, 2) == ""
+    assert detect_loop(fingerprints[:5], 0, 3, 2) == "cycle"
+
+
+def test_fingerprint_ignores_stamina_and_comfy_actions(world_states):
+    world_state = world_states[1]
+    tired = {**world_state, "stamina": world_state["stamina"] - 30, "comfyActions": 2}
+
+    assert progress_view(tired) == progress_view(world_state)
+    assert iteration_fingerprint(tired, ["retreat"]) == iteration_fingerprint(world_state, ["retreat"])
+
+
+def test_fingerprint_changes_with_progress(world_states):
+    world_state = world_states[1]
+    fingerprint = iteration_fingerprint(world_state, ["retreat"])
+
+    assert iteration_fingerprint({**world_state, "health": world_state["health"] + 4}, ["retreat"]) == fingerprint
+    assert iteration_fingerprint({**world_state, "health": world_state["health"] - 10}, ["retreat"]) != fingerprint
+    assert iteration_fingerprint({**world_state, "treasureHealth": world_state["treasureHealth"] - 10}, ["retreat"]) != fingerprint
+    assert iteration_fingerprint({**world_state, "enemyNearby": False, "enemyLevel": None}, ["retreat"]) != fingerprint
+    assert iteration_fingerprint(world_state, ["attack_enemy"]) != fingerprint
+
+
+def test_detect_loop_stagnation_and_disabled_checks():
+    assert detect_loop(["a", "b"], 2, 3, 2) == "stagnation"
+    assert detect_loop(["a", "a", "a"], 0, 0, 2) == ""
+    assert detect_loop(["a"], 5, 3, 0) == ""
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import pytest
+import src.runner as runner
+from src.runner import Scenario, run_scenarios, arun_scenarios, ScenarioResult
+
+
+def provider_scenarios(world_states):
+    "Four scenarios for a provider limited to one episode at a time, queued ahead of four for an unlimited one"
+    return [
+        Scenario(name=f"{provider}_{i}", world_state=world_states[0], configurable={"provider": provider})
+        for provider in ("limited", "unlimited")
+        for i in range(4)
+    ]
+
+
+def result(scenario, status):
+    return ScenarioResult(
+        name=scenario.name, thread_id="", provider=scenario.configurable["provider"],
+        status=status, end_reason="", iterations=0, duration_seconds=0
+    )
+
+
+@pytest.fixture
+def scenario_provider(monkeypatch):
+    "Take the provider from the scenario, PROVIDER in the environment would override it"
+    monkeypatch.setattr(runner, "_scenario_provider", lambda scenario, configurable: scenario.configurable["provider"])
+
+
+def test_saturated_provider_does_not_starve_others(world_states, monkeypatch, scenario_provider):
+    "The limited episodes wait until every unlimited one ran, which deadlocks if they hold the shared threads"
+    unlimited_done = threading.Semaphore(0)
+    running = {"limited": 0, "limited_max": 0}
+    lock = threading.Lock()
+
+    def run_scenario(scenario, configurable, recursion_limit):
+        if scenario.configurable["provider"] == "unlimited":
+            unlimited_done.release()
+            return result(scenario, "success")
+        with lock:
+            running["limited"] += 1
+            running["limited_max"] = max(running["limited_max"], running["limited"])
+        ready = unlimited_done.acquire(timeout=5)
+        if ready:
+            unlimited_done.release()
+        with lock:
+            running["limited"] -= 1
+        return result(scenario, "success" if ready else "timed_out")
+
+    monkeypatch.setattr(runner, "run_scenario", run_scenario)
+    results = run_scenarios(provider_scenarios(world_states), max_workers=2, provider_limits={"limited": 1})
+
+    assert [r.name for r in results] == [s.name for s in provider_scenarios(world_states)]
+    assert all(r.status == "success" for r in results)
+    assert running["limited_max"] == 1
+
+
+def test_async_saturated_provider_does_not_starve_others(world_states, monkeypatch, scenario_provider):
+    unlimited_done = 0
+    running = {"limited": 0, "limited_max": 0}
+
+    async def arun_scenario(scenario, configurable, recursion_limit):
+        nonlocal unlimited_done
+        if scenario.configurable["provider"] == "unlimited":
+            unlimited_done += 1
+            return result(scenario, "success")
+        running["limited"] += 1
+        running["limited_max"] = max(running["limited_max"], running["limited"])
+        for _ in range(100):
+            if unlimited_done == 4:
+                break
+            await asyncio.sleep(0.01)
+        running["limited"] -= 1
+        return result(scenario, "success" if unlimited_done == 4 else "timed_out")
+
+    monkeypatch.setattr(runner, "arun_scenario", arun_scenario)
+    results = asyncio.run(arun_scenarios(provider_scenarios(world_states), max_concurrency=2, provider_limits={"limited": 1}))
+
+    assert all(r.status == "success" for r in results)
+    assert running["limited_max"] == 1
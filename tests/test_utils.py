@@ -0,0 +1,7 @@
+from src.utils import get_llm
+
+
+def test_prompt_caching_setting_gets_its_own_llm():
+    assert get_llm("fake", "fake", 0.5, prompt_caching=True) is get_llm("fake", "fake", 0.5, prompt_caching=True)
+    assert get_llm("fake", "fake", 0.5, prompt_caching=True).prompt_caching
+    assert not get_llm("fake", "fake", 0.5, prompt_caching=False).prompt_caching